@@ -0,0 +1 @@
+# Performance-Benchmarks für Simulator und Envs
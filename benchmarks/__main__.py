@@ -0,0 +1,45 @@
+# File: benchmarks/__main__.py
+# CLI: python -m benchmarks [--suites ...] [--output results.json] [--baseline baseline.json] [--save-baseline]
+import argparse
+import sys
+
+from benchmarks.suite import (DEFAULT_BASELINE, DEFAULT_SUITES, SUITES, compare, load_report, print_comparison,
+                              run_suites, save_report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Performance-Benchmarks für Simulator, Envs und Training")
+    parser.add_argument("--suites", nargs="+", choices=sorted(SUITES), default=list(DEFAULT_SUITES))
+    parser.add_argument("--output", help="Ergebnisse als JSON speichern")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline-JSON für den Vergleich")
+    parser.add_argument("--save-baseline", action="store_true", help="Ergebnisse als neue Baseline speichern")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="erlaubter relativer Leistungsverlust, bevor eine Metrik als Regression gilt")
+    args = parser.parse_args(argv)
+
+    report = run_suites(args.suites)
+    if args.output:
+        save_report(report, args.output)
+    if args.save_baseline:
+        save_report(report, args.baseline)
+        print(f"Baseline gespeichert: {args.baseline}")
+        return 0
+    try:
+        baseline = load_report(args.baseline)
+    except FileNotFoundError:
+        print(f"Keine Baseline unter {args.baseline} (mit --save-baseline anlegen).")
+        return 0
+    rows = compare(report, baseline, args.tolerance)
+    print_comparison(rows)
+    regressions = [r for r in rows if r["regression"]]
+    skipped = [r for r in rows if r["skipped"]]
+    if skipped:
+        print(f"{len(skipped)} Metrik(en) nicht verglichen.")
+    if regressions:
+        print(f"{len(regressions)} Regression(en) gegenüber der Baseline (Toleranz {args.tolerance:.0%}).")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# File: benchmarks/bench_dispatch.py
+# Prioritätsregeln: Entscheidungslatenz (einzeln und als Batch) und Episoden-Reward als Baseline für PPO
+import time
+
+import numpy as np
+
+from dispatch_rules import RULES, DispatchPolicy
+from flexible_jobshop_env import FlexibleJobShopEnv
+from manufacturing_structure import SUBGOALS, build_anlage
+
+
+def latency_us(fn, n_calls=2000):
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        fn()
+    return (time.perf_counter() - start) / n_calls * 1e6
+
+
+def mean_episode_reward(rule, n_episodes=len(SUBGOALS), seed=0):
+    # je Episode ein anderes Subgoal, damit alle Ziele gleich gewichtet sind
+    anlage = build_anlage()
+    env = FlexibleJobShopEnv(anlage)
+    policy = DispatchPolicy(anlage, rule, max_buffer=env.max_buffer)
+    rewards = []
+    for k in range(n_episodes):
+        env.goal = SUBGOALS[k % len(SUBGOALS)]
+        obs, info = env.reset(seed=seed + k)
+        total, done = 0.0, False
+        while not done:
+            action, _ = policy.predict(obs, action_masks=info["action_mask"])
+            obs, reward, done, _, info = env.step(int(action))
+            total += reward
+        rewards.append(total)
+    return float(np.mean(rewards))
+
+
+def run(batch_size=64):
+    anlage = build_anlage()
+    env = FlexibleJobShopEnv(anlage, goal=SUBGOALS[0])
+    obs, info = env.reset(seed=0)
+    mask = info["action_mask"]
+    obs_batch = np.repeat(obs[None], batch_size, axis=0)
+    mask_batch = np.repeat(mask[None], batch_size, axis=0)
+    results = {}
+    for rule in RULES:
+        policy = DispatchPolicy(anlage, rule, max_buffer=env.max_buffer)
+        results[f"{rule}_single_us"] = latency_us(lambda: policy.predict(obs, action_masks=mask))
+        results[f"{rule}_batch{batch_size}_us"] = latency_us(lambda: policy(obs_batch, mask_batch))
+        results[f"{rule}_episode_reward"] = mean_episode_reward(rule)
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>34}: {value:>10.2f}")
@@ -0,0 +1,51 @@
+# File: benchmarks/bench_envs.py
+# Env-Schritte pro Sekunde: FlexibleJobShopEnv (Tick- und SMDP-Modus) und HighLevelEnv mit zufälligen gültigen Aktionen
+import time
+
+import numpy as np
+
+from flexible_jobshop_env import FlexibleJobShopEnv
+from hierarchical_env import HighLevelEnv
+from manufacturing_structure import MAX_HL_STEPS, REQUIRED_PRODUCTS, SUBGOALS, build_anlage
+
+
+def jobshop_steps_per_sec(smdp=False, min_time=2.0, seed=0):
+    rng = np.random.default_rng(seed)
+    env = FlexibleJobShopEnv(build_anlage(), goal=SUBGOALS[0], smdp=smdp)
+    _, info = env.reset(seed=seed)
+    n = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        action = rng.choice(np.flatnonzero(info["action_mask"]))
+        _, _, done, _, info = env.step(action)
+        n += 1
+        if done:
+            _, info = env.reset()
+    return n / (time.perf_counter() - start)
+
+
+def high_level_steps_per_sec(min_time=2.0, seed=0):
+    rng = np.random.default_rng(seed)
+    env = HighLevelEnv(build_anlage(), SUBGOALS, REQUIRED_PRODUCTS, max_steps=MAX_HL_STEPS)
+    env.reset(seed=seed)
+    n = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        _, _, done, _, _ = env.step(int(rng.integers(env.action_space.n)))
+        n += 1
+        if done:
+            env.reset()
+    return n / (time.perf_counter() - start)
+
+
+def run(min_time=2.0):
+    return {
+        "jobshop_steps_per_sec": jobshop_steps_per_sec(min_time=min_time),
+        "jobshop_smdp_steps_per_sec": jobshop_steps_per_sec(smdp=True, min_time=min_time),
+        "high_level_steps_per_sec": high_level_steps_per_sec(min_time=min_time),
+    }
+
+
+if __name__ == "__main__":
+    for name, sps in run().items():
+        print(f"{name:>28}: {sps:>10.0f}")
@@ -0,0 +1,54 @@
+# File: benchmarks/bench_hierarchical.py
+# High-Level-Schritte pro Sekunde mit Low-Level-MaskablePPO: Inferenz je Env vs. gebündelt über HierarchicalVecEnv
+import time
+
+import numpy as np
+from sb3_contrib import MaskablePPO
+
+from hierarchical_env import HighLevelEnv
+from hierarchical_rollout import HierarchicalVecEnv, LowLevelPolicy
+from manufacturing_structure import MAX_HL_STEPS, REQUIRED_PRODUCTS, SUBGOALS, build_anlage
+from train_low_level import make_env
+
+
+def make_hl_env(ll_policy=None):
+    return HighLevelEnv(build_anlage(), SUBGOALS, REQUIRED_PRODUCTS, max_steps=MAX_HL_STEPS, ll_policy=ll_policy)
+
+
+def per_env_steps_per_sec(ll_policy, n_envs, n_iters=10, seed=0):
+    rng = np.random.default_rng(seed)
+    envs = [make_hl_env(ll_policy) for _ in range(n_envs)]
+    for env in envs:
+        env.reset()
+    start = time.perf_counter()
+    for _ in range(n_iters):
+        for env in envs:
+            _, _, done, _, _ = env.step(int(rng.integers(env.action_space.n)))
+            if done:
+                env.reset()
+    return n_envs * n_iters / (time.perf_counter() - start)
+
+
+def batched_steps_per_sec(ll_policy, n_envs, n_iters=10, seed=0):
+    rng = np.random.default_rng(seed)
+    venv = HierarchicalVecEnv([make_hl_env for _ in range(n_envs)], ll_policy=ll_policy)
+    venv.reset()
+    start = time.perf_counter()
+    for _ in range(n_iters):
+        venv.step(rng.integers(venv.action_space.n, size=n_envs))
+    return n_envs * n_iters / (time.perf_counter() - start)
+
+
+def run(batch_sizes=(1, 16, 64)):
+    # untrainiertes Modell genügt: gemessen wird nur die Inferenzlast
+    ll_policy = LowLevelPolicy(MaskablePPO("MlpPolicy", make_env(), device="cpu", seed=0))
+    results = {}
+    for n in batch_sizes:
+        results[f"per_env_{n}"] = per_env_steps_per_sec(ll_policy, n)
+        results[f"batched_{n}"] = batched_steps_per_sec(ll_policy, n)
+    return results
+
+
+if __name__ == "__main__":
+    for name, sps in run().items():
+        print(f"{name:>12}: {sps:>8.0f} HL-steps/s")
@@ -0,0 +1,30 @@
+# File: benchmarks/bench_mcts.py
+# MCTS-Planer: Simulationen je Sekunde bei fester Entscheidungszeit je Anzahl Worker (Root-Parallelisierung)
+# und Episoden-Reward im Vergleich zur Rollout-Regel allein
+import os
+import time
+
+from benchmarks.bench_dispatch import mean_episode_reward
+from manufacturing_structure import SUBGOALS
+from mcts_planner import MCTSPlanner
+
+
+def run(time_budget=0.05, rollout_rule="mwkr"):
+    results = {f"{rollout_rule}_episode_reward": mean_episode_reward(rollout_rule)}
+    for n_workers in sorted({1, min(4, os.cpu_count() or 1)}):
+        with MCTSPlanner(n_workers=n_workers, time_budget=time_budget, rollout_rule=rollout_rule) as planner:
+            total_reward, sims = 0.0, 0
+            start = time.perf_counter()
+            for goal in SUBGOALS:
+                reward, n_sims = planner.run_episode(goal)
+                total_reward += reward
+                sims += n_sims
+            elapsed = time.perf_counter() - start
+        results[f"mcts_w{n_workers}_sims_per_s"] = sims / elapsed
+        results[f"mcts_w{n_workers}_episode_reward"] = total_reward / len(SUBGOALS)
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>34}: {value:>10.2f}")
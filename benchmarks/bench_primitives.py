@@ -0,0 +1,96 @@
+# File: benchmarks/bench_primitives.py
+# Micro-Benchmarks der Simulator-Primitive: Jobstart-Prüfung, Jobstart, Jobfortschritt, Nachschub des globalen Puffers
+import time
+
+import classes
+from manufacturing_structure import build_anlage
+
+
+def time_calls(setup, fn, n_calls=1000, repeats=5, after=None):
+    """
+    Mittlere Zeit je Aufruf von fn(state) in Mikrosekunden (Minimum über repeats).
+    setup() liefert vor jeder Wiederholung einen frischen Zustand; nur die Aufrufe von fn werden gemessen.
+    after(state): optional nach jedem Aufruf ungemessen ausgeführt (z.B. um den Zustand stationär zu halten).
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        state = setup()
+        elapsed = 0.0
+        for _ in range(n_calls):
+            start = time.perf_counter()
+            fn(state)
+            elapsed += time.perf_counter() - start
+            if after is not None:
+                after(state)
+        best = min(best, elapsed / n_calls)
+    return best * 1e6
+
+
+def _machine_with_inputs(anlage, n_jobs):
+    # Maschine mit der längsten Rezeptliste wählen und Inputs für n_jobs Starts der ersten Transformation bereitlegen
+    machine = max(anlage.machines, key=lambda m: len(m.machine_type.transformations[0].input_types))
+    machine.reset()
+    transformation = machine.machine_type.transformations[0]
+    for k in range(n_jobs):
+        machine.input_buffer.extend(classes.Part(k * 100 + i, pt) for i, pt in enumerate(transformation.input_types))
+    return machine, transformation
+
+
+def run(n_calls=1000):
+    anlage = build_anlage()
+
+    def setup_can_start():
+        return _machine_with_inputs(anlage, 1)
+
+    def setup_start():
+        machine, transformation = _machine_with_inputs(anlage, n_calls)
+        return machine, transformation, [0]
+
+    def start(state):
+        machine, transformation, counter = state
+        counter[0] = machine.start_transformation(transformation, counter[0])
+
+    def setup_progress():
+        # 64 gleichzeitig laufende Jobs (ohne Slot-Grenze), Startzeiten über die Dauer gestaffelt:
+        # jeder Zeitschritt schließt etwa 64/duration Jobs ab
+        machine, transformation = _machine_with_inputs(anlage, 64)
+        per_tick = -(-64 // transformation.duration)
+        counter = 0
+        for k in range(64):
+            if k and k % per_tick == 0:
+                counter, _ = machine.advance(1, counter)
+            counter = machine.start_transformation(transformation, counter)
+        return machine, transformation, [counter], []
+
+    def progress(state):
+        machine, _, counter, done = state
+        counter[0], done[:] = machine.progress_jobs(counter[0], {})
+
+    def restart(state):
+        # fertige Jobs ungemessen neu starten, damit jeder gemessene Aufruf 64 laufende Jobs vorfindet
+        machine, transformation, counter, done = state
+        machine.output_buffer.clear()
+        for _ in done:
+            machine.input_buffer.extend(classes.Part(counter[0] + i, pt) for i, pt in enumerate(transformation.input_types))
+            counter[0] = machine.start_transformation(transformation, counter[0] + len(transformation.input_types))
+
+    def setup_refill():
+        anlage.reset()
+        return anlage
+
+    def refill(state):
+        # globalen Puffer leeren (mitgemessen als konstanter Anteil) und wieder auf 10 Teile auffüllen
+        state.global_buffer.clear()
+        state.refill_global_buffer(10)
+
+    return {
+        "can_start_transformation_us": time_calls(setup_can_start, lambda s: s[0].can_start_transformation(s[1]), n_calls),
+        "start_transformation_us": time_calls(setup_start, start, n_calls),
+        "progress_jobs_us": time_calls(setup_progress, progress, n_calls, after=restart),
+        "refill_global_buffer_us": time_calls(setup_refill, refill, n_calls),
+    }
+
+
+if __name__ == "__main__":
+    for name, us in run().items():
+        print(f"{name:>28}: {us:>8.2f} us")
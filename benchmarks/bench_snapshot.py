@@ -0,0 +1,60 @@
+# File: benchmarks/bench_snapshot.py
+# Kosten von Anlage.snapshot()/restore() im Vergleich zu copy.deepcopy in Abhängigkeit von der Anlagengröße
+import copy
+import time
+
+import classes
+import manufacturing_structure as ms
+
+
+def build_plant(n_copies: int, wip: int):
+    """
+    Erstellt eine Anlage aus n_copies Kopien des Beispiel-Maschinenparks und füllt sie mit ca. wip Teilen.
+    """
+    machines = [classes.Machine(m.machine_type, f"{m.machine_id}_{k}")
+                for k in range(n_copies) for m in ms.machine_array]
+    anlage = classes.Anlage(machines, 0, [], ms.all_part_types)
+    anlage.refill_global_buffer(wip)
+    # Hälfte des Bestands auf die Maschinen verteilen und Jobs starten
+    for i in range(len(anlage.global_buffer) // 2):
+        machines[i % len(machines)].input_buffer.append(anlage.global_buffer.popleft())
+    for m in machines:
+        for t in m.transformation_priority:
+            while len(m.current_jobs) < m.machine_type.slots and m.can_start_transformation(t):
+                m.start_transformation(t, 0)
+    return anlage
+
+
+def time_per_call(fn, min_time: float = 0.2):
+    n = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        n += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / n
+
+
+def run(sizes=(1, 4, 16), wips=(10, 100, 1000)):
+    results = []
+    for n_copies in sizes:
+        for wip in wips:
+            anlage = build_plant(n_copies, wip)
+            snap = anlage.snapshot()
+            t_cycle = time_per_call(lambda: anlage.restore(anlage.snapshot()))
+            t_restore = time_per_call(lambda: anlage.restore(snap))
+            t_deep = time_per_call(lambda: copy.deepcopy(anlage))
+            results.append({
+                "machines": len(anlage.machines), "wip": wip,
+                "snapshot_restore_us": t_cycle * 1e6, "restore_us": t_restore * 1e6,
+                "deepcopy_us": t_deep * 1e6, "speedup": t_deep / t_cycle,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'machines':>8} {'wip':>6} {'snap+restore[us]':>17} {'restore[us]':>12} {'deepcopy[us]':>13} {'speedup':>8}")
+    for r in run():
+        print(f"{r['machines']:>8} {r['wip']:>6} {r['snapshot_restore_us']:>17.1f} {r['restore_us']:>12.1f} "
+              f"{r['deepcopy_us']:>13.1f} {r['speedup']:>8.1f}x")
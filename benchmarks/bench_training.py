@@ -0,0 +1,79 @@
+# File: benchmarks/bench_training.py
+# MaskablePPO: Durchsatz der Rollout-Sammlung und Latenz-Perzentile der Policy-Inferenz
+import time
+
+import numpy as np
+from sb3_contrib import MaskablePPO
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from hierarchical_rollout import LowLevelPolicy
+from manufacturing_structure import build_anlage
+from numpy_policy import from_model
+from train_low_level import SUBGOALS, make_env
+from vec_jobshop_env import BatchedJobShopVecEnv
+
+
+def rollout_steps_per_sec(vec_env, n_steps=256, seed=0):
+    """
+    Env-Schritte pro Sekunde beim Sammeln eines Rollouts (ohne Gradientenschritte).
+    """
+    model = MaskablePPO("MlpPolicy", vec_env, n_steps=n_steps, device="cpu", seed=seed)
+    _, callback = model._setup_learn(n_steps * vec_env.num_envs, None)
+    callback.on_training_start(locals(), globals())
+    start = time.perf_counter()
+    model.collect_rollouts(model.env, callback, model.rollout_buffer, n_rollout_steps=n_steps)
+    sps = n_steps * vec_env.num_envs / (time.perf_counter() - start)
+    vec_env.close()
+    return sps
+
+
+def latency_percentiles(fn, n_calls=500, percentiles=(50, 90, 99)):
+    times = np.empty(n_calls)
+    for i in range(n_calls):
+        start = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - start
+    return {p: float(np.percentile(times, p) * 1e6) for p in percentiles}
+
+
+def inference_latency(batch_size=64, seed=0):
+    """
+    Latenz (Mikrosekunden) von MaskablePPO.predict für eine Observation und von LowLevelPolicy für einen Batch,
+    jeweils im Vergleich zur NumPy-Inferenz (NumpyPolicy) mit denselben Gewichten.
+    """
+    env = make_env()
+    model = MaskablePPO("MlpPolicy", env, device="cpu", seed=seed)
+    obs, _ = env.reset(seed=seed)
+    mask = env.action_masks()
+    results = {}
+    single = latency_percentiles(lambda: model.predict(obs, deterministic=True, action_masks=mask))
+    for p, us in single.items():
+        results[f"predict_single_p{p}_us"] = us
+    policy = LowLevelPolicy(model)
+    obs_batch = np.repeat(obs[None], batch_size, axis=0)
+    mask_batch = np.repeat(np.asarray(mask, dtype=bool)[None], batch_size, axis=0)
+    batched = latency_percentiles(lambda: policy(obs_batch, mask_batch))
+    for p, us in batched.items():
+        results[f"predict_batch{batch_size}_p{p}_us"] = us
+    # gleiche Gewichte, Inferenz in reinem NumPy
+    np_policy = from_model(model)
+    for p, us in latency_percentiles(lambda: np_policy.predict(obs, deterministic=True, action_masks=mask)).items():
+        results[f"numpy_single_p{p}_us"] = us
+    for p, us in latency_percentiles(lambda: np_policy(obs_batch, mask_batch)).items():
+        results[f"numpy_batch{batch_size}_p{p}_us"] = us
+    return results
+
+
+def run():
+    results = {
+        "rollout_dummy4_steps_per_sec": rollout_steps_per_sec(DummyVecEnv([make_env for _ in range(4)])),
+        "rollout_batched64_steps_per_sec": rollout_steps_per_sec(
+            BatchedJobShopVecEnv(build_anlage(), 64, SUBGOALS, seed=0), n_steps=64),
+    }
+    results.update(inference_latency())
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>34}: {value:>10.1f}")
@@ -0,0 +1,49 @@
+# File: benchmarks/bench_vec_env.py
+# Env-Schritte pro Sekunde: einzelnes FlexibleJobShopEnv vs. BatchedJobShopVecEnv mit N Anlagen
+import time
+
+import numpy as np
+
+from flexible_jobshop_env import FlexibleJobShopEnv
+from manufacturing_structure import SUBGOALS, build_anlage
+from vec_jobshop_env import BatchedJobShopVecEnv
+
+
+def single_env_steps_per_sec(n_steps=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    env = FlexibleJobShopEnv(build_anlage(), goal=SUBGOALS[0])
+    _, info = env.reset()
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        action = rng.choice(np.flatnonzero(info["action_mask"]))
+        _, _, done, _, info = env.step(action)
+        if done:
+            _, info = env.reset()
+    return n_steps / (time.perf_counter() - start)
+
+
+def batched_steps_per_sec(n_envs=256, n_iters=200, seed=0):
+    rng = np.random.default_rng(seed)
+    venv = BatchedJobShopVecEnv(build_anlage(), n_envs, SUBGOALS, seed=seed)
+    venv.reset()
+    start = time.perf_counter()
+    for _ in range(n_iters):
+        masks = venv.action_masks()
+        # zufällige gültige Aktion je Anlage
+        scores = np.where(masks, rng.random(masks.shape), -1.0)
+        venv.step(scores.argmax(axis=1))
+    return n_envs * n_iters / (time.perf_counter() - start)
+
+
+def run(batch_sizes=(1, 16, 64, 256, 1024)):
+    results = {"single_env": single_env_steps_per_sec()}
+    for n in batch_sizes:
+        results[f"batched_{n}"] = batched_steps_per_sec(n_envs=n)
+    return results
+
+
+if __name__ == "__main__":
+    res = run()
+    base = res["single_env"]
+    for name, sps in res.items():
+        print(f"{name:>14}: {sps:>12.0f} steps/s ({sps / base:.1f}x)")
@@ -0,0 +1,41 @@
+# File: benchmarks/bench_vec_scaling.py
+# Skalierung der Env-Schritte pro Sekunde mit SubprocVecEnv über 1/4/8/16 Worker-Prozesse (je Worker eine eigene Anlage)
+import os
+import time
+
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+
+from train_low_level import make_env
+
+
+def vec_steps_per_sec(n_envs, vec="subproc", n_iters=500, seed=0):
+    rng = np.random.default_rng(seed)
+    venv_cls = SubprocVecEnv if vec == "subproc" else DummyVecEnv
+    venv = venv_cls([make_env for _ in range(n_envs)])
+    venv.seed(seed)
+    venv.reset()
+    start = time.perf_counter()
+    for _ in range(n_iters):
+        masks = np.stack(venv.env_method("action_masks"))
+        # zufällige gültige Aktion je Env
+        scores = np.where(masks, rng.random(masks.shape), -1.0)
+        venv.step(scores.argmax(axis=1))
+    sps = n_envs * n_iters / (time.perf_counter() - start)
+    venv.close()
+    return sps
+
+
+def run(worker_counts=(1, 4, 8, 16)):
+    results = {"dummy_1": vec_steps_per_sec(1, vec="dummy")}
+    for n in worker_counts:
+        results[f"subproc_{n}"] = vec_steps_per_sec(n, vec="subproc")
+    return results
+
+
+if __name__ == "__main__":
+    print(f"CPU-Kerne: {os.cpu_count()}")
+    res = run()
+    base = res["dummy_1"]
+    for name, sps in res.items():
+        print(f"{name:>12}: {sps:>10.0f} steps/s ({sps / base:.1f}x)")
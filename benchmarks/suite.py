@@ -0,0 +1,140 @@
+# File: benchmarks/suite.py
+# Benchmark-Suite: Ausführung ausgewählter Benchmarks, JSON-Ergebnisse und Vergleich gegen eine gespeicherte Baseline
+import datetime
+import importlib
+import json
+import os
+import platform
+
+import numpy as np
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def _flat(module, prefix="", suffix="_steps_per_sec"):
+    # Adapter für Benchmarks, deren run() Schritte/s ohne Einheit im Namen liefert
+    def run():
+        return {f"{prefix}{name}{suffix}": value for name, value in importlib.import_module(module).run().items()}
+    return run
+
+
+def _snapshot():
+    rows = importlib.import_module("benchmarks.bench_snapshot").run()
+    return {f"snapshot_restore_m{r['machines']}_wip{r['wip']}_us": r["snapshot_restore_us"] for r in rows}
+
+
+def _module(module):
+    return lambda: importlib.import_module(module).run()
+
+
+# Name -> Funktion, die ein flaches Dictionary {Metrik: Wert} liefert.
+# Metriken auf "_us" sind Latenzen (kleiner ist besser), auf "_episode_reward" Ergebnisgüte (größer ist besser,
+# beliebiges Vorzeichen), alle anderen Durchsätze (größer ist besser).
+SUITES = {
+    "primitives": _module("benchmarks.bench_primitives"),
+    "envs": _module("benchmarks.bench_envs"),
+    "training": _module("benchmarks.bench_training"),
+    "snapshot": _snapshot,
+    "vec_env": _flat("benchmarks.bench_vec_env", prefix="vec_env_"),
+    "hierarchical": _flat("benchmarks.bench_hierarchical", prefix="hierarchical_"),
+    "dispatch": _module("benchmarks.bench_dispatch"),
+    "mcts": _module("benchmarks.bench_mcts"),
+}
+DEFAULT_SUITES = ("primitives", "envs", "training")
+
+
+def lower_is_better(metric: str) -> bool:
+    return metric.endswith("_us")
+
+
+def is_quality(metric: str) -> bool:
+    return metric.endswith("_episode_reward")
+
+
+def run_suites(names=DEFAULT_SUITES, verbose=True):
+    """
+    Führt die Suiten aus und liefert {"meta": {...}, "results": {Suite: {Metrik: Wert}}}.
+    """
+    try:
+        import torch
+        torch_version = torch.__version__
+    except ImportError:  # Primitive- und Env-Suiten laufen auch ohne torch
+        torch_version = None
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "torch": torch_version,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": {},
+    }
+    for name in names:
+        if verbose:
+            print(f"--- {name} ---", flush=True)
+        results = {k: float(v) for k, v in SUITES[name]().items()}
+        report["results"][name] = results
+        if verbose:
+            for metric, value in results.items():
+                print(f"{metric:>40}: {value:>12.2f}")
+    return report
+
+
+def save_report(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(report, baseline, tolerance=0.2):
+    """
+    Vergleicht die Metriken der ausgeführten Suiten mit der Baseline.
+    Liefert eine Liste von Dicts (suite, metric, baseline, current, ratio, change, regression, skipped).
+    Zeitmetriken: ratio > 1 bedeutet schneller, change = ratio - 1; Regression bei ratio < 1 - tolerance.
+    Gütemetriken (is_quality): kein ratio, change = (current - baseline) / |baseline| (absolut bei Baseline 0);
+    Regression bei change < -tolerance, unabhängig vom Vorzeichen der Rewards.
+    Nicht vergleichbare Metriken (nur in einem Bericht, Zeitwert <= 0) erscheinen mit dem Grund in skipped.
+    """
+    rows = []
+    for suite, results in report["results"].items():
+        base_results = baseline.get("results", {}).get(suite, {})
+        for metric in list(results) + [m for m in base_results if m not in results]:
+            base, current = base_results.get(metric), results.get(metric)
+            row = {"suite": suite, "metric": metric, "baseline": base, "current": current,
+                   "ratio": None, "change": None, "regression": False, "skipped": None}
+            rows.append(row)
+            if base is None:
+                row["skipped"] = "nicht in der Baseline"
+            elif current is None:
+                row["skipped"] = "nicht im aktuellen Lauf"
+            elif is_quality(metric):
+                row["change"] = (current - base) / (abs(base) or 1.0)
+                row["regression"] = row["change"] < -tolerance
+            elif base <= 0 or current <= 0:
+                row["skipped"] = "Zeitwert <= 0"
+            else:
+                row["ratio"] = base / current if lower_is_better(metric) else current / base
+                row["change"] = row["ratio"] - 1.0
+                row["regression"] = row["ratio"] < 1.0 - tolerance
+    return rows
+
+
+def print_comparison(rows):
+    print(f"{'metric':>40} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for r in rows:
+        base = f"{r['baseline']:>12.2f}" if r["baseline"] is not None else f"{'-':>12}"
+        current = f"{r['current']:>12.2f}" if r["current"] is not None else f"{'-':>12}"
+        if r["skipped"]:
+            result = f"  übersprungen ({r['skipped']})"
+        elif r["ratio"] is None:
+            result = f" {r['change']:>+6.1%}"
+        else:
+            result = f" {r['ratio']:>6.2f}x"
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['metric']:>40} {base} {current}{result}{flag}")
@@ -1,7 +1,16 @@
+import heapq
+import sys
+import weakref
+from collections import deque, namedtuple
+from itertools import groupby, islice, repeat
+from operator import attrgetter
+
 import numpy as np
 
 
 class PartType:
+    __slots__ = ("name", "cost", "value")
+
     def __init__(self, name: str, cost: float, value: float = 0.0):
         """
         Repräsentiert einen Typ von Teil.
@@ -14,6 +23,8 @@ class PartType:
 
 
 class Transformation:
+    __slots__ = ("input_types", "output_type", "duration", "requirements")
+
     def __init__(self, input_types, output_type: PartType, duration: int):
         """
         Definiert, wie Teile eines oder mehrerer Input-Typen in einen Output-Typ transformiert werden.
@@ -27,6 +38,10 @@ class Transformation:
         self.input_types = input_types
         self.output_type = output_type
         self.duration = duration
+        # Benötigte Stückzahl je Input-Typ, einmalig vorberechnet.
+        self.requirements = {}
+        for pt in input_types:
+            self.requirements[pt] = self.requirements.get(pt, 0) + 1
 
 
 class MachineType:
@@ -42,6 +57,8 @@ class MachineType:
 
 
 class Part:
+    __slots__ = ("id", "type")
+
     def __init__(self, part_id: int, part_type: PartType):
         """
         Repräsentiert ein konkretes Teil-Exemplar.
@@ -52,6 +69,669 @@ class Part:
         self.type = part_type
 
 
+class DirtySet(set):
+    """
+    Menge der PartTypes, deren Stückzahl sich in einem beobachteten PartBuffer geändert hat.
+    Das Element ALL_TYPES (None) bedeutet, dass sich potentiell alle Typen geändert haben (clear/restore).
+    """
+    ALL_TYPES = None
+
+
+class _BufferHooks:
+    __slots__ = ("_watchers", "_ledger")
+
+    def __init__(self):
+        """
+        Gemeinsame Beobachter- und Bewertungslogik der Puffer (PartBuffer, CountBuffer).
+        Unterklassen buchen ihren Inhalt in _book_contents(sign).
+        """
+        self._watchers = []  # schwache Referenzen auf DirtySets
+        self._ledger = None  # Objekt mit current_value/cost (i.d.R. die Anlage) für laufende WIP-Bewertung
+
+    def set_ledger(self, ledger):
+        """
+        Verknüpft den Puffer mit einem Bewertungsobjekt (Attribute current_value und cost).
+        Jede Zu- und Abgang wird dort gebucht; der aktuelle Inhalt wird beim Verknüpfen übernommen.
+        """
+        if self._ledger is not None:
+            self._book_contents(-1)
+        self._ledger = ledger
+        if ledger is not None:
+            self._book_contents(1)
+
+    def _book(self, part_type, n):
+        ledger = self._ledger
+        ledger.current_value += n * part_type.value
+        ledger.cost += n * part_type.cost
+
+    def watch(self, dirty: DirtySet):
+        """
+        Registriert ein DirtySet, das bei jeder Änderung die betroffenen PartTypes erhält.
+        Es wird nur schwach referenziert; verworfene Beobachter werden automatisch entfernt.
+        """
+        self._watchers = [ref for ref in self._watchers if ref() is not None]
+        self._watchers.append(weakref.ref(dirty))
+        dirty.add(DirtySet.ALL_TYPES)
+
+    def _mark(self, part_type):
+        for ref in self._watchers:
+            dirty = ref()
+            if dirty is not None:
+                dirty.add(part_type)
+
+
+class PartBuffer(_BufferHooks):
+    __slots__ = ("_queues", "_len", "_seq")
+
+    def __init__(self, parts=()):
+        """
+        Puffer von Parts mit je einer FIFO-Warteschlange pro PartType.
+        Je Typ werden zwei parallele deques (Einfüge-Nummern, Parts) gehalten; Länge je Typ und Entnahme
+        von k Teilen eines Typs hängen nicht von der Puffergröße ab. Die Iteration liefert die Teile in
+        Einfügereihenfolge, Part-IDs bleiben erhalten.
+        parts: Optionale Anfangsbelegung.
+        """
+        super().__init__()
+        self._queues = {}  # PartType -> (deque Einfüge-Nr., deque Parts)
+        self._len = 0
+        self._seq = 0
+        self.extend(parts)
+
+    def _book_contents(self, sign):
+        for pt, (_, parts) in self._queues.items():
+            if parts:
+                self._book(pt, sign * len(parts))
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def _merged(self):
+        # Einfüge-Nummern sind eindeutig, daher werden Parts selbst nie verglichen.
+        return heapq.merge(*(zip(seqs, parts) for seqs, parts in self._queues.values() if parts))
+
+    def __iter__(self):
+        for _, part in self._merged():
+            yield part
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("PartBuffer index out of range")
+        return next(islice(iter(self), i, None))
+
+    def append(self, part: Part):
+        queue = self._queues.get(part.type)
+        if queue is None:
+            queue = self._queues[part.type] = (deque(), deque())
+        queue[0].append(self._seq)
+        queue[1].append(part)
+        self._seq += 1
+        self._len += 1
+        if self._ledger is not None:
+            self._book(part.type, 1)
+        if self._watchers:
+            self._mark(part.type)
+
+    def extend(self, parts):
+        for part in parts:
+            self.append(part)
+
+    def count_of(self, part_type: PartType):
+        """
+        Anzahl Teile eines Typs im Puffer (O(1)).
+        """
+        queue = self._queues.get(part_type)
+        return len(queue[1]) if queue else 0
+
+    def type_counts(self):
+        """
+        Dictionary PartType -> Anzahl für alle im Puffer vorhandenen Typen.
+        """
+        return {pt: len(parts) for pt, (_, parts) in self._queues.items() if parts}
+
+    def take(self, part_type: PartType, k: int):
+        """
+        Entnimmt die k ältesten Teile eines Typs (bzw. so viele wie vorhanden).
+        """
+        queue = self._queues.get(part_type)
+        if not queue or not queue[1]:
+            return []
+        seqs, parts = queue
+        n = min(k, len(parts))
+        self._len -= n
+        if self._ledger is not None:
+            self._book(part_type, -n)
+        if self._watchers and n:
+            self._mark(part_type)
+        for _ in range(n):
+            seqs.popleft()
+        return [parts.popleft() for _ in range(n)]
+
+    def popleft(self):
+        """
+        Entnimmt das älteste Teil des Puffers.
+        """
+        if not self._len:
+            raise IndexError("popleft from empty PartBuffer")
+        seqs, parts = min((q for q in self._queues.values() if q[1]), key=lambda q: q[0][0])
+        self._len -= 1
+        seqs.popleft()
+        part = parts.popleft()
+        if self._ledger is not None:
+            self._book(part.type, -1)
+        if self._watchers:
+            self._mark(part.type)
+        return part
+
+    def popleft_many(self, k: int):
+        """
+        Entnimmt die k ältesten Teile des Puffers in Einfügereihenfolge.
+        """
+        if k >= self._len:
+            return self.drain()
+        taken = [part for _, part in islice(self._merged(), k)]
+        for part in taken:
+            seqs, parts = self._queues[part.type]
+            seqs.popleft()
+            parts.popleft()
+            if self._ledger is not None:
+                self._book(part.type, -1)
+            if self._watchers:
+                self._mark(part.type)
+        self._len -= len(taken)
+        return taken
+
+    def drain(self):
+        """
+        Entnimmt alle Teile in Einfügereihenfolge und leert den Puffer.
+        """
+        if not self._len:
+            return []
+        parts = list(self)
+        self.clear()
+        return parts
+
+    def refill_from(self, source, capacity: int):
+        """
+        Überträgt die ältesten Teile aus source, bis dieser Puffer capacity Teile enthält.
+        Liefert die Anzahl übertragener Teile.
+        """
+        free = capacity - self._len
+        if free <= 0 or not source:
+            return 0
+        parts = source.popleft_many(free)
+        self.extend(parts)
+        return len(parts)
+
+    def clear(self):
+        if self._ledger is not None:
+            self._book_contents(-1)
+        self._queues = {}
+        self._len = 0
+        self._seq = 0
+        if self._watchers:
+            self._mark(DirtySet.ALL_TYPES)
+
+    def snapshot(self):
+        """
+        Unveränderliche Kopie des Pufferinhalts (Parts werden nur referenziert).
+        """
+        if not self._len:
+            return ((), 0, self._seq)
+        return (tuple([(pt, tuple(seqs), tuple(parts)) for pt, (seqs, parts) in self._queues.items() if parts]),
+                self._len, self._seq)
+
+    def restore(self, snap):
+        if self._ledger is not None:
+            self._book_contents(-1)
+        items, self._len, self._seq = snap
+        self._queues = {pt: (deque(seqs), deque(parts)) for pt, seqs, parts in items} if items else {}
+        if self._ledger is not None:
+            self._book_contents(1)
+        if self._watchers:
+            self._mark(DirtySet.ALL_TYPES)
+
+    def nbytes(self):
+        """
+        Geschätzter Speicherbedarf in Bytes (Container, Einfüge-Nummern und Part-Objekte inkl. IDs).
+        """
+        total = sys.getsizeof(self) + sys.getsizeof(self._queues)
+        for seqs, parts in self._queues.values():
+            total += sys.getsizeof(seqs) + sys.getsizeof(parts)
+            total += sum(sys.getsizeof(seq) for seq in seqs)
+            total += sum(sys.getsizeof(part) + sys.getsizeof(part.id) for part in parts)
+        return total
+
+
+class PartTokens:
+    __slots__ = ("type_ids", "tokens", "_recipes")
+
+    def __init__(self, part_types: list):
+        """
+        Typ-Tabelle des Zählmodus (Anlage(part_identity=False)).
+        type_ids: Dictionary PartType -> Typ-ID (Position in part_types, wie im PlantIndex).
+        tokens: Je Typ-ID ein geteiltes anonymes Part (id None), das anstelle einzelner Teile-Exemplare
+                herausgegeben wird; Aufrufer sehen weiterhin Parts mit .type.
+        """
+        self.type_ids = {pt: i for i, pt in enumerate(part_types)}
+        self.tokens = [Part(None, pt) for pt in part_types]
+        self._recipes = {}
+
+    def token(self, part_type: PartType):
+        return self.tokens[self.type_ids[part_type]]
+
+    def recipe(self, transformation: Transformation):
+        """
+        Inputs einer Transformation als Liste (Typ-ID, Anzahl), einmal je Transformation berechnet.
+        """
+        recipe = self._recipes.get(transformation)
+        if recipe is None:
+            recipe = self._recipes[transformation] = [(self.type_ids[pt], n)
+                                                      for pt, n in transformation.requirements.items()]
+        return recipe
+
+    def parts(self, transformation: Transformation):
+        """
+        Anonyme Input-Parts eines Jobs in derselben Reihenfolge, in der start_transformation sie entnimmt.
+        """
+        return [self.tokens[tid] for tid, n in self.recipe(transformation) for _ in range(n)]
+
+
+class CountBuffer(_BufferHooks):
+    __slots__ = ("table", "counts", "_runs", "_len")
+
+    def __init__(self, table: PartTokens, ordered: bool = True, parts=()):
+        """
+        Puffer ohne Teile-Identität für den Zählmodus: Zählvektor counts (je Typ-ID) statt Part-Objekten.
+        Schnittstelle wie PartBuffer; herausgegeben werden die geteilten anonymen Parts aus table.
+        ordered=True: die Einfügereihenfolge wird als Läufe [Typ-ID, Anzahl] gehalten (aufeinanderfolgende Teile
+        desselben Typs teilen einen Lauf, leer gewordene Läufe verschmelzen ihre Nachbarn). Iteration, popleft und
+        refill_from liefern dann dieselbe Typfolge wie ein PartBuffer. Speicher wächst mit der Zahl der Typwechsel,
+        nicht mit der Stückzahl.
+        ordered=False: nur der Zählvektor (konstanter Speicher); Iteration und Entnahme von vorne in Typ-ID-Reihenfolge.
+        Geeignet für Puffer, aus denen nur typweise entnommen wird (Maschinen-Input-Puffer).
+        """
+        super().__init__()
+        self.table = table
+        self.counts = np.zeros(len(table.tokens), dtype=np.int64)
+        self._runs = deque() if ordered else None
+        self._len = 0
+        self.extend(parts)
+
+    def _book_contents(self, sign):
+        for tid in np.flatnonzero(self.counts):
+            self._book(self.table.tokens[tid].type, sign * int(self.counts[tid]))
+
+    def _add(self, tid: int, n: int):
+        # n Teile des Typs tid hinten anfügen
+        self.counts[tid] += n
+        self._len += n
+        runs = self._runs
+        if runs is not None:
+            if runs and runs[-1][0] == tid:
+                runs[-1][1] += n
+            else:
+                runs.append([tid, n])
+        if self._ledger is not None or self._watchers:
+            self._changed(tid, n)
+
+    def _removed(self, tid: int, n: int):
+        self.counts[tid] -= n
+        self._len -= n
+        if self._ledger is not None or self._watchers:
+            self._changed(tid, -n)
+
+    def _changed(self, tid: int, n: int):
+        part_type = self.table.tokens[tid].type
+        if self._ledger is not None:
+            self._book(part_type, n)
+        if self._watchers:
+            self._mark(part_type)
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def _blocks(self):
+        # (Typ-ID, Anzahl) in Entnahmereihenfolge
+        if self._runs is not None:
+            return [tuple(run) for run in self._runs]
+        return [(int(tid), int(self.counts[tid])) for tid in np.flatnonzero(self.counts)]
+
+    def __iter__(self):
+        tokens = self.table.tokens
+        for tid, n in self._blocks():
+            yield from repeat(tokens[tid], n)
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("CountBuffer index out of range")
+        return next(islice(iter(self), i, None))
+
+    def append(self, part: Part):
+        self._add(self.table.type_ids[part.type], 1)
+
+    def extend(self, parts):
+        type_ids = self.table.type_ids
+        for pt, group in groupby(parts, key=attrgetter("type")):
+            self._add(type_ids[pt], sum(1 for _ in group))
+
+    def count_of(self, part_type: PartType):
+        """
+        Anzahl Teile eines Typs im Puffer (O(1)).
+        """
+        tid = self.table.type_ids.get(part_type)
+        return int(self.counts[tid]) if tid is not None else 0
+
+    def type_counts(self):
+        """
+        Dictionary PartType -> Anzahl für alle im Puffer vorhandenen Typen.
+        """
+        tokens = self.table.tokens
+        return {tokens[tid].type: int(self.counts[tid]) for tid in np.flatnonzero(self.counts)}
+
+    def take(self, part_type: PartType, k: int):
+        """
+        Entnimmt die k ältesten Teile eines Typs (bzw. so viele wie vorhanden).
+        """
+        tid = self.table.type_ids[part_type]
+        n = min(k, int(self.counts[tid]))
+        if n <= 0:
+            return []
+        if self._runs is not None:
+            self._take_runs(tid, n)
+        self._removed(tid, n)
+        return [self.table.tokens[tid]] * n
+
+    def _take_runs(self, tid: int, n: int):
+        runs = self._runs
+        i = 0
+        while n:
+            run = runs[i]
+            if run[0] != tid:
+                i += 1
+                continue
+            m = min(n, run[1])
+            run[1] -= m
+            n -= m
+            if run[1]:
+                break
+            del runs[i]
+            # Nachbarn gleichen Typs verschmelzen, damit die Zahl der Läufe nicht wächst
+            if 0 < i < len(runs) and runs[i - 1][0] == runs[i][0]:
+                runs[i - 1][1] += runs[i][1]
+                del runs[i]
+
+    def _pop_front(self, k: int):
+        # entnimmt bis zu k Teile vom vordersten Lauf; liefert (Typ-ID, Anzahl)
+        if self._runs is None:
+            tid = int(np.flatnonzero(self.counts)[0])
+            n = min(k, int(self.counts[tid]))
+        else:
+            run = self._runs[0]
+            tid, n = run[0], min(k, run[1])
+            run[1] -= n
+            if not run[1]:
+                self._runs.popleft()
+        self._removed(tid, n)
+        return tid, n
+
+    def popleft(self):
+        """
+        Entnimmt das älteste Teil des Puffers.
+        """
+        if not self._len:
+            raise IndexError("popleft from empty CountBuffer")
+        tid, _ = self._pop_front(1)
+        return self.table.tokens[tid]
+
+    def popleft_many(self, k: int):
+        """
+        Entnimmt die k ältesten Teile des Puffers in Einfügereihenfolge.
+        """
+        taken = []
+        while len(taken) < k and self._len:
+            tid, n = self._pop_front(k - len(taken))
+            taken.extend(repeat(self.table.tokens[tid], n))
+        return taken
+
+    def drain(self):
+        """
+        Entnimmt alle Teile in Einfügereihenfolge und leert den Puffer.
+        """
+        if not self._len:
+            return []
+        parts = list(self)
+        self.clear()
+        return parts
+
+    def refill_from(self, source, capacity: int):
+        """
+        Überträgt die ältesten Teile aus source, bis dieser Puffer capacity Teile enthält.
+        Aus einem CountBuffer wird laufweise übertragen, ohne einzelne Parts zu erzeugen.
+        Liefert die Anzahl übertragener Teile.
+        """
+        free = capacity - self._len
+        if free <= 0 or not source:
+            return 0
+        if not isinstance(source, CountBuffer):
+            parts = source.popleft_many(free)
+            self.extend(parts)
+            return len(parts)
+        moved = 0
+        while moved < free and source:
+            tid, n = source._pop_front(free - moved)
+            self._add(tid, n)
+            moved += n
+        return moved
+
+    def clear(self):
+        if self._ledger is not None:
+            self._book_contents(-1)
+        self.counts.fill(0)
+        self._len = 0
+        if self._runs is not None:
+            self._runs.clear()
+        if self._watchers:
+            self._mark(DirtySet.ALL_TYPES)
+
+    def snapshot(self):
+        """
+        Unveränderliche Kopie des Pufferinhalts (Läufe bzw. Zählvektor).
+        """
+        return (tuple(self._blocks()), self._len)
+
+    def restore(self, snap):
+        if self._ledger is not None:
+            self._book_contents(-1)
+        blocks, self._len = snap
+        self.counts.fill(0)
+        for tid, n in blocks:
+            self.counts[tid] += n
+        if self._runs is not None:
+            self._runs = deque([list(block) for block in blocks])
+        if self._ledger is not None:
+            self._book_contents(1)
+        if self._watchers:
+            self._mark(DirtySet.ALL_TYPES)
+
+    def nbytes(self):
+        """
+        Geschätzter Speicherbedarf in Bytes (Zählvektor und Läufe; unabhängig von der Stückzahl je Lauf).
+        """
+        total = sys.getsizeof(self) + self.counts.nbytes
+        if self._runs is not None:
+            total += sys.getsizeof(self._runs) + sum(sys.getsizeof(run) for run in self._runs)
+        return total
+
+
+Job = namedtuple("Job", ["transformation", "input_parts", "end_time"])
+
+
+class JobTable:
+    __slots__ = ("transformation", "input_parts", "end_time", "seq", "_free", "_active", "_ledger", "table",
+                 "input_counts")
+
+    def __init__(self, capacity: int, table: PartTokens = None):
+        """
+        Vorallokierte Job-Tabelle einer Maschine (Struct-of-Arrays, ein Eintrag je Slot).
+        Spalten: transformation, input_parts, end_time, seq (Startreihenfolge); freie Slots liegen auf einem Stapel.
+        capacity: Anzahl vorallokierter Slots (üblicherweise machine_type.slots); wächst nur bei Überbelegung.
+        table: Typ-Tabelle im Zählmodus. Input-Parts werden dann nicht gespeichert; input_counts (je Typ-ID) zählt
+               die Inputs aller laufenden Jobs, die Iteration liefert sie als anonyme Parts aus dem Rezept.
+        """
+        capacity = max(1, capacity)
+        self.transformation = [None] * capacity
+        self.input_parts = [None] * capacity
+        self.end_time = [0] * capacity
+        self.seq = [0] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self._active = 0
+        self._ledger = None
+        self.table = table
+        self.input_counts = np.zeros(len(table.tokens), dtype=np.int64) if table is not None else None
+
+    def set_ledger(self, ledger):
+        """
+        Verknüpft die Tabelle mit einem Bewertungsobjekt; die Input-Parts laufender Jobs zählen zum Umlaufbestand.
+        """
+        if self._ledger is not None:
+            self._book_contents(-1)
+        self._ledger = ledger
+        if ledger is not None:
+            self._book_contents(1)
+
+    def _book(self, transformation, parts, sign):
+        ledger = self._ledger
+        if parts is None:
+            # Zählmodus: Inputs aus dem Rezept
+            for pt, n in transformation.requirements.items():
+                ledger.current_value += sign * n * pt.value
+                ledger.cost += sign * n * pt.cost
+            return
+        for p in parts:
+            ledger.current_value += sign * p.type.value
+            ledger.cost += sign * p.type.cost
+
+    def _book_contents(self, sign):
+        for transformation, parts in zip(self.transformation, self.input_parts):
+            if transformation is not None:
+                self._book(transformation, parts, sign)
+
+    def _count_inputs(self, transformation, sign):
+        for tid, n in self.table.recipe(transformation):
+            self.input_counts[tid] += sign * n
+
+    def __len__(self):
+        return self._active
+
+    def __iter__(self):
+        # aktive Jobs in Startreihenfolge
+        active = [slot for slot, t in enumerate(self.transformation) if t is not None]
+        active.sort(key=self.seq.__getitem__)
+        for slot in active:
+            parts = self.input_parts[slot]
+            if parts is None:
+                parts = self.table.parts(self.transformation[slot])
+            yield Job(self.transformation[slot], parts, self.end_time[slot])
+
+    def add(self, transformation: Transformation, input_parts: list, end_time: int, seq: int):
+        """
+        Belegt einen freien Slot und liefert dessen Index.
+        Im Zählmodus werden input_parts verworfen und nur im Zählvektor input_counts erfasst.
+        """
+        if not self._free:
+            self._grow()
+        if self.table is not None:
+            input_parts = None
+            self._count_inputs(transformation, 1)
+        slot = self._free.pop()
+        self.transformation[slot] = transformation
+        self.input_parts[slot] = input_parts
+        self.end_time[slot] = end_time
+        self.seq[slot] = seq
+        self._active += 1
+        if self._ledger is not None:
+            self._book(transformation, input_parts, 1)
+        return slot
+
+    def release(self, slot: int):
+        """
+        Gibt einen Slot frei und liefert die Transformation des beendeten Jobs.
+        """
+        transformation = self.transformation[slot]
+        if self._ledger is not None:
+            self._book(transformation, self.input_parts[slot], -1)
+        if self.table is not None:
+            self._count_inputs(transformation, -1)
+        self.transformation[slot] = None
+        self.input_parts[slot] = None
+        self._free.append(slot)
+        self._active -= 1
+        return transformation
+
+    def _grow(self):
+        n = len(self.transformation)
+        self.transformation.extend([None] * n)
+        self.input_parts.extend([None] * n)
+        self.end_time.extend([0] * n)
+        self.seq.extend([0] * n)
+        self._free.extend(range(2 * n - 1, n - 1, -1))
+
+    def clear(self):
+        if self._ledger is not None:
+            self._book_contents(-1)
+        n = len(self.transformation)
+        self.transformation[:] = [None] * n
+        self.input_parts[:] = [None] * n
+        self._free = list(range(n - 1, -1, -1))
+        self._active = 0
+        if self.table is not None:
+            self.input_counts.fill(0)
+
+    def snapshot(self):
+        return (tuple(self.transformation), tuple(self.input_parts), tuple(self.end_time), tuple(self.seq),
+                tuple(self._free), self._active)
+
+    def restore(self, snap):
+        if self._ledger is not None:
+            self._book_contents(-1)
+        (transformation, input_parts, end_time, seq, free, self._active) = snap
+        self.transformation = list(transformation)
+        self.input_parts = list(input_parts)
+        if self._ledger is not None:
+            self._book_contents(1)
+        if self.table is not None:
+            self.input_counts.fill(0)
+            for t in self.transformation:
+                if t is not None:
+                    self._count_inputs(t, 1)
+        self.end_time = list(end_time)
+        self.seq = list(seq)
+        self._free = list(free)
+
+    def nbytes(self):
+        """
+        Geschätzter Speicherbedarf in Bytes (Spalten und die in Jobs gebundenen Part-Objekte).
+        """
+        total = sys.getsizeof(self) + sum(sys.getsizeof(col) for col in
+                                          (self.transformation, self.input_parts, self.end_time, self.seq, self._free))
+        if self.input_counts is not None:
+            total += self.input_counts.nbytes
+        for parts in self.input_parts:
+            if parts is not None:
+                total += sys.getsizeof(parts) + sum(sys.getsizeof(p) + sys.getsizeof(p.id) for p in parts)
+        return total
+
+
 class Product:
     def __init__(self, name: str, part_type: PartType, sale_value: float):
         """
@@ -72,24 +752,42 @@ class Machine:
         """
         self.machine_type = machine_type
         self.machine_id = machine_id
-        self.input_buffer = []  # Liste von Parts, die auf Transformation warten.
-        self.output_buffer = []  # Ergebnisse abgeschlossener Transformationen, die noch nicht in den globalen Puffer übertragen wurden.
-        self.current_jobs = []  # Liste aktiver Jobs; jeder Job ist ein Dict mit "transformation", "input_parts" und "remaining_time".
+        self.input_buffer = PartBuffer()  # Parts, die auf Transformation warten.
+        self.output_buffer = PartBuffer()  # Ergebnisse abgeschlossener Transformationen, die noch nicht in den globalen Puffer übertragen wurden.
+        self.current_jobs = JobTable(machine_type.slots)  # Aktive Jobs; Iteration liefert Job-Records (transformation, input_parts, end_time).
         self.transformation_priority = list(machine_type.transformations)
         self.connected_machines = []  # Liste anderer Maschinen – wird extern gesetzt.
+        # Ereigniskern: lokale Uhr und Prioritätswarteschlange (end_time, seq, slot) der Job-Fertigstellungen.
+        self.clock = 0
+        self.completion_queue = []
+        self._job_seq = 0
+        self.part_table = None  # PartTokens im Zählmodus (siehe use_counts)
+
+    def use_counts(self, table: PartTokens):
+        """
+        Schaltet die (leere) Maschine in den Zählmodus: Input-Puffer als reiner Zählvektor (Entnahme nur typweise),
+        Output-Puffer als Zählvektor mit Einfügereihenfolge, Job-Tabelle ohne gespeicherte Input-Parts.
+        Fertigstellungen liefern dann die anonymen Parts aus table; die Part-IDs werden weiterhin gezählt.
+        """
+        self.part_table = table
+        self.input_buffer = CountBuffer(table, ordered=False)
+        self.output_buffer = CountBuffer(table)
+        self.current_jobs = JobTable(self.machine_type.slots, table)
+
+    def set_ledger(self, ledger):
+        """
+        Bucht Input-/Output-Puffer und laufende Jobs dieser Maschine in das Bewertungsobjekt ledger.
+        """
+        self.input_buffer.set_ledger(ledger)
+        self.output_buffer.set_ledger(ledger)
+        self.current_jobs.set_ledger(ledger)
 
     def can_start_transformation(self, transformation: Transformation):
         """
         Prüft, ob ausreichend passende Parts im Input-Puffer vorhanden sind, um diese Transformation zu starten.
         """
-        required = {}
-        for pt in transformation.input_types:
-            required[pt.name] = required.get(pt.name, 0) + 1
-        available = {}
-        for part in self.input_buffer:
-            available[part.type.name] = available.get(part.type.name, 0) + 1
-        for pt_name, count in required.items():
-            if available.get(pt_name, 0) < count:
+        for pt, count in transformation.requirements.items():
+            if self.input_buffer.count_of(pt) < count:
                 return False
         return True
 
@@ -97,70 +795,124 @@ class Machine:
         """
         Entfernt die notwendigen Parts aus dem Input-Puffer und startet einen neuen Job.
         """
-        required = {}
-        for pt in transformation.input_types:
-            required[pt.name] = required.get(pt.name, 0) + 1
         input_parts = []
-        new_input_buffer = []
-        for part in self.input_buffer:
-            if part.type.name in required and required[part.type.name] > 0:
-                input_parts.append(part)
-                required[part.type.name] -= 1
-            else:
-                new_input_buffer.append(part)
-        self.input_buffer = new_input_buffer
-        job = {
-            "transformation": transformation,
-            "input_parts": input_parts,
-            "remaining_time": transformation.duration
-        }
-        self.current_jobs.append(job)
+        for pt, count in transformation.requirements.items():
+            input_parts.extend(self.input_buffer.take(pt, count))
+        end_time = self.clock + transformation.duration
+        slot = self.current_jobs.add(transformation, input_parts, end_time, self._job_seq)
+        heapq.heappush(self.completion_queue, (end_time, self._job_seq, slot))
+        self._job_seq += 1
         return part_id_counter
 
+    def remaining_time(self, job: Job):
+        """
+        Verbleibende Dauer eines laufenden Jobs (aus der Fertigstellungszeit abgeleitet).
+        """
+        return job.end_time - self.clock
+
+    def next_completion(self):
+        """
+        Anzahl Zeitschritte bis zur nächsten Job-Fertigstellung oder None, falls kein Job läuft.
+        """
+        if not self.completion_queue:
+            return None
+        return max(1, self.completion_queue[0][0] - self.clock)
+
     def progress_jobs(self, part_id_counter: int, final_product_mapping: dict):
         """
-        Reduziert die verbleibende Dauer der laufenden Jobs.
+        Schreitet um einen Zeitschritt voran.
         Ist ein Job abgeschlossen, wird ein neuer Part gemäß der Output-Definition erzeugt und in den Output-Puffer gelegt.
         final_product_mapping: Dictionary, das angibt, ob ein PartType als final gilt.
         """
+        return self.advance(1, part_id_counter)
+
+    def advance(self, dt: int, part_id_counter: int):
+        """
+        Schreitet um dt Zeitschritte voran und schließt alle bis dahin fälligen Jobs ab.
+        Die Kosten hängen nur von der Anzahl der Fertigstellungen ab, nicht von dt oder der Anzahl laufender Jobs.
+        """
+        self.clock += dt
         completed = []
-        for job in self.current_jobs.copy():
-            job["remaining_time"] -= 1
-            if job["remaining_time"] <= 0:
-                transformation = job["transformation"]
+        queue = self.completion_queue
+        while queue and queue[0][0] <= self.clock:
+            _, _, slot = heapq.heappop(queue)
+            transformation = self.current_jobs.release(slot)
+            if self.part_table is None:
                 new_part = Part(part_id_counter, transformation.output_type)
-                part_id_counter += 1
-                self.output_buffer.append(new_part)
-                self.current_jobs.remove(job)
-                completed.append(new_part)
+            else:
+                new_part = self.part_table.token(transformation.output_type)
+            part_id_counter += 1
+            self.output_buffer.append(new_part)
+            completed.append(new_part)
         return part_id_counter, completed
 
+    def snapshot(self):
+        """
+        Erfasst den veränderlichen Zustand der Maschine als unveränderliches Tupel.
+        Parts und Input-Listen der Jobs werden nach ihrer Erzeugung nicht mehr verändert und daher nur referenziert.
+        """
+        return (self.input_buffer.snapshot(), self.output_buffer.snapshot(), self.current_jobs.snapshot(),
+                tuple(self.completion_queue), tuple(self.transformation_priority), self.clock, self._job_seq)
+
+    def restore(self, snap):
+        """
+        Stellt den mit snapshot() erfassten Zustand wieder her (derselbe Snapshot kann mehrfach verwendet werden).
+        """
+        (inp, out, jobs, queue, priority, self.clock, self._job_seq) = snap
+        self.input_buffer.restore(inp)
+        self.output_buffer.restore(out)
+        self.current_jobs.restore(jobs)
+        self.completion_queue = list(queue)  # flache Kopie einer Heap-Liste ist wieder ein gültiger Heap
+        self.transformation_priority = list(priority)
+
     def reset(self):
         """
         Setzt die Maschine auf den Anfangszustand zurück.
         """
-        self.input_buffer = []
-        self.output_buffer = []
-        self.current_jobs = []
+        self.input_buffer.clear()
+        self.output_buffer.clear()
+        self.current_jobs.clear()
         self.transformation_priority = list(self.machine_type.transformations)
+        self.clock = 0
+        self.completion_queue = []
+        self._job_seq = 0
 
 
 class Anlage:
-    def __init__(self, machines: list, timestep: float, input_parts: list, all_part_types: list):
+    def __init__(self, machines: list, timestep: float, input_parts: list, all_part_types: list,
+                 part_identity: bool = True):
         """
         Die Fertigungsanlage, bestehend aus einer Menge von Maschinen, einem globalen Puffer und weiteren Parametern.
         machines: Liste von Machine-Objekten.
         timestep: Startzeit bzw. aktueller Zeitschritt.
         input_parts: Liste von externen Input-Parts.
         all_part_types: Liste aller im System vorkommenden PartTypes.
+        part_identity: True = jedes Teil ist ein eigenes Part-Objekt mit ID (PartBuffer, Job-Inputs als Listen).
+                       False = Zählmodus: alle Puffer und Job-Tabellen führen Zählvektoren je Typ-ID (CountBuffer,
+                       JobTable mit input_counts); herausgegeben werden geteilte anonyme Parts (id None). Speicher und
+                       Kosten hängen nicht von der Stückzahl ab; Reihenfolge im globalen Puffer und in den
+                       Output-Puffern, Bewertung (cost/current_value) und Fertigstellungen wie im Objektmodell.
         """
         self.machines = machines
         self.timestep = timestep
         self.input_parts = input_parts
         self.all_part_types = all_part_types
-        self.global_buffer = []  # Zunächst leer.
+        self.part_identity = part_identity
+        if part_identity:
+            self.part_table = None
+            self.global_buffer = PartBuffer()  # Zunächst leer.
+        else:
+            self.part_table = PartTokens(all_part_types)
+            self.global_buffer = CountBuffer(self.part_table)
+            for machine in self.machines:
+                machine.use_counts(self.part_table)
+        # Laufende Bewertung des Umlaufbestands: alle Puffer und Jobs buchen Zu- und Abgänge direkt hier.
         self.cost = 0
         self.current_value = 0
+        self.check_accounting = False  # Debug: wip_profit() gegen vollständigen Scan prüfen
+        self.global_buffer.set_ledger(self)
+        for machine in self.machines:
+            machine.set_ledger(self)
 
         # Berechne elementare PartTypes: jene, die nie als Output einer Transformation erscheinen (als Rohmaterial).
         self.elementary_part_types = self.compute_elementary_part_types()
@@ -194,35 +946,108 @@ class Anlage:
            solange noch Platz vorhanden ist.
         2. Anschließend, falls noch freie Plätze existieren, werden diese gleichmäßig mit elementaren Parts
            (Rohprodukten) befüllt.
+        Liefert die Anzahl neu erzeugter Rohteile.
         """
-        free_slots = capacity - len(self.global_buffer)
-        # Schritt 1: Transfer aus den Output-Puffern.
-        while free_slots > 0:
-            any_transfer = False
-            for machine in self.machines:
-                while machine.output_buffer and free_slots > 0:
-                    part = machine.output_buffer.pop(0)
-                    self.global_buffer.append(part)
-                    free_slots -= 1
-                    any_transfer = True
-            if not any_transfer:
+        # Schritt 1: Transfer aus den Output-Puffern (jeweils die ältesten Teile, als Block).
+        for machine in self.machines:
+            if len(self.global_buffer) >= capacity:
                 break
+            self.global_buffer.refill_from(machine.output_buffer, capacity)
+        free_slots = capacity - len(self.global_buffer)
 
         # Schritt 2: Falls freie Plätze bleiben, gleichmäßig mit elementaren PartTypes befüllen.
         if free_slots > 0:
             if not self.elementary_part_types:
                 self.elementary_part_types = [self.all_part_types[0]]
             num_elem = len(self.elementary_part_types)
-            for i in range(free_slots):
-                pt = self.elementary_part_types[i % num_elem]
-                new_part = Part(self.next_part_id(), pt)
-                self.global_buffer.append(new_part)
+            if self.part_table is None:
+                self.global_buffer.extend(Part(self.next_part_id(), self.elementary_part_types[i % num_elem])
+                                          for i in range(free_slots))
+            else:
+                # Zählmodus: anonyme Parts, die IDs werden nur weitergezählt
+                tokens = [self.part_table.token(pt) for pt in self.elementary_part_types]
+                self.global_buffer.extend(tokens[i % num_elem] for i in range(free_slots))
+                self.part_id_counter += free_slots
+            return free_slots
+        return 0
+
+    def wip_profit(self):
+        """
+        Wert minus Kosten des gesamten Umlaufbestands (globaler Puffer, Maschinenpuffer, Job-Inputs) in O(1).
+        Mit check_accounting=True wird das Ergebnis gegen full_scan_profit() geprüft.
+        """
+        profit = self.current_value - self.cost
+        if self.check_accounting:
+            expected = self.full_scan_profit()
+            if abs(profit - expected) > 1e-6 * max(1.0, abs(expected)):
+                raise RuntimeError(f"WIP-Bewertung inkonsistent: laufend {profit}, Scan {expected}")
+        return profit
+
+    def full_scan_profit(self):
+        """
+        Bewertung des Umlaufbestands durch vollständigen Scan aller Puffer und Jobs (Referenz für Debugging).
+        """
+        val = cost = 0.0
+        for buf in [self.global_buffer] + [m.input_buffer for m in self.machines] + [m.output_buffer for m in self.machines]:
+            for p in buf:
+                val += p.type.value; cost += p.type.cost
+        for m in self.machines:
+            for job in m.current_jobs:
+                for p in job.input_parts:
+                    val += p.type.value; cost += p.type.cost
+        return val - cost
+
+    def next_event_delay(self):
+        """
+        Zeitschritte bis zur nächsten Job-Fertigstellung über alle Maschinen oder None, falls keine Jobs laufen.
+        """
+        delays = [d for d in (m.next_completion() for m in self.machines) if d is not None]
+        return min(delays) if delays else None
+
+    def snapshot(self):
+        """
+        Erfasst den gesamten veränderlichen Zustand der Anlage (globaler Puffer, Maschinenpuffer, Jobs,
+        Prioritäten, Zähler, Zeitschritt) für Lookahead/Rollback. Kosten O(Umlaufbestand) flacher Kopien,
+        ohne die Part-Objekte selbst zu kopieren.
+        """
+        return (self.global_buffer.snapshot(), [m.snapshot() for m in self.machines],
+                self.part_id_counter, self.timestep, self.cost, self.current_value)
+
+    def restore(self, snap):
+        """
+        Stellt einen mit snapshot() erfassten Zustand wieder her.
+        Die Puffer werden in-place ersetzt, damit bestehende Referenzen (z.B. in Envs) gültig bleiben.
+        """
+        (global_buffer, machine_snaps, self.part_id_counter, self.timestep, cost, current_value) = snap
+        self.global_buffer.restore(global_buffer)
+        for machine, machine_snap in zip(self.machines, machine_snaps):
+            machine.restore(machine_snap)
+        # Bewertung exakt aus dem Snapshot übernehmen (keine Rundungsdrift über viele Rollbacks)
+        self.cost, self.current_value = cost, current_value
+
+    def memory_report(self):
+        """
+        Geschätzter Speicherbedarf (Bytes) je Teilsystem der Anlage, um das Wachstum über lange Läufe zu überwachen.
+        """
+        report = {
+            "global_buffer": self.global_buffer.nbytes(),
+            "input_buffers": sum(m.input_buffer.nbytes() for m in self.machines),
+            "output_buffers": sum(m.output_buffer.nbytes() for m in self.machines),
+            "job_tables": sum(m.current_jobs.nbytes() for m in self.machines),
+            "completion_queues": sum(sys.getsizeof(m.completion_queue) + sum(sys.getsizeof(e) for e in m.completion_queue)
+                                     for m in self.machines),
+        }
+        report["total"] = sum(report.values())
+        report["parts"] = (len(self.global_buffer)
+                           + sum(len(m.input_buffer) + len(m.output_buffer) for m in self.machines)
+                           + sum(len(job.input_parts) for m in self.machines for job in m.current_jobs))
+        return report
 
     def reset(self):
         """
         Setzt die Anlage inklusive aller Maschinen und globaler Variablen zurück.
         """
-        self.global_buffer = []
+        self.global_buffer.clear()
         for machine in self.machines:
             machine.reset()
         self.timestep = 0
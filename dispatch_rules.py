@@ -0,0 +1,137 @@
+# File: dispatch_rules.py
+# Klassische Prioritätsregeln als vektorisierte Policies auf dem Aktionsraum von FlexibleJobShopEnv
+# (FIFO, SPT, MWKR, Least-Loaded, Goal-Distance) mit derselben predict-Schnittstelle wie MaskablePPO
+import numpy as np
+
+from flexible_jobshop_env import OBS_MODES
+from plant_bounds import work_remaining
+from plant_index import compile_plant
+
+RULES = ("fifo", "spt", "mwkr", "least_loaded", "goal_distance")
+
+
+class DispatchPolicy:
+    """
+    Regelbasierte Low-Level-Policy. Bewertet alle Aktionen (Maschine, Transformation) eines Batches von
+    Observations aus FlexibleJobShopEnv und wählt die gültige Aktion mit der höchsten Priorität;
+    noop nur, wenn keine fähige Maschine eine gültige Transformation starten kann.
+
+    rule:
+    fifo: Transformation, die das älteste Teil im globalen Puffer verbraucht.
+    spt: kürzeste Bearbeitungszeit (Transformation.duration).
+    mwkr: meiste Restarbeit (Dauer plus längste nachgelagerte Bearbeitung bis zum Endprodukt).
+    least_loaded: Maschine mit der geringsten Auslastung (laufende Jobs und wartende Inputs je Slot).
+    goal_distance: Output mit der kleinsten Distanz zum Ziel im Produktionsgraphen.
+    Gleichstände entscheidet die Auslastung der Maschine (außer bei least_loaded: die Dauer).
+
+    Aufruf mit (Observations, Masken) wie LowLevelPolicy; predict() entspricht MaskablePPO.predict.
+    compact_actions, obs_mode: Aktions- und Observation-Kodierung wie in FlexibleJobShopEnv.
+    fifo braucht die Reihenfolge im globalen Puffer und ist daher nur mit obs_mode="slots" möglich.
+    """
+    def __init__(self, anlage, rule: str = "fifo", max_buffer: int = 10, compact_actions: bool = False,
+                 obs_mode: str = "slots"):
+        if rule not in RULES:
+            raise ValueError(f"Unbekannte Regel '{rule}', erlaubt: {', '.join(RULES)}")
+        if obs_mode not in OBS_MODES:
+            raise ValueError(f"Unbekannter obs_mode '{obs_mode}', erlaubt: {', '.join(OBS_MODES)}")
+        if rule == "fifo" and obs_mode != "slots":
+            raise ValueError("fifo braucht die Pufferreihenfolge und damit obs_mode='slots'")
+        self.rule = rule
+        self.obs_mode = obs_mode
+        self.index = index = compile_plant(anlage)
+        self.max_buffer = max_buffer
+        n_types, n_machines = index.n_types, index.n_machines
+        # statische Tabellen je Aktion (ohne noop) über Maschine und Transformation der Aktion
+        self._action_m, self._action_t, _ = index.action_layout(compact_actions)
+        self.n_actions = 1 + len(self._action_m)
+        # Lage der Blöcke in der Observation (siehe FlexibleJobShopEnv._get_observation bzw. _init_count_observation)
+        if obs_mode == "slots":
+            self._machine_slice = slice(max_buffer, max_buffer + n_machines * (3 + n_types))
+        else:
+            self._inputs_slice = slice(n_types, n_types + n_machines * n_types)
+            self._occupancy_slice = slice(n_types + n_machines * n_types, n_types + n_machines * (n_types + 1))
+        self._goal_slice = slice(-n_types, None)
+        self._uses = index.requirements > 0                       # Transformation x Typ
+        self._capable = index.capability[self._action_m, self._action_t]
+        self._durations = index.durations[self._action_t].astype(np.float64)
+        self._slots = index.slots[self._action_m].astype(np.float64)
+        self._mwkr = (index.durations + work_remaining(index)[index.output_ids])[self._action_t]
+        dist = index.goal_distances[index.output_ids]              # Transformation x Ziel
+        self._goal_dist = np.where(np.isfinite(dist), dist, index.n_types + 1.0)[self._action_t]
+
+    def _load(self, obs):
+        # Auslastung je Aktion: (wartende Inputs + laufende Jobs) / Slots der Maschine
+        if self.obs_mode == "counts":
+            inputs = obs[:, self._inputs_slice].reshape(len(obs), self.index.n_machines, -1).sum(axis=2)
+            occupancy = obs[:, self._occupancy_slice]              # laufende Jobs / Slots
+            return inputs[:, self._action_m] / self._slots + occupancy[:, self._action_m]
+        machines = obs[:, self._machine_slice].reshape(len(obs), self.index.n_machines, -1)
+        load = (machines[:, :, 0] + machines[:, :, 2])[:, self._action_m]
+        return load / self._slots
+
+    def _buffer_counts(self, obs):
+        # Zählvektor des globalen Puffers je Observation
+        n_types = self.index.n_types
+        if self.obs_mode == "counts":
+            return obs[:, :n_types].astype(np.int64)
+        return np.stack([np.bincount(b, minlength=n_types + 1)[:n_types]
+                         for b in obs[:, :self.max_buffer].astype(np.int64)])
+
+    def _fifo(self, obs):
+        # Position des ältesten Teils je Typ im globalen Puffer (max_buffer, falls nicht vorhanden)
+        buf = obs[:, :self.max_buffer].astype(np.int64)
+        n_types = self.index.n_types
+        pos = np.full((len(obs), n_types + 1), self.max_buffer, dtype=np.int64)
+        rows = np.repeat(np.arange(len(obs)), self.max_buffer)
+        slots = np.tile(np.arange(self.max_buffer), len(obs))
+        np.minimum.at(pos, (rows, buf.reshape(-1)), slots)
+        oldest = np.where(self._uses[None], pos[:, None, :n_types], self.max_buffer).min(axis=2)
+        return -oldest[:, self._action_t].astype(np.float64)
+
+    def scores(self, obs):
+        """
+        Priorität je Aktion ohne noop (B x n_actions-1); größer ist besser.
+        """
+        obs = np.asarray(obs, dtype=np.float32).reshape(len(obs), -1)
+        load = self._load(obs)
+        # Nebenkriterium in [0, 0.5): entscheidet nur Gleichstände ganzzahliger Hauptkriterien
+        tie = 0.5 / (1.0 + load)
+        if self.rule == "fifo":
+            return self._fifo(obs) + tie
+        if self.rule == "spt":
+            return -self._durations + tie
+        if self.rule == "mwkr":
+            return self._mwkr + tie
+        if self.rule == "least_loaded":
+            return -load - 1e-3 * self._durations / self._durations.max()
+        goal = obs[:, self._goal_slice]
+        if not goal.any():
+            return tie
+        dist = self._goal_dist @ goal.T                           # Aktion x Batch (Ziel-One-Hot)
+        return -dist.T + tie
+
+    def __call__(self, obs, masks=None):
+        obs = np.asarray(obs, dtype=np.float32).reshape(len(obs), -1)
+        if masks is None:
+            # Maske aus dem Zählvektor des globalen Puffers (bei obs_mode="slots" nur die ersten max_buffer Teile)
+            valid = self.index.feasible_transformations(self._buffer_counts(obs))[:, self._action_t]
+        else:
+            valid = np.asarray(masks, dtype=bool).reshape(len(obs), -1)[:, 1:]
+        valid = valid & self._capable
+        scores = np.where(valid, self.scores(obs), -np.inf)
+        best = scores.argmax(axis=1)
+        return np.where(valid.any(axis=1), best + 1, 0)
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True, action_masks=None):
+        """
+        Gleiche Schnittstelle wie MaskablePPO.predict: einzelne Observation -> Aktion (Skalar-Array),
+        Batch -> Aktionen (B,). Rückgabe (Aktionen, None). Die Regeln sind deterministisch.
+        """
+        observation = np.asarray(observation, dtype=np.float32)
+        single = observation.ndim == 1
+        obs = observation[None] if single else observation
+        masks = None
+        if action_masks is not None:
+            masks = np.asarray(action_masks, dtype=bool).reshape(len(obs), -1)
+        actions = self(obs, masks)
+        return (actions[0] if single else actions), None
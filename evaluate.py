@@ -0,0 +1,258 @@
+# File: evaluate.py
+# Parallele Evaluation vieler geseedeter Episoden über einen Prozesspool (je Worker eine eigene Anlage)
+# mit Verteilungen und Konfidenzintervallen für Reward, Endprodukte, Makespan, WIP und Deadline-Verfehlungen
+import argparse
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from flexible_jobshop_env import OBS_MODES, FlexibleJobShopEnv
+from hierarchical_env import HighLevelEnv
+from manufacturing_structure import MAX_HL_STEPS, REQUIRED_PRODUCTS, SUBGOALS, build_anlage
+from model_encoding import DEFAULT_ENCODING, check_encoding, load_encoding
+from plant_bounds import plant_bounds
+
+LL_EPISODE_STEPS = 500
+
+
+def load_policy(source: str, anlage, max_buffer: int = 10, compact_actions: bool = False, obs_mode: str = "slots"):
+    """
+    Policy aus einer Quellangabe:
+    "rule:<name>" -> DispatchPolicy, "*.npz" -> NumpyPolicy, "*.zip" -> MaskablePPO,
+    "numpy:<zip>" -> NumpyPolicy aus einem (bei Bedarf exportierten) SB3-Zip.
+    compact_actions, obs_mode gelten nur für Regeln; Modelle bringen ihre Kodierung mit (siehe resolve_encoding).
+    """
+    if source.startswith("rule:"):
+        from dispatch_rules import DispatchPolicy
+        return DispatchPolicy(anlage, source[len("rule:"):], max_buffer=max_buffer, compact_actions=compact_actions,
+                              obs_mode=obs_mode)
+    if source.startswith("numpy:"):
+        from production_process_with_rl import load_policy as load_numpy
+        return load_numpy(source[len("numpy:"):])
+    if source.endswith(".npz"):
+        from numpy_policy import NumpyPolicy
+        return NumpyPolicy.load(source)
+    from sb3_contrib import MaskablePPO
+    return MaskablePPO.load(source, device="cpu")
+
+
+def _model_file(source):
+    # Modelldatei einer Quellangabe, None für Regeln
+    if source is None or source.startswith("rule:"):
+        return None
+    return source[len("numpy:"):] if source.startswith("numpy:") else source
+
+
+def resolve_encoding(sources, compact_actions=None, obs_mode=None) -> dict:
+    """
+    Env-Kodierung für die Policies in sources: nicht gesetzte Optionen (None) werden aus den Metadaten der
+    Modelle übernommen (model_encoding), sonst gilt die Standardkodierung. ValueError, wenn ein Modell mit einer
+    anderen Kodierung trainiert wurde oder zwei Modelle sich widersprechen.
+    """
+    models = [path for path in map(_model_file, sources) if path is not None]
+    stored = load_encoding(models[0]) if models else DEFAULT_ENCODING
+    compact_actions = stored["compact_actions"] if compact_actions is None else compact_actions
+    obs_mode = stored["obs_mode"] if obs_mode is None else obs_mode
+    for path in models:
+        check_encoding(path, compact_actions, obs_mode)
+    return {"compact_actions": bool(compact_actions), "obs_mode": obs_mode}
+
+
+def _seed_policy(policy, seed):
+    # stochastische Policies je Episode reproduzierbar machen
+    if hasattr(policy, "set_random_seed"):
+        policy.set_random_seed(seed)
+    elif hasattr(policy, "rng"):
+        policy.rng = np.random.default_rng(seed)
+
+
+def _batch_policy(policy, deterministic):
+    # predict-Schnittstelle -> Funktion (Observations, Masken) -> Aktionen für HighLevelEnv
+    def act(obs, masks):
+        return policy.predict(obs, deterministic=deterministic, action_masks=masks)[0]
+    return act
+
+
+def _wip(anlage):
+    # Teile im System: globaler Puffer, Maschinenpuffer und Inputs laufender Jobs
+    n = len(anlage.global_buffer)
+    for m in anlage.machines:
+        n += len(m.input_buffer) + len(m.output_buffer) + sum(len(job.input_parts) for job in m.current_jobs)
+    return n
+
+
+class _Worker:
+    """
+    Zustand eines Worker-Prozesses: eigene Anlage, Env und einmal geladene Policies.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.anlage = build_anlage()
+        required = config["required_products"]
+        compact, obs_mode = config["compact_actions"], config["obs_mode"]
+        if config["hl"] is not None:
+            ll = None
+            if config["ll"]:
+                ll = load_policy(config["ll"], self.anlage, compact_actions=compact, obs_mode=obs_mode)
+            self.ll = ll
+            self.env = HighLevelEnv(self.anlage, SUBGOALS, required, max_steps=config["max_steps"],
+                                    ll_policy=_batch_policy(ll, config["deterministic"]) if ll is not None else None,
+                                    compact_actions=compact, obs_mode=obs_mode)
+            self.hl = load_policy(config["hl"], self.anlage)
+            self.ll_env = self.env.ll
+        else:
+            self.ll = load_policy(config["ll"], self.anlage, compact_actions=compact, obs_mode=obs_mode)
+            self.hl = None
+            self.env = self.ll_env = FlexibleJobShopEnv(self.anlage, max_steps=config["max_steps"],
+                                                        compact_actions=compact, obs_mode=obs_mode)
+        self.final_ids = {rp["part_type"]: self.ll_env.index.name_ids[rp["part_type"]] for rp in required}
+        # Deadlines zählen in High-Level-Schritten; im Low-Level-Modus entspricht ein High-Level-Schritt
+        # MAX_HL_STEPS Low-Level-Schritten (so viele Ticks führt HighLevelEnv je Subgoal aus)
+        self.steps_per_deadline_unit = 1 if self.hl is not None else MAX_HL_STEPS
+
+    def _mask(self):
+        return self.env.action_masks() if self.hl is not None else self.env.get_action_mask()
+
+    def episode(self, seed):
+        cfg = self.config
+        required = cfg["required_products"]
+        rng = np.random.default_rng(seed)
+        policy = self.hl if self.hl is not None else self.ll
+        _seed_policy(policy, seed)
+        if self.hl is not None and self.ll is not None:
+            _seed_policy(self.ll, seed + 1)
+        if self.hl is None:
+            # Low-Level-Evaluation: Ziel je Episode aus den geforderten Produkten
+            self.env.goal = required[rng.integers(len(required))]["part_type"]
+        obs, _ = self.env.reset(seed=seed)
+        total, done, step, wip = 0.0, False, 0, []
+        reached = {}   # Produkt -> High-Level-Schritt, in dem die geforderte Stückzahl erreicht wurde
+        makespan = math.nan
+        while not done:
+            action, _ = policy.predict(obs, deterministic=cfg["deterministic"], action_masks=self._mask())
+            obs, reward, terminated, truncated, _ = self.env.step(int(action))
+            done = terminated or truncated
+            total += reward
+            step += 1
+            wip.append(_wip(self.anlage))
+            for rp in required:
+                name = rp["part_type"]
+                if name not in reached and self.ll_env.completed[self.final_ids[name]] >= rp["count"]:
+                    reached[name] = math.ceil(step / self.steps_per_deadline_unit)
+            if math.isnan(makespan) and len(reached) == len(required):
+                makespan = float(self.anlage.timestep)
+        targets = {rp["part_type"]: rp["count"] for rp in required}
+        result = {"reward": total, "makespan": makespan,
+                  "makespan_gap": plant_bounds(self.anlage).optimality_gap(makespan, targets),
+                  "mean_wip": float(np.mean(wip)),
+                  "max_wip": float(np.max(wip)),
+                  "deadline_misses": sum(1 for rp in required if reached.get(rp["part_type"], math.inf) > rp["deadline"])}
+        for name, tid in self.final_ids.items():
+            result[f"finished_{name}"] = int(self.ll_env.completed[tid])
+        return result
+
+
+_worker = None
+
+
+def _init_worker(config):
+    global _worker
+    _worker = _Worker(config)
+    if "torch" in sys.modules:
+        # ein Thread je Prozess, sonst konkurrieren die Worker um die Kerne
+        sys.modules["torch"].set_num_threads(1)
+
+
+def _run_seeds(seeds):
+    return [_worker.episode(seed) for seed in seeds]
+
+
+def summarize(values, confidence_z=1.96):
+    """
+    Mittelwert, Standardabweichung, Normal-Konfidenzintervall (95 %) des Mittelwerts und Perzentile.
+    NaN-Werte (z.B. nie erreichter Makespan) werden ausgelassen und als Anteil "missing" ausgewiesen.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    valid = x[~np.isnan(x)]
+    n = len(valid)
+    summary = {"n": n, "missing": float(1.0 - n / len(x)) if len(x) else 0.0}
+    if n == 0:
+        return summary
+    mean = float(valid.mean())
+    std = float(valid.std(ddof=1)) if n > 1 else 0.0
+    half = confidence_z * std / math.sqrt(n)
+    summary.update({"mean": mean, "std": std, "ci95": [mean - half, mean + half],
+                    "p5": float(np.percentile(valid, 5)), "p50": float(np.percentile(valid, 50)),
+                    "p95": float(np.percentile(valid, 95))})
+    return summary
+
+
+def evaluate(ll=None, hl=None, n_episodes=200, n_workers=None, seed=0, deterministic=False,
+             required_products=REQUIRED_PRODUCTS, max_steps=None, compact_actions=None, obs_mode=None):
+    """
+    Evaluiert eine Policy über n_episodes geseedete Episoden.
+    hl gesetzt: hierarchisch (HighLevelEnv, ll als Low-Level-Policy bzw. erste gültige Aktion bei ll=None).
+    nur ll: Low-Level-Env mit Ziel je Episode aus required_products.
+    Policies als Quellangabe (siehe load_policy), damit jeder Worker sie selbst lädt.
+    deterministic: bei False werden Aktionen der Modelle gesampelt (mit dem Episoden-Seed reproduzierbar).
+    Deadlines in required_products gelten in High-Level-Schritten (wie in HighLevelEnv), Makespan in Ticks.
+    compact_actions, obs_mode: Env-Kodierung; None übernimmt sie aus den Metadaten der Modelle (resolve_encoding).
+    Liefert {"config": ..., "metrics": {Metrik: summarize(...)}, "episodes": [...]}.
+    """
+    if ll is None and hl is None:
+        raise ValueError("Mindestens eine Policy (ll oder hl) angeben")
+    config = {"ll": ll, "hl": hl, "deterministic": deterministic, "required_products": required_products,
+              "max_steps": max_steps or (MAX_HL_STEPS if hl is not None else LL_EPISODE_STEPS),
+              **resolve_encoding([ll, hl], compact_actions, obs_mode)}
+    n_workers = n_workers or os.cpu_count()
+    seeds = [seed + i for i in range(n_episodes)]
+    # mehrere kleine Pakete je Worker gleichen unterschiedliche Episodendauern aus
+    n_chunks = min(n_episodes, 4 * n_workers)
+    chunks = [seeds[i::n_chunks] for i in range(n_chunks)]
+    if n_workers == 1:
+        _init_worker(config)
+        episodes = [ep for chunk in chunks for ep in _run_seeds(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(config,)) as pool:
+            episodes = [ep for result in pool.map(_run_seeds, chunks) for ep in result]
+    metrics = {name: summarize([ep[name] for ep in episodes]) for name in episodes[0]}
+    return {"config": config, "metrics": metrics, "episodes": episodes}
+
+
+def print_report(report):
+    print(f"{'metric':>20} {'mean':>10} {'95% CI':>23} {'p5':>9} {'p50':>9} {'p95':>9} {'missing':>8}")
+    for name, s in report["metrics"].items():
+        if s["n"] == 0:
+            print(f"{name:>20} {'-':>10}")
+            continue
+        lo, hi = s["ci95"]
+        print(f"{name:>20} {s['mean']:>10.2f} [{lo:>9.2f}, {hi:>9.2f}] {s['p5']:>9.2f} {s['p50']:>9.2f} "
+              f"{s['p95']:>9.2f} {s['missing']:>8.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallele Evaluation über viele geseedete Episoden")
+    parser.add_argument("--ll", help="Low-Level-Policy: *.zip (MaskablePPO), *.npz, numpy:<zip> oder rule:<regel>")
+    parser.add_argument("--hl", help="High-Level-Policy (hierarchische Evaluation): *.zip, *.npz oder numpy:<zip>")
+    parser.add_argument("--episodes", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--deterministic", action="store_true", help="Argmax statt gesampelter Aktionen")
+    parser.add_argument("--max-steps", type=int, default=None, help="Episodenlänge in Entscheidungsschritten")
+    parser.add_argument("--compact-actions", action="store_true", default=None,
+                        help="kompakte Aktionskodierung (Standard: aus den Metadaten der Modelle)")
+    parser.add_argument("--obs-mode", choices=OBS_MODES, default=None,
+                        help="Observation-Kodierung (Standard: aus den Metadaten der Modelle)")
+    parser.add_argument("--json", help="Bericht inkl. aller Episoden als JSON speichern")
+    args = parser.parse_args()
+    report = evaluate(ll=args.ll, hl=args.hl, n_episodes=args.episodes, n_workers=args.workers, seed=args.seed,
+                      deterministic=args.deterministic, max_steps=args.max_steps,
+                      compact_actions=args.compact_actions, obs_mode=args.obs_mode)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,157 @@
+# File: event_log.py
+# Streaming-Ereignisprotokoll der Simulation als JSON Lines mit gepufferten Schreibzugriffen,
+# dünnem Zeitindex (<log>.idx) und einem Reader, der nach Zeitbereich springt und nach Maschine/Typ filtert
+import bisect
+import json
+
+# Ereignistypen
+DISPATCH = "dispatch"          # Teile aus dem globalen Puffer in den Input-Puffer einer Maschine
+JOB_START = "job_start"
+JOB_COMPLETE = "job_complete"
+REFILL = "refill"              # neue Rohteile im globalen Puffer
+SALE = "sale"                  # fertiges Endprodukt verlässt die Anlage
+SUBGOAL = "subgoal"            # High-Level-Entscheidung
+SUBGOAL_END = "subgoal_end"    # Ende eines High-Level-Schritts (Reward, produzierte Stückzahlen)
+SNAPSHOT = "snapshot"          # Zählstand aller Puffer und Jobs (nur mit snapshot_every > 0)
+RESET = "reset"
+
+
+def _counts(buffer):
+    return {pt.name: n for pt, n in buffer.type_counts().items()}
+
+
+class EventLog:
+    """
+    Schreibt typisierte Ereignisse als eine JSON-Zeile je Ereignis: {"t": Zeit, "kind": Typ, ...}.
+    Die Zeit t ist über Episoden hinweg monoton (reset() setzt die lokale Simulationszeit auf die Logzeit auf),
+    daher kann EventReader über den Index direkt zu einem Zeitpunkt springen.
+
+    path: Zieldatei; der Index wird nach path + ".idx" geschrieben.
+    snapshot_every: 0 = nur Ereignisse, k > 0 = zusätzlich alle k Zeitschritte ein Zählstand der ganzen Anlage.
+    buffer_size: Schreibpuffer in Bytes; bei einem Absturz gehen höchstens so viele Bytes verloren.
+    index_every: Abstand (in Ereignissen) der Indexeinträge (Zeit, Byte-Offset).
+    """
+    def __init__(self, path: str, snapshot_every: int = 0, buffer_size: int = 1 << 16, index_every: int = 1024):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.index_every = index_every
+        self._file = open(path, "wb", buffering=buffer_size)
+        self._index = open(path + ".idx", "w", encoding="utf-8", buffering=1 << 12)
+        self._encode = json.JSONEncoder(separators=(",", ":")).encode
+        self._offset = 0
+        self._n_events = 0
+        self._t0 = 0        # Logzeit zu Beginn der aktuellen Episode
+        self._last_t = 0
+        self._last_snapshot = None
+
+    def emit(self, t: int, kind: str, **fields):
+        """
+        Schreibt ein Ereignis zur (episodenlokalen) Simulationszeit t. Die Zeiten müssen nichtfallend sein,
+        sonst würden Zeitbereichsabfragen des Readers Ereignisse überspringen.
+        """
+        t = self._t0 + t
+        if t < self._last_t:
+            raise ValueError(f"Ereignis zur Zeit {t} nach Ereignis zur Zeit {self._last_t}: Protokoll muss zeitlich monoton sein")
+        if self._n_events % self.index_every == 0:
+            self._index.write(f"{t} {self._offset}\n")
+        event = {"t": t, "kind": kind}  # "t" zuerst: der Reader liest die Zeit, ohne die Zeile zu parsen
+        event.update(fields)
+        line = (self._encode(event) + "\n").encode()
+        self._file.write(line)
+        self._offset += len(line)
+        self._n_events += 1
+        self._last_t = t
+
+    def reset(self):
+        """
+        Beginn einer neuen Episode: die lokale Zeit 0 wird an das Ende der bisherigen Logzeit gelegt.
+        """
+        if self._n_events:
+            self._t0 = self._last_t + 1
+        self._last_snapshot = None
+        self.emit(0, RESET)
+
+    def tick(self, t: int, anlage):
+        """
+        Wird nach jedem Zeitschritt aufgerufen; schreibt bei snapshot_every > 0 periodisch einen Zählstand.
+        """
+        k = self.snapshot_every
+        if k and (self._last_snapshot is None or t - self._last_snapshot >= k):
+            self._last_snapshot = t
+            self.snapshot(t, anlage)
+
+    def snapshot(self, t: int, anlage):
+        """
+        Zählstand der Anlage: Typ-Zählungen des globalen Puffers sowie je Maschine Input/Output und laufende Jobs.
+        """
+        self.emit(t, SNAPSHOT, global_buffer=_counts(anlage.global_buffer),
+                  machines={m.machine_id: {"input": _counts(m.input_buffer), "output": _counts(m.output_buffer),
+                                           "jobs": len(m.current_jobs)} for m in anlage.machines})
+
+    def flush(self):
+        self._file.flush()
+        self._index.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventReader:
+    """
+    Liest ein mit EventLog geschriebenes Protokoll zeilenweise, ohne die Datei vollständig zu laden.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._times, self._offsets = [], []
+        try:
+            with open(path + ".idx", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2:  # unvollständige letzte Zeile nach Absturz ignorieren
+                        self._times.append(int(parts[0]))
+                        self._offsets.append(int(parts[1]))
+        except FileNotFoundError:
+            pass
+
+    def _start_offset(self, t_start):
+        # letzter Indexeintrag mit Zeit < t_start: alle Ereignisse davor liegen sicher vor t_start
+        if t_start is None:
+            return 0
+        i = bisect.bisect_left(self._times, t_start) - 1
+        return self._offsets[i] if i >= 0 else 0
+
+    def events(self, t_start=None, t_end=None, machine=None, kinds=None):
+        """
+        Liefert Ereignisse (Dicts) mit t_start <= t <= t_end, optional nur einer Maschine (machine_id)
+        bzw. bestimmter Ereignistypen (kinds: Menge von Typen).
+        """
+        kinds = set(kinds) if kinds is not None else None
+        machine_key = f'"machine":{json.dumps(machine)}'.encode() if machine is not None else None
+        with open(self.path, "rb") as f:
+            f.seek(self._start_offset(t_start))
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # abgeschnittene letzte Zeile
+                # Zeit und Maschine auf Byte-Ebene prüfen, geparst werden nur passende Zeilen
+                t = int(line[5:line.index(b",", 5)])
+                if t_end is not None and t > t_end:
+                    break
+                if t_start is not None and t < t_start:
+                    continue
+                if machine_key is not None and machine_key not in line:
+                    continue
+                event = json.loads(line)
+                if kinds is not None and event["kind"] not in kinds:
+                    continue
+                yield event
+
+    def __iter__(self):
+        return self.events()
@@ -3,24 +3,43 @@
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
-from classes import Part
+from itertools import islice
+from classes import Part, DirtySet
+from event_log import DISPATCH, JOB_COMPLETE, JOB_START, REFILL, SALE
+from plant_index import compile_plant
 import networkx as nx
 
+# Observation-Kodierungen: "slots" = Typ-ID je Puffer-Slot (Dimension wächst mit max_buffer),
+# "counts" = Zählhistogramme je PartType und Maschinenlast (permutationsinvariant, unabhängig von max_buffer)
+OBS_MODES = ("slots", "counts")
+
 class FlexibleJobShopEnv(gym.Env):
-    def __init__(self, anlage, max_buffer=10, max_steps=50, gamma=0.99, goal=None):
+    def __init__(self, anlage, max_buffer=10, max_steps=50, gamma=0.99, goal=None, smdp=False, compact_actions=False,
+                 obs_mode="slots"):
         super().__init__()
         self.anlage = anlage
         self.machines = self.anlage.machines
         self.global_buffer = self.anlage.global_buffer
         self.part_types = self.anlage.all_part_types
         self.gamma = gamma
-        self.goal = goal  # goal part_type.name or None
+        self._goal = goal  # goal part_type.name or None
+        # smdp: Zeitschritte ohne Entscheidung (nur noop erlaubt) werden übersprungen,
+        # step() liefert dann die diskontierte Summe der Rewards bis zum nächsten Entscheidungspunkt.
+        self.smdp = smdp
+        # compact_actions: Aktionen nur für fähige (Maschine, Transformation)-Paare statt aller n_machines x
+        # n_transformations; Policy-Kopf und Maske wachsen dann mit der Zahl der fähigen Paare
+        self.compact_actions = compact_actions
+        if obs_mode not in OBS_MODES:
+            raise ValueError(f"Unbekannter obs_mode '{obs_mode}', erlaubt: {', '.join(OBS_MODES)}")
+        self.obs_mode = obs_mode
 
         self.empty_marker = len(self.part_types)
         self.max_buffer = max_buffer
         self.max_steps = max_steps
         self.current_step = 0
         self.part_id_counter = 0
+        # Fertigstellungen je Typ-ID seit reset() (aus den Ereignissen von progress_jobs/advance)
+        self.completed = np.zeros(len(self.part_types), dtype=np.int64)
 
         # build production graph
         self.prod_graph = nx.DiGraph()
@@ -31,123 +50,202 @@ class FlexibleJobShopEnv(gym.Env):
                 for inp in tr.input_types:
                     self.prod_graph.add_edge(inp.name, tr.output_type.name)
 
-        # transformations
-        unique_trans = {}
-        for m in self.machines:
-            for t in m.machine_type.transformations:
-                unique_trans[t] = True
-        self.unique_transformations = list(unique_trans.keys())
+        # transformations (kompilierter Index: Typ-IDs, Rezept- und Fähigkeitsmatrix)
+        self.index = compile_plant(self.anlage)
+        self.unique_transformations = self.index.transformations
         self.n_transformations = len(self.unique_transformations)
+        # Transformationen ohne Inputs können auch bei leerem Input-Puffer starten
+        self._sourceless = any(not t.requirements for t in self.unique_transformations)
         self.n_machines = len(self.machines)
-        self.n_actions = 1 + self.n_machines * self.n_transformations
+        # Aktionstabellen: Aktion a>0 -> (action_machines[a-1], action_transformations[a-1]),
+        # Paar (mi, ti) -> action_ids[mi, ti] (0 = nicht kodierbar)
+        self.action_machines, self.action_transformations, self.action_ids = self.index.action_layout(compact_actions)
+        self.n_actions = 1 + len(self.action_machines)
         self.action_space = spaces.Discrete(self.n_actions)
 
-        obs_dim = self.max_buffer + self.n_machines*(3 + len(self.part_types)) + len(self.part_types)
-        self.observation_space = spaces.Box(0, 100, shape=(obs_dim,), dtype=np.float32)
+        if obs_mode == "counts":
+            self._init_count_observation()
+        else:
+            obs_dim = self.max_buffer + self.n_machines*(3 + len(self.part_types)) + len(self.part_types)
+            self.observation_space = spaces.Box(0, 100, shape=(obs_dim,), dtype=np.float32)
+            # vorallokierte Observation mit Views auf Puffer-, Maschinen- und Zielblock
+            self._obs = np.zeros(obs_dim, dtype=np.float32)
+            self._obs_buffer = self._obs[:self.max_buffer]
+            self._obs_machines = self._obs[self.max_buffer:obs_dim - len(self.part_types)].reshape(self.n_machines, 3 + len(self.part_types))
+            self._obs_goal = self._obs[obs_dim - len(self.part_types):]
+            # statisch: welche PartTypes verarbeitet eine Maschine (hängt nur vom machine_type ab)
+            self._obs_machines[:, 3:] = (self.index.capability.astype(np.int64) @ (self.index.requirements > 0)) > 0
+        self._write_goal()
+        # inkrementelle Aktionsmaske: nur Transformationen mit geänderten Input-Typen werden neu geprüft
+        self._trans_by_type = {}
+        for ti, t in enumerate(self.unique_transformations):
+            for pt in t.requirements:
+                self._trans_by_type.setdefault(pt, []).append(ti)
+        self._feasible = np.zeros(self.n_transformations, dtype=np.int8)
+        self._mask = np.zeros(self.n_actions, dtype=np.int8)
+        self._mask[0] = 1
+        self._mask_dirty = DirtySet()
+        self.global_buffer.watch(self._mask_dirty)
         self.final_mapping = {pt.name: pt.name in ['fp1','fp2'] for pt in self.part_types}
+        # optionales Ereignisprotokoll (event_log.EventLog); Zeit ist anlage.timestep
+        self.event_log = None
         self.last_profit = self._calculate_profit()
 
+    def _init_count_observation(self):
+        """
+        Layout für obs_mode="counts": Zählvektor des globalen Puffers (n_types), Zählvektor des Input-Puffers je
+        Maschine (n_machines x n_types), Slot-Belegung je Maschine (laufende Jobs / Slots), Summe der Restlaufzeiten
+        laufender Jobs je fähigem (Maschine, Transformation)-Paar und Ziel-One-Hot (n_types).
+        """
+        P, M = len(self.part_types), self.n_machines
+        _, _, pair_ids = self.index.action_layout(compact=True)
+        self._pair_cols = pair_ids - 1                             # (Maschine, Transformation) -> Spalte im Restzeitblock
+        n_pairs = int(pair_ids.max())
+        obs_dim = P + M*P + M + n_pairs + P
+        self.observation_space = spaces.Box(0, np.inf, shape=(obs_dim,), dtype=np.float32)
+        self._obs = np.zeros(obs_dim, dtype=np.float32)
+        self._obs_buffer = self._obs[:P]
+        self._obs_inputs = self._obs[P:P + M*P].reshape(M, P)
+        self._obs_occupancy = self._obs[P + M*P:P + M*P + M]
+        self._obs_remaining = self._obs[P + M*P + M:obs_dim - P]
+        self._obs_goal = self._obs[obs_dim - P:]
+        self._inv_slots = 1.0 / self.index.slots
+
+    @property
+    def goal(self):
+        return self._goal
+
+    @goal.setter
+    def goal(self, goal):
+        self._goal = goal
+        if hasattr(self, "_obs_goal"):
+            self._write_goal()
+
+    def set_goal(self, goal):
+        """
+        Wechselt das Ziel ohne Neuaufbau der Strukturen und ohne Reset der Anlage.
+        Der Schrittzähler beginnt neu, d.h. ab hier stehen wieder max_steps Low-Level-Schritte zur Verfügung.
+        """
+        self.goal = goal
+        self.current_step = 0
+
+    def _count_completed(self, parts):
+        type_ids = self.index.type_ids
+        for p in parts:
+            self.completed[type_ids[p.type]] += 1
+
+    def _write_goal(self):
+        # Ziel-One-Hot nur bei Zielwechsel neu schreiben
+        self._obs_goal.fill(0.0)
+        gid = self.index.name_ids.get(self._goal)
+        if gid is not None:
+            self._obs_goal[gid] = 1.0
+
     def phi(self):
         # potential: sum over buffer exp(-dist to goal)
         if self.goal is None:
             return 0.0
-        total = 0.0
-        for p in self.global_buffer:
-            try:
-                d = nx.shortest_path_length(self.prod_graph, p.type.name, self.goal)
-            except nx.NetworkXNoPath:
-                d = np.inf
-            total += np.exp(-d) if np.isfinite(d) else 0.0
-        return total
+        # vorberechnete Distanztabelle: Skalarprodukt Typ-Zählvektor x exp(-Distanz zum Ziel)
+        potential = self.index.goal_potential[:, self.index.name_ids[self.goal]]
+        return float(self.index.counts(self.global_buffer) @ potential)
 
     def _calculate_profit(self):
-        val = cost = 0.0
-        for buf in [self.global_buffer] + [m.input_buffer for m in self.machines] + [m.output_buffer for m in self.machines]:
-            for p in buf:
-                val += p.type.value; cost += p.type.cost
-        for m in self.machines:
-            for job in m.current_jobs:
-                for p in job['input_parts']:
-                    val += p.type.value; cost += p.type.cost
-        return val - cost
+        # laufende WIP-Bewertung der Anlage (O(1)); anlage.check_accounting prüft gegen den vollständigen Scan
+        return self.anlage.wip_profit()
 
     def _get_observation(self):
-        obs = []
-        # global buffer
-        for i in range(self.max_buffer):
-            if i < len(self.global_buffer):
-                idx = next((j for j,pt in enumerate(self.part_types) if pt.name==self.global_buffer[i].type.name), self.empty_marker)
-            else:
-                idx = self.empty_marker
-            obs.append(float(idx))
-        # machine features
-        for m in self.machines:
-            bf = [len(m.input_buffer), len(m.output_buffer), len(m.current_jobs)]
-            mask = []
-            for pt in self.part_types:
-                sup = any(any(ip.name==pt.name for ip in tr.input_types) for tr in m.machine_type.transformations)
-                mask.append(1.0 if sup else 0.0)
-            obs.extend(bf + mask)
-        # goal one-hot
-        goal_vec = [1.0 if pt.name==self.goal else 0.0 for pt in self.part_types]
-        obs.extend(goal_vec)
-        return np.array(obs, dtype=np.float32)
+        if self.obs_mode == "counts":
+            return self._get_count_observation()
+        # global buffer: Typ-ID je Slot, leere Slots mit empty_marker
+        buf = self._obs_buffer
+        buf.fill(self.empty_marker)
+        type_ids = self.index.type_ids
+        for i, p in enumerate(islice(self.global_buffer, self.max_buffer)):
+            buf[i] = type_ids[p.type]
+        # dynamische Maschinenfeatures; Fähigkeitsmasken und Ziel-One-Hot sind bereits eingetragen
+        self._obs_machines[:, :3] = [(len(m.input_buffer), len(m.output_buffer), len(m.current_jobs)) for m in self.machines]
+        return self._obs.copy()
+
+    def _get_count_observation(self):
+        counts, trans_ids = self.index.counts, self.index.trans_ids
+        self._obs_buffer[:] = counts(self.global_buffer)
+        remaining = self._obs_remaining
+        remaining.fill(0.0)
+        for mi, m in enumerate(self.machines):
+            self._obs_inputs[mi] = counts(m.input_buffer)
+            for job in m.current_jobs:
+                remaining[self._pair_cols[mi, trans_ids[job.transformation]]] += m.remaining_time(job)
+        self._obs_occupancy[:] = [len(m.current_jobs) for m in self.machines]
+        self._obs_occupancy *= self._inv_slots
+        return self._obs.copy()
 
     def get_action_mask(self):
-        mask = np.zeros(self.n_actions, dtype=np.int8)
-        mask[0] = 1
-        avail = {}
-        for p in self.global_buffer:
-            avail[p.type.name] = avail.get(p.type.name,0) + 1
-        for k in range(1, self.n_actions):
-            mi = (k-1)//self.n_transformations
-            ti = (k-1)%self.n_transformations
-            trans = self.unique_transformations[ti]
-            req = {}
-            for pt in trans.input_types:
-                req[pt.name] = req.get(pt.name,0) + 1
-            if all(avail.get(n,0)>=c for n,c in req.items()): mask[k] = 1
-        return mask
+        dirty = self._mask_dirty
+        if dirty:
+            if DirtySet.ALL_TYPES in dirty:
+                # eine vektorisierte Prüfung aller Rezepte gegen den Zählvektor des globalen Puffers
+                self._feasible[:] = self.index.feasible_transformations(self.index.counts(self.global_buffer))
+            else:
+                changed = set()
+                for pt in dirty:
+                    changed.update(self._trans_by_type.get(pt, ()))
+                for ti in changed:
+                    ok = all(self.global_buffer.count_of(pt) >= n
+                             for pt, n in self.unique_transformations[ti].requirements.items())
+                    self._feasible[ti] = ok
+            # je Aktion die Machbarkeit ihrer Transformation
+            self._mask[1:] = self._feasible[self.action_transformations]
+            dirty.clear()
+        return self._mask.copy()
 
-    def step(self, action):
+    def _tick(self, action):
+        # ein simulierter Zeitschritt: Dispatch, Maschinenfortschritt, Nachschub
         prev_profit = self._calculate_profit()
         prev_phi = self.phi()
+        log = self.event_log
+        t = self.anlage.timestep
         # iterative execution
         count=0
         mask = self.get_action_mask()
         while action>0 and count<self.max_buffer and mask[action]:
-            mi = (action-1)//self.n_transformations
-            ti = (action-1)%self.n_transformations
+            mi = self.action_machines[action-1]
+            ti = self.action_transformations[action-1]
             trans = self.unique_transformations[ti]
-            req = {}
-            for pt in trans.input_types:
-                req[pt.name] = req.get(pt.name,0)+1
-            newbuf=[]; collected=[]; tmp=req.copy()
-            for p in self.global_buffer:
-                if tmp.get(p.type.name,0)>0:
-                    collected.append(p); tmp[p.type.name]-=1
-                else:
-                    newbuf.append(p)
-            self.global_buffer = newbuf
+            collected=[]
+            for pt, n in trans.requirements.items():
+                collected.extend(self.global_buffer.take(pt, n))
             self.machines[mi].input_buffer.extend(collected)
-            self.anlage.global_buffer=self.global_buffer
-            self.anlage.refill_global_buffer(self.max_buffer)
-            self.global_buffer=self.anlage.global_buffer
+            n_new = self.anlage.refill_global_buffer(self.max_buffer)
+            if log is not None:
+                log.emit(t, DISPATCH, machine=self.machines[mi].machine_id, output=trans.output_type.name,
+                         parts=[p.id for p in collected])
+                if n_new: log.emit(t, REFILL, n=n_new)
             mask = self.get_action_mask(); count+=1
-        # machine progress
+        # machine progress; Fertigstellungen und Verkäufe (Zeit t+1) erst nach allen Starts (Zeit t) protokollieren,
+        # damit das Protokoll zeitlich monoton bleibt
+        finished = []
         for m in self.machines:
-            if len(m.current_jobs)<m.machine_type.slots:
-                for t in m.transformation_priority:
-                    if m.can_start_transformation(t):
-                        self.part_id_counter=m.start_transformation(t,self.part_id_counter); break
-            self.part_id_counter,_=m.progress_jobs(self.part_id_counter,self.final_mapping)
-            while m.output_buffer:
-                p=m.output_buffer.pop(0)
+            if (m.input_buffer or self._sourceless) and len(m.current_jobs)<m.machine_type.slots:
+                for tr in m.transformation_priority:
+                    if m.can_start_transformation(tr):
+                        self.part_id_counter=m.start_transformation(tr,self.part_id_counter)
+                        if log is not None: log.emit(t, JOB_START, machine=m.machine_id, output=tr.output_type.name)
+                        break
+            self.part_id_counter,done_parts=m.progress_jobs(self.part_id_counter,self.final_mapping)
+            if done_parts:
+                self._count_completed(done_parts)
+                if log is not None:
+                    finished.extend((JOB_COMPLETE, dict(machine=m.machine_id, part=p.id, type=p.type.name)) for p in done_parts)
+            for p in m.output_buffer.drain():
                 if not self.final_mapping.get(p.type.name,False): self.global_buffer.append(p)
+                elif log is not None: finished.append((SALE, dict(machine=m.machine_id, part=p.id, type=p.type.name, value=p.type.value)))
         # refill end
-        self.anlage.global_buffer=self.global_buffer
-        self.anlage.refill_global_buffer(self.max_buffer)
-        self.global_buffer=self.anlage.global_buffer
+        n_new = self.anlage.refill_global_buffer(self.max_buffer)
+        self.anlage.timestep = t + 1
+        if log is not None:
+            for kind, fields in finished: log.emit(t + 1, kind, **fields)
+            if n_new: log.emit(t + 1, REFILL, n=n_new)
+            log.tick(t + 1, self.anlage)
         # compute rewards
         cur_profit = self._calculate_profit()
         cur_phi = self.phi()
@@ -155,10 +253,61 @@ class FlexibleJobShopEnv(gym.Env):
         r_shape = self.gamma*cur_phi - prev_phi
         reward = r_env + r_shape
         self.current_step+=1
+        return reward
+
+    def _is_idle(self):
+        # keine Maschine kann einen Job starten -> bis zur nächsten Fertigstellung ändert sich nichts
+        for m in self.machines:
+            if (m.input_buffer or self._sourceless) and len(m.current_jobs) < m.machine_type.slots:
+                for t in m.transformation_priority:
+                    if m.can_start_transformation(t):
+                        return False
+        return True
+
+    def _skip_to_decision(self):
+        # Semi-Markov: noop-Schritte bis zum nächsten Entscheidungspunkt ausführen,
+        # Leerlaufphasen in einem Sprung über die Ereigniswarteschlange. Liefert (diskontierter Reward, Dauer).
+        reward = 0.0; tau = 0
+        while self.current_step < self.max_steps and not self.get_action_mask()[1:].any():
+            if self._is_idle():
+                delay = self.anlage.next_event_delay()
+                remaining = self.max_steps - self.current_step
+                skip = min(delay - 1, remaining) if delay is not None else remaining
+                if skip > 0:
+                    # Profit und Potential bleiben konstant: sum_i gamma^i * (gamma-1)*phi = (gamma^skip - 1)*phi
+                    reward += self.gamma**tau * (self.gamma**skip - 1.0) * self.phi()
+                    # skip < delay: während des Sprungs wird kein Job fertig; Fertigstellungen (Zählung, Protokoll)
+                    # laufen immer über den folgenden _tick
+                    for m in self.machines:
+                        self.part_id_counter, done_parts = m.advance(skip, self.part_id_counter)
+                        assert not done_parts
+                    self.anlage.timestep += skip
+                    self.current_step += skip; tau += skip
+                    continue
+            reward += self.gamma**tau * self._tick(0); tau += 1
+        return reward, tau
+
+    def step(self, action):
+        reward = self._tick(action)
+        tau = 1
+        if self.smdp:
+            r_skip, dt = self._skip_to_decision()
+            reward += self.gamma * r_skip
+            tau += dt
         done = self.current_step>=self.max_steps
-        info = {"action_mask": self.get_action_mask()}
+        info = {"action_mask": self.get_action_mask(), "tau": tau}
         return self._get_observation(), reward, done, False, info
 
+    def snapshot(self):
+        # Anlagenzustand plus Env-Zähler für Lookahead
+        return (self.anlage.snapshot(), self.current_step, self.part_id_counter, self.completed.copy())
+
+    def restore(self, snap):
+        anlage_snap, self.current_step, self.part_id_counter, completed = snap
+        self.completed[:] = completed
+        self.anlage.restore(anlage_snap)
+        self.global_buffer = self.anlage.global_buffer
+
     def reset(self, seed=None, options=None):
         if seed is not None:
             super().reset(seed=seed)
@@ -168,6 +317,10 @@ class FlexibleJobShopEnv(gym.Env):
         self.anlage.refill_global_buffer(self.max_buffer)
         self.global_buffer = self.anlage.global_buffer
         self.part_id_counter = 0
+        self.completed.fill(0)
+        if self.event_log is not None:
+            self.event_log.reset()
+            self.event_log.tick(0, self.anlage)
         return self._get_observation(), {"action_mask": self.get_action_mask()}
 
     def render(self, mode="human"):
@@ -1,7 +1,9 @@
 # File: hierarchical_env.py
 import numpy as np
 import gymnasium as gym
+from event_log import REFILL, SUBGOAL, SUBGOAL_END
 from flexible_jobshop_env import FlexibleJobShopEnv
+from plant_bounds import plant_bounds
 
 class HighLevelEnv(gym.Env):
     """
@@ -10,8 +12,17 @@ class HighLevelEnv(gym.Env):
 
     required_products: Liste von Dicts {'part_type': str, 'count': int, 'deadline': int}
     subgoals: Liste von PartType-Namen, die als Ziele dienen.
+    ll_policy: optionale Low-Level-Policy (Batch von Observations und Masken -> Aktionen), z.B. LowLevelPolicy;
+               ohne Policy wird die erste gültige Aktion gewählt. Für viele Envs gleichzeitig siehe HierarchicalVecEnv.
+    Ereignisprotokoll: env.ll.event_log = event_log.EventLog(...) protokolliert Low- und High-Level-Ereignisse.
+    compact_actions, obs_mode: Aktions- und Observation-Kodierung des Low-Level-Env (müssen zur Low-Level-Policy
+    passen); die High-Level-Observation ist die Low-Level-Observation.
+    truncate_infeasible: Episode abschneiden (truncated=True), sobald plant_bounds beweist, dass ein noch offenes
+    Produkt seine Deadline nicht mehr erreichen kann. Schranke ist die früheste Fertigstellung des nächsten Teils
+    ab dem aktuellen Anlagenzustand gegen die höchstens verbleibenden Ticks (max_steps je High-Level-Schritt).
     """
-    def __init__(self, anlage, subgoals, required_products, max_steps=50, max_buffer=10):
+    def __init__(self, anlage, subgoals, required_products, max_steps=50, max_buffer=10, ll_policy=None,
+                 compact_actions=False, obs_mode="slots", truncate_infeasible=False):
         super().__init__()
         self.anlage = anlage
         self.subgoals = subgoals
@@ -19,17 +30,22 @@ class HighLevelEnv(gym.Env):
         self.max_steps = max_steps
         self.max_buffer = max_buffer
         self.current_step = 0
-        # Low-Level Env factory (no goal), we'll use its obs structure
-        self.ll_prototype = FlexibleJobShopEnv(
+        self.ll_policy = ll_policy
+        self.ll_pending = 0
+        self.truncate_infeasible = truncate_infeasible
+        # persistentes Low-Level-Env: Strukturen einmal aufbauen, Ziel je Makro-Schritt per set_goal wechseln
+        self.ll = FlexibleJobShopEnv(
             self.anlage,
             max_buffer=self.max_buffer,
-            max_steps=1,  # step-by-step control
-            goal=None
+            max_steps=self.max_steps,
+            goal=None,
+            compact_actions=compact_actions,
+            obs_mode=obs_mode
         )
         # Action space: same as subgoals + noop
         self.action_space = gym.spaces.Discrete(len(self.subgoals) + 1)
         # Observation space: gleiche Dimension wie Low-Level
-        self.observation_space = self.ll_prototype.observation_space
+        self.observation_space = self.ll.observation_space
         # Tracking produzierte Stückzahlen
         self.produced = {rp['part_type']: 0 for rp in self.required_products}
 
@@ -38,52 +54,59 @@ class HighLevelEnv(gym.Env):
         if seed is not None:
             super().reset(seed=seed)
         self.current_step = 0
-        # Anlage zurücksetzen, globalen Puffer befüllen
-        self.anlage.reset()
-        self.anlage.refill_global_buffer(self.max_buffer)
         # reset produced counts
         for pt in self.produced:
             self.produced[pt] = 0
-        # Erzeuge frisches Low-Level-Env für Beobachtung
-        self.ll = FlexibleJobShopEnv(
-            self.anlage,
-            max_buffer=self.max_buffer,
-            max_steps=self.max_steps,
-            goal=None
-        )
+        # Low-Level-Env zurücksetzen (setzt die Anlage zurück und befüllt den globalen Puffer)
+        self.ll.goal = None
         obs, info = self.ll.reset()
         return obs, info
 
-    def step(self, action):
+    def begin_subgoal(self, action):
+        """
+        Erste Phase eines High-Level-Schritts: noop füllt nur nach, ein Subgoal wird im Low-Level-Env gesetzt.
+        Danach stehen ll_pending Low-Level-Schritte aus, die über ll_tick() ausgeführt werden.
+        """
+        self._base_reward = 0.0
+        self._goal = None
+        self.ll_pending = 0
+        log = self.ll.event_log
         # Handle noop: nur Nachschub
         if action == 0:
-            self.anlage.refill_global_buffer(self.max_buffer)
-            obs, _ = self.ll._get_observation(), {}
-            base_reward = 0.0
-        else:
-            # gewünschtes Subgoal als PartType-Name
-            goal = self.subgoals[action-1]
-            # step Low-Level solange, bis goal produziert wird oder max_steps
-            ll_env = FlexibleJobShopEnv(
-                self.anlage,
-                max_buffer=self.max_buffer,
-                max_steps=self.max_steps,
-                goal=goal
-            )
-            obs, _ = ll_env.reset()
-            base_reward = 0.0
-            for _ in range(self.max_steps):
-                mask = ll_env.get_action_mask()
-                act = int(np.argmax(mask))
-                obs, r_ll, done, _, _ = ll_env.step(act)
-                base_reward += r_ll
-                # update produced counts wenn goal im global buffer
-                for p in ll_env.global_buffer:
-                    if p.type.name == goal:
-                        self.produced[goal] += 1
-                        break
-                if done:
-                    break
+            if log is not None: log.emit(self.anlage.timestep, SUBGOAL, hl_step=self.current_step, goal=None)
+            n_new = self.anlage.refill_global_buffer(self.max_buffer)
+            if log is not None and n_new: log.emit(self.anlage.timestep, REFILL, n=n_new)
+            return
+        # gewünschtes Subgoal als PartType-Name
+        goal = self.subgoals[action-1]
+        if log is not None: log.emit(self.anlage.timestep, SUBGOAL, hl_step=self.current_step, goal=goal)
+        # Ziel wechseln, Anlagenzustand bleibt erhalten
+        self.ll.set_goal(goal)
+        self._goal = goal
+        self._goal_completed = self.ll.completed[self.ll.index.name_ids[goal]]
+        self.ll_pending = self.max_steps
+
+    def ll_tick(self, act):
+        """
+        Führt einen Low-Level-Schritt mit Aktion act für das aktuelle Subgoal aus.
+        Zwischen-Observations werden nicht benötigt, daher wird direkt simuliert.
+        """
+        self._base_reward += self.ll._tick(act)
+        self.ll_pending -= 1
+        if self.ll.current_step >= self.ll.max_steps:
+            self.ll_pending = 0
+
+    def end_subgoal(self):
+        """
+        Letzte Phase eines High-Level-Schritts: produzierte Stückzahlen, Deadline-Shaping und Rückgabe im Gymnasium-Format.
+        """
+        # Subgoal ist abgeschlossen: Ziel-One-Hot löschen, damit die High-Level-Observation kein inaktives Ziel zeigt
+        self.ll.goal = None
+        obs = self.ll._get_observation()
+        goal = self._goal
+        # produzierte Stückzahl aus den Fertigstellungs-Ereignissen der Maschinen
+        if goal is not None and goal in self.produced:
+            self.produced[goal] += int(self.ll.completed[self.ll.index.name_ids[goal]] - self._goal_completed)
         # Reward shaping: Strafpunkte für nicht-produzierte Anforderungen
         shape_penalty = 0
         for rp in self.required_products:
@@ -95,21 +118,52 @@ class HighLevelEnv(gym.Env):
                 shape_penalty -= outstanding * 1
             else:
                 shape_penalty -= outstanding * 2
-        reward = base_reward + shape_penalty
+        reward = self._base_reward + shape_penalty
+        if self.ll.event_log is not None:
+            self.ll.event_log.emit(self.anlage.timestep, SUBGOAL_END, hl_step=self.current_step, reward=float(reward),
+                                   produced=dict(self.produced))
         # Schritt inkrementieren
         self.current_step += 1
         done = self.current_step >= self.max_steps
+        truncated = not done and self.truncate_infeasible and self._deadline_infeasible()
         info = {"action_mask": self._get_action_mask()}
-        return obs, reward, done, False, info
+        return obs, reward, done, truncated, info
+
+    def _deadline_infeasible(self):
+        # True, wenn ein offenes Produkt selbst bei unbegrenzter Kapazität erst nach seiner Deadline fertig würde
+        earliest = None
+        for rp in self.required_products:
+            if self.produced.get(rp['part_type'], 0) >= rp['count']:
+                continue
+            if earliest is None:
+                earliest = plant_bounds(self.anlage).earliest_from_state(self.anlage)
+            # High-Level-Schritte bis einschließlich der Deadline, je Schritt höchstens max_steps Ticks
+            ticks_left = max(0, rp['deadline'] - self.current_step + 1) * self.max_steps
+            if earliest[self.ll.index.name_ids[rp['part_type']]] > ticks_left:
+                return True
+        return False
+
+    def step(self, action):
+        self.begin_subgoal(action)
+        # step Low-Level solange, bis max_steps erreicht sind
+        while self.ll_pending:
+            mask = self.ll.get_action_mask()
+            if self.ll_policy is None:
+                act = int(np.argmax(mask))
+            else:
+                act = int(self.ll_policy(self.ll._get_observation()[None], mask[None])[0])
+            self.ll_tick(act)
+        return self.end_subgoal()
+
+    def action_masks(self):
+        # Schnittstelle für MaskablePPO (ohne ActionMasker-Wrapper)
+        return self._get_action_mask()
 
     def _get_action_mask(self):
         # immer noop erlauben
         mask = np.zeros(self.action_space.n, dtype=np.int8)
         mask[0] = 1
-        # Subgoal erlauben, falls potenziell erfüllbar (Rohmaterial da)
-        avail = {}
-        for p in self.anlage.global_buffer:
-            avail[p.type.name] = avail.get(p.type.name, 0) + 1
+        # Subgoal erlauben, falls potenziell erfüllbar
         for idx, goal in enumerate(self.subgoals, start=1):
             # prüfe, ob genug Inputs da sind, indem wir Produktionsgraph rückwärts betrachten
             # (vereinfacht: hier immer erlauben)
@@ -0,0 +1,63 @@
+# File: hierarchical_rollout.py
+# Hierarchische Rollouts: viele HighLevelEnvs gleichzeitig, Low-Level-Policy gebündelt in einem Forward-Pass je Tick
+import numpy as np
+import torch
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+
+class LowLevelPolicy:
+    """
+    Batch-Inferenz einer trainierten Low-Level-MaskablePPO-Policy.
+    Aufruf mit Observations (B x obs_dim) und Aktionsmasken (B x n_actions), Rückgabe: Aktionen (B,).
+    """
+    def __init__(self, model, deterministic=True):
+        self.policy = model.policy
+        self.policy.set_training_mode(False)
+        self.deterministic = deterministic
+
+    def __call__(self, obs, masks):
+        obs_tensor, _ = self.policy.obs_to_tensor(np.asarray(obs, dtype=np.float32))
+        with torch.no_grad():
+            dist = self.policy.get_distribution(obs_tensor, action_masks=np.asarray(masks, dtype=bool))
+            actions = dist.get_actions(deterministic=self.deterministic)
+        return actions.cpu().numpy()
+
+
+class HierarchicalVecEnv(DummyVecEnv):
+    """
+    VecEnv über mehrere HighLevelEnvs im selben Prozess.
+
+    Ein High-Level-Schritt aller Envs läuft in drei Phasen: begin_subgoal() je Env, dann Low-Level-Ticks,
+    bei denen die Observations und Masken aller noch aktiven Envs gestapelt und mit einem einzigen
+    Forward-Pass von ll_policy ausgewertet werden, zuletzt end_subgoal() je Env (inkl. Auto-Reset).
+    ll_policy: LowLevelPolicy oder beliebige Funktion (obs, masks) -> Aktionen; None wählt die erste gültige Aktion.
+    """
+    def __init__(self, env_fns, ll_policy=None):
+        super().__init__(env_fns)
+        self.ll_policy = ll_policy
+
+    def _ll_actions(self, pending):
+        envs = [self.envs[i] for i in pending]
+        masks = np.stack([env.ll.get_action_mask() for env in envs])
+        if self.ll_policy is None:
+            return masks.argmax(axis=1)
+        obs = np.stack([env.ll._get_observation() for env in envs])
+        return self.ll_policy(obs, masks)
+
+    def step_wait(self):
+        for env, action in zip(self.envs, self.actions):
+            env.begin_subgoal(int(action))
+        pending = [i for i, env in enumerate(self.envs) if env.ll_pending]
+        while pending:
+            for i, act in zip(pending, self._ll_actions(pending)):
+                self.envs[i].ll_tick(int(act))
+            pending = [i for i in pending if self.envs[i].ll_pending]
+        for env_idx, env in enumerate(self.envs):
+            obs, self.buf_rews[env_idx], terminated, truncated, self.buf_infos[env_idx] = env.end_subgoal()
+            self.buf_dones[env_idx] = terminated or truncated
+            self.buf_infos[env_idx]["TimeLimit.truncated"] = truncated and not terminated
+            if self.buf_dones[env_idx]:
+                self.buf_infos[env_idx]["terminal_observation"] = obs
+                obs, self.reset_infos[env_idx] = env.reset()
+            self._save_obs(env_idx, obs)
+        return self._obs_from_buf(), np.copy(self.buf_rews), np.copy(self.buf_dones), [dict(i) for i in self.buf_infos]
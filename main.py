@@ -1,20 +1,78 @@
-import subprocess
-import sys
-
-steps = [
-    ("Low-Level Training", "train_low_level.py"),
-    ("High-Level Training", "train_high_level.py"),
-    #("Joint Training", "train_joint.py"),
-    ("Hierarchical Test", "test_hierarchical.py"),
-    ("Produktions-Simulation", "production_process_with_rl.py")
-]
-
-for name, script in steps:
-    print(f"=== {name} ===")
-    result = subprocess.run([sys.executable, script], check=False)
-    if result.returncode != 0:
-        print(f"Fehler in Schritt '{name}', Script {script} mit Code {result.returncode}")
-        break
-    print()
-
-print("Workflow abgeschlossen.")
\ No newline at end of file
+# File: main.py
+# Gesamte Pipeline in einem Prozess: Low-Level → High-Level → Test → Produktions-Simulation.
+# Trainingsstufen werden übersprungen, wenn Anlage, Hyperparameter und Upstream-Gewichte unverändert sind.
+import argparse
+
+import train_high_level
+import train_low_level
+from flexible_jobshop_env import OBS_MODES
+from hierarchical_rollout import LowLevelPolicy
+from manufacturing_structure import build_anlage
+from pipeline import ArtifactStore, Pipeline, Stage, model_fingerprint, plant_fingerprint
+from production_process_with_rl import simulate
+from test_hierarchical import run_episode
+
+
+def build_pipeline(args):
+    plant = plant_fingerprint(build_anlage())
+
+    def ll_inputs(ctx):
+        return {"plant": plant, "subgoals": train_low_level.SUBGOALS, "max_buffer": train_low_level.MAX_BUFFER,
+                "max_steps": train_low_level.MAX_STEPS, "n_envs": args.n_envs, "vec": args.vec_ll,
+                "total_timesteps": args.ll_timesteps, "seed": args.seed, "compact_actions": args.compact_actions,
+                "obs_mode": args.obs_mode}
+
+    def hl_inputs(ctx):
+        return {"plant": plant, "subgoals": train_high_level.SUBGOALS,
+                "required_products": train_high_level.REQUIRED_PRODUCTS, "max_hl_steps": train_high_level.MAX_HL_STEPS,
+                "n_envs": args.n_envs, "total_timesteps": args.hl_timesteps, "seed": args.seed,
+                "compact_actions": args.compact_actions, "obs_mode": args.obs_mode,
+                "ll_weights": model_fingerprint(ctx["model_ll"])}
+
+    def train_ll(ctx):
+        return {"model_ll": train_low_level.train(n_envs=args.n_envs, vec=args.vec_ll,
+                                                  total_timesteps=args.ll_timesteps, resume=False, seed=args.seed,
+                                                  compact_actions=args.compact_actions, obs_mode=args.obs_mode)}
+
+    def train_hl(ctx):
+        return {"model_hl": train_high_level.train(n_envs=args.n_envs, total_timesteps=args.hl_timesteps,
+                                                   ll_model=ctx["model_ll"], resume=False, seed=args.seed,
+                                                   compact_actions=args.compact_actions, obs_mode=args.obs_mode)}
+
+    def test(ctx):
+        reward = run_episode(ctx["model_hl"], ctx["model_ll"], compact_actions=args.compact_actions,
+                             obs_mode=args.obs_mode)
+        print(f"Hierarchical Test Reward: {reward}")
+        return {"test_reward": reward}
+
+    def production(ctx):
+        simulate(LowLevelPolicy(ctx["model_ll"]), ctx["model_hl"], compact_actions=args.compact_actions,
+                 obs_mode=args.obs_mode)
+
+    return Pipeline([
+        Stage("low_level", train_ll, cache_inputs=ll_inputs, output="model_ll"),
+        Stage("high_level", train_hl, cache_inputs=hl_inputs, output="model_hl"),
+        Stage("hierarchical_test", test),
+        Stage("production_simulation", production),
+    ], store=ArtifactStore(args.artifacts), force=args.force)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hierarchische RL-Pipeline (ein Prozess, Artefakt-Cache)")
+    parser.add_argument("--force", action="store_true", help="Cache ignorieren und alle Stufen neu ausführen")
+    parser.add_argument("--artifacts", default="artifacts", help="Verzeichnis des Artefakt-Speichers")
+    parser.add_argument("--n-envs", type=int, default=1)
+    parser.add_argument("--vec-ll", choices=["dummy", "subproc", "batched"], default="dummy")
+    parser.add_argument("--ll-timesteps", type=int, default=train_low_level.TOTAL_TIMESTEPS)
+    parser.add_argument("--hl-timesteps", type=int, default=train_high_level.TOTAL_TIMESTEPS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compact-actions", action="store_true",
+                        help="Low-Level-Aktionsraum nur aus fähigen (Maschine, Transformation)-Paaren")
+    parser.add_argument("--obs-mode", choices=OBS_MODES, default="slots",
+                        help="slots: Typ-ID je Puffer-Slot, counts: Zählhistogramme (unabhängig von max_buffer)")
+    args = parser.parse_args()
+
+    ctx = build_pipeline(args).run()
+    for name, (seconds, status) in ctx["timings"].items():
+        print(f"{name:>24}: {seconds:>8.1f}s ({status})")
+    print("Workflow abgeschlossen.")
@@ -0,0 +1,279 @@
+# File: mcts_planner.py
+# Suchbasierter Dispatcher: Monte-Carlo-Baumsuche (PUCT) auf FlexibleJobShopEnv mit Rollouts einer
+# Prioritätsregel, optionalen Priors einer exportierten Low-Level-Policy und Root-Parallelisierung über Prozesse
+import io
+import math
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from classes import PartType, Transformation
+from dispatch_rules import DispatchPolicy
+from evaluate import resolve_encoding
+from flexible_jobshop_env import FlexibleJobShopEnv
+from manufacturing_structure import build_anlage
+
+
+def _transformation_key(t):
+    return tuple(pt.name for pt in t.input_types), t.output_type.name, t.duration
+
+
+class _StatePickler(pickle.Pickler):
+    # PartTypes und Transformationen gehören zur Anlagendefinition und werden nur per Name bzw. Rezept referenziert
+    def persistent_id(self, obj):
+        if isinstance(obj, PartType):
+            return "type", obj.name
+        if isinstance(obj, Transformation):
+            return "transformation", _transformation_key(obj)
+        return None
+
+
+class _StateUnpickler(pickle.Unpickler):
+    # löst die Referenzen gegen die eigene Anlage des Workers auf
+    def __init__(self, file, index):
+        super().__init__(file)
+        self._objects = {("type", pt.name): pt for pt in index.part_types}
+        self._objects.update((("transformation", _transformation_key(t)), t) for t in index.transformations)
+
+    def persistent_load(self, pid):
+        return self._objects[tuple(pid)]
+
+
+def dump_state(snapshot) -> bytes:
+    """
+    Serialisiert FlexibleJobShopEnv.snapshot() unabhängig von den Objekten der Anlage, damit ein Worker mit
+    eigener (gleich aufgebauter) Anlage ihn wiederherstellen kann.
+    """
+    f = io.BytesIO()
+    _StatePickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(snapshot)
+    return f.getvalue()
+
+
+def load_state(data: bytes, index):
+    return _StateUnpickler(io.BytesIO(data), index).load()
+
+
+class _Node:
+    __slots__ = ("prior", "children", "n", "w")
+
+    def __init__(self, prior: float):
+        self.prior = prior
+        self.children = None   # Aktion -> _Node, None solange nicht expandiert
+        self.n = 0
+        self.w = 0.0
+
+
+class _SearchWorker:
+    """
+    Eigene Anlage und Env je Prozess. Der Zustand der Wurzel kommt als serialisierter Env-Snapshot (dump_state)
+    und wird per restore() hergestellt; danach dient snapshot()/restore() als schneller Klon für jede Simulation.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.anlage = config["plant_factory"]()
+        self.env = FlexibleJobShopEnv(self.anlage, max_buffer=config["max_buffer"], max_steps=config["max_steps"],
+                                      gamma=config["gamma"], compact_actions=config["compact_actions"],
+                                      obs_mode=config["obs_mode"])
+        self.rollout_policy = DispatchPolicy(self.anlage, config["rollout_rule"], max_buffer=config["max_buffer"],
+                                             compact_actions=config["compact_actions"], obs_mode=config["obs_mode"])
+        self.prior_policy = None
+        if config["prior"]:
+            from evaluate import load_policy
+            self.prior_policy = load_policy(config["prior"], self.anlage, config["max_buffer"])
+        # nur Aktionen auf fähigen Maschinen expandieren (in der kompakten Kodierung alle)
+        self.capable = np.concatenate([[True], self.env.index.capability[self.env.action_machines,
+                                                                          self.env.action_transformations]])
+        self._obs = None
+        self._mask = None
+
+    def set_root(self, state, goal):
+        """
+        Stellt den Wurzelzustand aus dump_state(env.snapshot()) und dem Ziel her; True, wenn er nicht terminal ist.
+        """
+        env = self.env
+        env.goal = goal
+        env.restore(load_state(state, env.index))
+        self._obs = env._get_observation()
+        self._mask = env.get_action_mask()
+        return env.current_step < env.max_steps
+
+    def _expand(self, node, obs, mask):
+        actions = np.flatnonzero(mask.astype(bool) & self.capable)
+        if self.prior_policy is not None:
+            logits = self.prior_policy.logits(obs[None])[0][actions].astype(np.float64)
+            p = np.exp(logits - logits.max())
+            p /= p.sum()
+        else:
+            p = np.full(len(actions), 1.0 / len(actions))
+        node.children = {int(a): _Node(float(pa)) for a, pa in zip(actions, p)}
+
+    def _select(self, node, q_min, q_max):
+        c = self.config["c_puct"]
+        sqrt_n = math.sqrt(node.n + 1)
+        span = q_max - q_min if q_max > q_min else 1.0
+        best, best_score = None, -math.inf
+        for action, child in node.children.items():
+            q = ((child.w / child.n) - q_min) / span if child.n else 0.0
+            score = q + c * child.prior * sqrt_n / (1 + child.n)
+            if score > best_score:
+                best, best_score = action, score
+        return best, node.children[best]
+
+    def _rollout(self, obs, mask):
+        env, gamma = self.env, self.config["gamma"]
+        total, discount = 0.0, 1.0
+        for _ in range(self.config["rollout_depth"]):
+            action = int(self.rollout_policy(obs[None], mask[None])[0])
+            obs, reward, done, _, info = env.step(action)
+            mask = info["action_mask"]
+            total += discount * reward
+            discount *= gamma
+            if done:
+                break
+        return total
+
+    def search(self, state, goal, time_budget, max_simulations, seed):
+        """
+        Baumsuche ab dem Zustand (state, goal) bis time_budget Sekunden oder max_simulations verbraucht sind.
+        Liefert ({Aktion: (Besuche, Summe der Returns)} der Wurzel, Anzahl Simulationen).
+        """
+        deadline = time.perf_counter() + time_budget
+        if not self.set_root(state, goal):
+            return {}, 0
+        env, gamma = self.env, self.config["gamma"]
+        rng = np.random.default_rng(seed)
+        root = _Node(1.0)
+        self._expand(root, self._obs, self._mask)
+        if len(root.children) == 1:
+            return {a: (1, 0.0) for a in root.children}, 0
+        # Prior-Rauschen je Worker, damit die unabhängigen Bäume unterschiedliche Äste bevorzugen
+        noise = rng.dirichlet([0.3] * len(root.children))
+        for child, eps in zip(root.children.values(), noise):
+            child.prior = 0.75 * child.prior + 0.25 * eps
+        root_snap = env.snapshot()
+        q_min, q_max = math.inf, -math.inf
+        n_sims = 0
+        while n_sims < max_simulations and time.perf_counter() < deadline:
+            env.restore(root_snap)
+            node, path, rewards, done = root, [], [], False
+            obs, mask = self._obs, self._mask
+            while node.children and not done:
+                action, node = self._select(node, q_min, q_max)
+                obs, reward, done, _, info = env.step(action)
+                mask = info["action_mask"]
+                path.append(node)
+                rewards.append(reward)
+            value = 0.0
+            if not done:
+                self._expand(node, obs, mask)
+                value = self._rollout(obs, mask)
+            for child, reward in zip(reversed(path), reversed(rewards)):
+                value = reward + gamma * value
+                child.n += 1
+                child.w += value
+                q = child.w / child.n
+                q_min, q_max = min(q_min, q), max(q_max, q)
+            root.n += 1
+            n_sims += 1
+        env.restore(root_snap)
+        return {a: (c.n, c.w) for a, c in root.children.items()}, n_sims
+
+
+_worker = None
+
+
+def _init_worker(config):
+    global _worker
+    _worker = _SearchWorker(config)
+
+
+def _search(args):
+    return _worker.search(*args)
+
+
+class MCTSPlanner:
+    """
+    Root-parallele MCTS: n_workers Prozesse durchsuchen unabhängige Bäume ab demselben Zustand innerhalb eines
+    festen Zeitbudgets je Entscheidung; die Besuchszahlen der Wurzelaktionen werden summiert.
+
+    plant_factory: picklebare Funktion, die die Anlage aufbaut (Standard: Beispielanlage).
+    rollout_rule: Prioritätsregel (dispatch_rules.RULES) für die Rollouts.
+    prior: optionale Policy-Quelle für Priors (*.npz, *.zip wird nach NumPy exportiert, siehe evaluate.load_policy).
+    time_budget: Sekunden je Entscheidung, max_simulations: zusätzliche Obergrenze je Worker.
+    compact_actions, obs_mode: Kodierung der Env; None übernimmt sie aus den Metadaten des Priors
+    (evaluate.resolve_encoding), ohne Prior gilt die Standardkodierung.
+    """
+    def __init__(self, n_workers=1, time_budget=0.05, max_simulations=10**9, rollout_rule="mwkr",
+                 rollout_depth=20, prior=None, c_puct=1.5, plant_factory=build_anlage, max_buffer=10,
+                 max_steps=50, gamma=0.99, seed=0, compact_actions=None, obs_mode=None):
+        if prior and prior.endswith(".zip"):
+            prior = "numpy:" + prior
+        self.config = {"plant_factory": plant_factory, "rollout_rule": rollout_rule, "rollout_depth": rollout_depth,
+                       "prior": prior, "c_puct": c_puct, "max_buffer": max_buffer, "max_steps": max_steps,
+                       "gamma": gamma, **resolve_encoding([prior], compact_actions, obs_mode)}
+        self.n_workers = n_workers
+        self.time_budget = time_budget
+        self.max_simulations = max_simulations
+        self.seed = seed
+        self.n_decisions = 0
+        self.last_simulations = 0
+        if n_workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(self.config,))
+            self._local = None
+        else:
+            self._pool = None
+            self._local = _SearchWorker(self.config)
+
+    def plan(self, snapshot, goal):
+        """
+        Beste Aktion im Zustand snapshot (FlexibleJobShopEnv.snapshot() einer Env auf derselben Anlagendefinition
+        und mit denselben Einstellungen, z.B. HighLevelEnv.ll nach set_goal) mit Ziel goal.
+        """
+        state = dump_state(snapshot)
+        seed = self.seed + self.n_decisions * self.n_workers
+        self.n_decisions += 1
+        if self._pool is None:
+            results = [self._local.search(state, goal, self.time_budget, self.max_simulations, seed)]
+        else:
+            tasks = [(state, goal, self.time_budget, self.max_simulations, seed + k) for k in range(self.n_workers)]
+            results = list(self._pool.map(_search, tasks))
+        visits, values = {}, {}
+        for stats, _ in results:
+            for action, (n, w) in stats.items():
+                visits[action] = visits.get(action, 0) + n
+                values[action] = values.get(action, 0.0) + w
+        self.last_simulations = sum(n for _, n in results)
+        if not visits:
+            return 0
+        return max(visits, key=lambda a: (visits[a], values[a] / max(visits[a], 1)))
+
+    def run_episode(self, goal, env=None):
+        """
+        Spielt eine Episode mit der Suche als Policy und liefert (Summe der Rewards, Anzahl Simulationen).
+        """
+        cfg = self.config
+        env = env or FlexibleJobShopEnv(cfg["plant_factory"](), max_buffer=cfg["max_buffer"],
+                                        max_steps=cfg["max_steps"], gamma=cfg["gamma"],
+                                        compact_actions=cfg["compact_actions"], obs_mode=cfg["obs_mode"])
+        env.goal = goal
+        env.reset()
+        total, sims, done = 0.0, 0, False
+        while not done:
+            action = self.plan(env.snapshot(), goal)
+            sims += self.last_simulations
+            _, reward, done, _, _ = env.step(action)
+            total += reward
+        return total, sims
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,55 @@
+# File: model_encoding.py
+# Aktions- und Observation-Kodierung gespeicherter Modelle: eigener Dateiname je Kodierung und
+# <Modell>.encoding.json daneben, damit Trainings-Resume und Konsumenten die passende Env erzeugen
+import json
+import os
+
+DEFAULT_ENCODING = {"compact_actions": False, "obs_mode": "slots"}
+
+
+def encoding(compact_actions=False, obs_mode="slots") -> dict:
+    return {"compact_actions": bool(compact_actions), "obs_mode": obs_mode}
+
+
+def model_path(base: str, compact_actions=False, obs_mode="slots") -> str:
+    """
+    Dateiname eines Modells für eine Kodierung: base für die Standardkodierung, sonst mit Suffix
+    (z.B. lowlevel_ppo_model_compact_counts.zip), damit Modelle verschiedener Kodierungen sich nicht überschreiben.
+    """
+    tags = (["compact"] if compact_actions else []) + ([obs_mode] if obs_mode != "slots" else [])
+    if not tags:
+        return base
+    root, ext = os.path.splitext(base)
+    return f"{root}_{'_'.join(tags)}{ext}"
+
+
+def _meta_path(path: str) -> str:
+    # gleiche Datei für das SB3-Zip und seinen NumPy-Export (.npz)
+    return os.path.splitext(path)[0] + ".encoding.json"
+
+
+def save_encoding(path: str, compact_actions=False, obs_mode="slots"):
+    with open(_meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(encoding(compact_actions, obs_mode), f)
+
+
+def load_encoding(path: str) -> dict:
+    """
+    Kodierung des Modells unter path; Modelle ohne Metadaten stammen aus der Zeit vor den Optionen und
+    verwenden die Standardkodierung.
+    """
+    try:
+        with open(_meta_path(path), encoding="utf-8") as f:
+            return {**DEFAULT_ENCODING, **json.load(f)}
+    except FileNotFoundError:
+        return dict(DEFAULT_ENCODING)
+
+
+def check_encoding(path: str, compact_actions=False, obs_mode="slots"):
+    """
+    ValueError, wenn das Modell unter path mit einer anderen Kodierung trainiert wurde.
+    """
+    stored = load_encoding(path)
+    wanted = encoding(compact_actions, obs_mode)
+    if stored != wanted:
+        raise ValueError(f"Modell '{path}' wurde mit {stored} trainiert, angefordert ist {wanted}")
@@ -0,0 +1,179 @@
+# File: numpy_policy.py
+# Torch-freie Inferenz exportierter MaskablePPO-MlpPolicies: Export der Actor-Gewichte nach .npz und
+# maskierte Argmax-Auswahl in reinem NumPy (einzelne Observations und Batches)
+import argparse
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
+
+ACTIVATIONS = {
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0.0),
+}
+
+
+class NumpyPolicy:
+    """
+    Actor-Teil einer SB3-MlpPolicy (FlattenExtractor -> mlp_extractor.policy_net -> action_net) in NumPy.
+    Aufruf mit Observations (B x obs_dim) und Aktionsmasken (B x n_actions), Rückgabe: Aktionen (B,),
+    d.h. austauschbar mit hierarchical_rollout.LowLevelPolicy; predict() entspricht MaskablePPO.predict.
+    """
+    def __init__(self, weights: list, biases: list, activation: str = "tanh", seed=None):
+        """
+        weights/biases: je Schicht (in x out) bzw. (out,), die letzte Schicht ist action_net (ohne Aktivierung).
+        activation: Aktivierung der verdeckten Schichten ("tanh" oder "relu").
+        seed: Seed für stochastische Aktionen (deterministic=False).
+        """
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activation = activation
+        self._act = ACTIVATIONS[activation]
+        self.obs_dim = self.weights[0].shape[0]
+        self.n_actions = self.weights[-1].shape[1]
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def load(cls, path: str, seed=None):
+        with np.load(path) as data:
+            n_layers = int(data["n_layers"])
+            return cls([data[f"w{i}"] for i in range(n_layers)], [data[f"b{i}"] for i in range(n_layers)],
+                       activation=str(data["activation"]), seed=seed)
+
+    def save(self, path: str):
+        arrays = {f"w{i}": w for i, w in enumerate(self.weights)}
+        arrays.update({f"b{i}": b for i, b in enumerate(self.biases)})
+        np.savez(path, n_layers=len(self.weights), activation=self.activation, **arrays)
+
+    def logits(self, obs):
+        """
+        Unmaskierte Logits (B x n_actions) für einen Batch von Observations.
+        """
+        x = np.asarray(obs, dtype=np.float32).reshape(len(obs), -1)
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            x = x @ w
+            x += b
+            if i < last:
+                x = self._act(x)
+        return x
+
+    def __call__(self, obs, masks, deterministic=True):
+        logits = self.logits(obs)
+        if masks is not None:
+            # wie MaskableCategorical: ungültige Aktionen erhalten ein sehr kleines Logit
+            logits = np.where(np.asarray(masks, dtype=bool), logits, np.float32(-1e8))
+        if deterministic:
+            return logits.argmax(axis=1)
+        # Gumbel-Max: Stichprobe aus softmax(logits)
+        return (logits - np.log(-np.log(self.rng.random(logits.shape)))).argmax(axis=1)
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=False, action_masks=None):
+        """
+        Gleiche Schnittstelle wie MaskablePPO.predict: einzelne Observation -> Aktion (Skalar-Array),
+        Batch -> Aktionen (B,). Rückgabe (Aktionen, None).
+        """
+        observation = np.asarray(observation, dtype=np.float32)
+        single = observation.ndim == 1
+        obs = observation[None] if single else observation
+        masks = None
+        if action_masks is not None:
+            masks = np.asarray(action_masks, dtype=bool).reshape(len(obs), -1)
+        actions = self(obs, masks, deterministic=deterministic)
+        return (actions[0] if single else actions), None
+
+
+def _activation_from_data(data: dict):
+    # policy_kwargs aus der "data"-Datei eines SB3-Zips; ohne Angabe gilt die SB3-Voreinstellung (Tanh).
+    # Exakter Klassenname, z.B. "<class 'torch.nn.modules.activation.ReLU'>" -> "ReLU"; LeakyReLU, ReLU6 usw. werden
+    # abgelehnt statt still als relu exportiert
+    fn = str(data.get("policy_kwargs", {}).get("activation_fn", "Tanh"))
+    name = fn.rsplit(".", 1)[-1].rstrip("'>")
+    key = {"ReLU": "relu", "Tanh": "tanh"}.get(name)
+    if key is None:
+        raise ValueError(f"Nicht unterstützte Aktivierungsfunktion: {fn}")
+    return key
+
+
+def _read_state_dict(path: str):
+    # policy.pth aus einem SB3-Zip, einem Modellverzeichnis oder direkt; benötigt torch (nur beim Export)
+    import torch
+    activation = "tanh"
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            if "data" in archive.namelist():
+                activation = _activation_from_data(json.loads(archive.read("data")))
+            state_dict = torch.load(io.BytesIO(archive.read("policy.pth")), map_location="cpu")
+    else:
+        if os.path.isdir(path):
+            path = os.path.join(path, "policy.pth")
+        state_dict = torch.load(path, map_location="cpu")
+    return {k: v.detach().cpu().numpy() for k, v in state_dict.items()}, activation
+
+
+def _from_state_dict(state: dict, activation: str):
+    prefix = "mlp_extractor.policy_net."
+    hidden = sorted({int(k[len(prefix):].split(".")[0]) for k in state if k.startswith(prefix)})
+    weights = [state[f"{prefix}{i}.weight"].T for i in hidden] + [state["action_net.weight"].T]
+    biases = [state[f"{prefix}{i}.bias"] for i in hidden] + [state["action_net.bias"]]
+    return NumpyPolicy(weights, biases, activation=activation)
+
+
+def from_model(model):
+    """
+    NumpyPolicy direkt aus einem geladenen SB3-Modell (ohne Umweg über eine Datei).
+    """
+    state = {k: v.detach().cpu().numpy() for k, v in model.policy.state_dict().items()}
+    return _from_state_dict(state, _activation_from_data({"policy_kwargs": {
+        "activation_fn": model.policy.activation_fn.__name__}}))
+
+
+def export_policy(src: str, dst: str = None, activation: str = None):
+    """
+    Extrahiert die Actor-Gewichte aus src (SB3-Zip, Modellverzeichnis oder policy.pth) und speichert sie als .npz.
+    activation: überschreibt die aus dem Zip gelesene Aktivierung (bei reinem policy.pth gilt "tanh").
+    Liefert die NumpyPolicy.
+    """
+    state, detected = _read_state_dict(src)
+    policy = _from_state_dict(state, activation or detected)
+    if dst is None:
+        dst = os.path.splitext(src.rstrip("/\\"))[0] + ".npz"
+    policy.save(dst)
+    return policy
+
+
+def check_parity(src: str, policy: NumpyPolicy, n_samples: int = 1000, seed: int = 0):
+    """
+    Vergleicht deterministische Aktionen von MaskablePPO.predict (SB3) und NumpyPolicy auf zufälligen
+    Observations und Masken. Liefert den Anteil übereinstimmender Aktionen.
+    """
+    from sb3_contrib import MaskablePPO
+    model = MaskablePPO.load(src, device="cpu")
+    rng = np.random.default_rng(seed)
+    low = np.nan_to_num(model.observation_space.low, neginf=-10.0).astype(np.float32)
+    high = np.nan_to_num(model.observation_space.high, posinf=10.0).astype(np.float32)
+    obs = rng.uniform(low, high, size=(n_samples,) + low.shape).astype(np.float32)
+    masks = rng.random((n_samples, policy.n_actions)) < 0.5
+    masks[np.arange(n_samples), rng.integers(policy.n_actions, size=n_samples)] = True
+    expected, _ = model.predict(obs, deterministic=True, action_masks=masks)
+    actual, _ = policy.predict(obs, deterministic=True, action_masks=masks)
+    return float(np.mean(expected == actual))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MaskablePPO-Actor nach .npz exportieren (NumPy-Inferenz)")
+    parser.add_argument("models", nargs="+", help="SB3-Zip, Modellverzeichnis oder policy.pth")
+    parser.add_argument("--activation", choices=sorted(ACTIVATIONS), help="Aktivierung überschreiben")
+    parser.add_argument("--no-check", action="store_true", help="Paritätsprüfung gegen SB3 überspringen")
+    args = parser.parse_args()
+    for src in args.models:
+        dst = os.path.splitext(src.rstrip("/\\"))[0] + ".npz"
+        policy = export_policy(src, dst, args.activation)
+        print(f"{src} -> {dst} ({[w.shape for w in policy.weights]}, {policy.activation})")
+        if not args.no_check and zipfile.is_zipfile(src):
+            agreement = check_parity(src, policy)
+            print(f"Parität mit MaskablePPO.predict: {agreement:.2%}")
+            if agreement < 0.999:  # Gleitkomma-Gleichstände dürfen vereinzelt anders aufgelöst werden
+                raise SystemExit(1)
@@ -0,0 +1,124 @@
+# File: pipeline.py
+# In-Process-Pipeline: Stufen teilen Modelle und Anlage im Speicher, Trainingsstufen werden über einen
+# Inhalts-Hash (Anlage, Hyperparameter, Upstream-Gewichte) im lokalen Artefakt-Speicher zwischengespeichert
+import datetime
+import hashlib
+import json
+import os
+import time
+
+ARTIFACT_DIR = "artifacts"
+
+
+def plant_fingerprint(anlage):
+    """
+    Kanonische, JSON-serialisierbare Beschreibung der statischen Anlagenstruktur
+    (PartTypes, Transformationen, Maschinen); Laufzeitzustand wie Puffer und Jobs bleibt außen vor.
+    """
+    def transformation(t):
+        return {"inputs": [pt.name for pt in t.input_types], "output": t.output_type.name, "duration": t.duration}
+
+    return {
+        "part_types": [[pt.name, pt.cost, pt.value] for pt in anlage.all_part_types],
+        "machines": [{"id": m.machine_id, "type": m.machine_type.name, "slots": m.machine_type.slots,
+                      "transformations": [transformation(t) for t in m.machine_type.transformations]}
+                     for m in anlage.machines],
+    }
+
+
+def model_fingerprint(model):
+    """
+    SHA-256 über alle Gewichte der Policy eines SB3-Modells (Parameter in fester Reihenfolge).
+    """
+    h = hashlib.sha256()
+    for name, tensor in sorted(model.policy.state_dict().items()):
+        h.update(name.encode())
+        h.update(tensor.detach().cpu().numpy().tobytes())
+    return h.hexdigest()
+
+
+def content_hash(inputs: dict):
+    """
+    Stabiler Hash eines Dictionaries aus JSON-Werten (Schlüssel sortiert).
+    """
+    payload = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ArtifactStore:
+    """
+    Lokaler Speicher für Stufen-Ergebnisse: <root>/<stufe>/<key>.zip (Modell) und <key>.json (Eingaben, Zeitstempel).
+    """
+    def __init__(self, root=ARTIFACT_DIR):
+        self.root = root
+
+    def path(self, stage: str, key: str):
+        return os.path.join(self.root, stage, f"{key}.zip")
+
+    def has(self, stage: str, key: str):
+        return os.path.exists(self.path(stage, key))
+
+    def save_model(self, stage: str, key: str, model, inputs: dict):
+        path = self.path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        model.save(path)
+        meta = {"stage": stage, "key": key, "inputs": inputs,
+                "created": datetime.datetime.now().isoformat(timespec="seconds")}
+        with open(path[:-len(".zip")] + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, default=str)
+        return path
+
+    def load_model(self, stage: str, key: str, **kwargs):
+        from sb3_contrib import MaskablePPO
+        return MaskablePPO.load(self.path(stage, key), **kwargs)
+
+
+class Stage:
+    """
+    Eine Pipeline-Stufe.
+    run(ctx) führt die Stufe aus und liefert ein Dictionary, dessen Einträge in den Kontext übernommen werden.
+    cache_inputs(ctx): Liefert die Eingaben, deren Hash den Cache-Schlüssel bildet, oder None (Stufe wird immer ausgeführt).
+    output: Name des Kontexteintrags mit dem Modell, das als Artefakt gespeichert bzw. aus dem Cache geladen wird.
+    """
+    def __init__(self, name: str, run, cache_inputs=None, output=None):
+        self.name = name
+        self.run = run
+        self.cache_inputs = cache_inputs
+        self.output = output
+
+
+class Pipeline:
+    def __init__(self, stages: list, store: ArtifactStore = None, force: bool = False):
+        """
+        stages: Liste von Stage-Objekten in Ausführungsreihenfolge.
+        store: Artefakt-Speicher (Standard: ./artifacts).
+        force: Cache ignorieren und alle Stufen neu ausführen (Ergebnisse werden trotzdem gespeichert).
+        """
+        self.stages = stages
+        self.store = store or ArtifactStore()
+        self.force = force
+
+    def run(self, ctx: dict = None):
+        """
+        Führt alle Stufen nacheinander im selben Prozess aus und liefert den Kontext mit allen Ergebnissen.
+        ctx["timings"] enthält je Stufe (Sekunden, "cached" | "run").
+        """
+        ctx = dict(ctx or {})
+        timings = ctx.setdefault("timings", {})
+        for stage in self.stages:
+            print(f"=== {stage.name} ===")
+            start = time.perf_counter()
+            inputs = stage.cache_inputs(ctx) if stage.cache_inputs else None
+            key = content_hash(inputs) if inputs is not None else None
+            if key is not None and not self.force and self.store.has(stage.name, key):
+                ctx[stage.output] = self.store.load_model(stage.name, key, device="cpu")
+                status = "cached"
+                print(f"Unveränderte Eingaben, Artefakt {key[:12]} aus dem Cache geladen.")
+            else:
+                ctx.update(stage.run(ctx) or {})
+                if key is not None:
+                    self.store.save_model(stage.name, key, ctx[stage.output], inputs)
+                status = "run"
+            timings[stage.name] = (time.perf_counter() - start, status)
+            print()
+        return ctx
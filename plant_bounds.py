@@ -0,0 +1,203 @@
+# File: plant_bounds.py
+# Untere Schranken auf dem Produktionsgraphen: kritischer Pfad (früheste Fertigstellung je PartType) und
+# Engpass-Kapazität (Bearbeitungszeit je Slot), einmal je Anlage berechnet
+import weakref
+
+import numpy as np
+
+from plant_index import compile_plant
+
+
+def work_remaining(index):
+    """
+    Je PartType die längste Summe von Transformationsdauern vom Typ bis zu einem Endprodukt (Typ ohne Verbraucher),
+    d.h. die Restbearbeitung entlang des Produktionsgraphen.
+    """
+    consumers = [[] for _ in range(index.n_types)]
+    for ti in range(index.n_transformations):
+        for tid in np.flatnonzero(index.requirements[ti]):
+            consumers[tid].append(ti)
+    tail = np.full(index.n_types, -1.0)
+
+    def visit(tid):
+        # Tiefensuche mit Memoisierung; der Produktionsgraph ist azyklisch
+        if tail[tid] < 0:
+            tail[tid] = 0.0
+            tail[tid] = max((index.durations[ti] + visit(index.output_ids[ti]) for ti in consumers[tid]), default=0.0)
+        return tail[tid]
+
+    for tid in range(index.n_types):
+        visit(tid)
+    return tail
+
+
+class PlantBounds:
+    def __init__(self, index):
+        """
+        Schranken für eine kompilierte Anlage (PlantIndex). Alle Tabellen sind je Typ-ID indiziert.
+
+        Attribute:
+        earliest_completion: früheste Fertigstellung (Ticks ab Start) eines Teils je Typ bei unbegrenzter Kapazität,
+                             d.h. kritischer Pfad: Maximum über die Inputs eines Rezepts, Minimum über alternative
+                             Rezepte; Rohteile 0, nicht herstellbare Typen inf.
+        recipe: Transformation je Typ mit der geringsten Gesamtbearbeitungszeit, -1 für Rohteile.
+        unit_work: Gesamtbearbeitungszeit (Summe der Dauern) für ein Teil des Typs mit diesen Rezepten.
+        min_demand: Matrix (Zieltyp x Typ): Mindestanzahl herzustellender Teile je Typ für ein Teil des Zieltyps
+                    (inkl. des Zielteils selbst, ohne Rohteile). Bei alternativen Rezepten wird je Typ das Minimum
+                    über die Rezepte genommen, d.h. jede Rezeptwahl braucht mindestens so viele Teile jedes Typs;
+                    die Zeilen gehören im Allgemeinen zu keiner gemeinsamen Stückliste.
+        group_slots: Anzahl Slots aller Maschinen, die irgendein Rezept des Typs ausführen können.
+        unit_capacity_time: Engpass-Schranke je Teil des Zieltyps: max über Typen X von
+                            min_demand[Ziel, X] * min. Dauer(X) / group_slots[X].
+        """
+        self.index = index
+        n_types = index.n_types
+        producers = [[] for _ in range(n_types)]
+        for ti in range(index.n_transformations):
+            producers[index.output_ids[ti]].append(ti)
+        self.is_raw = np.array([not p for p in producers])
+
+        # Slots der Maschinen, die mindestens ein Rezept für den Typ beherrschen
+        self.group_slots = np.zeros(n_types, dtype=np.int64)
+        for tid, trans in enumerate(producers):
+            if trans:
+                capable = index.capability[:, trans].any(axis=1)
+                self.group_slots[tid] = int(index.slots[capable].sum())
+        self.min_duration = np.array([min((index.durations[ti] for ti in p), default=0) for p in producers],
+                                     dtype=np.float64)
+
+        self.earliest_completion = np.full(n_types, np.inf)
+        self.unit_work = np.full(n_types, np.inf)
+        self.recipe = np.full(n_types, -1, dtype=np.int64)
+        done = np.zeros(n_types, dtype=bool)
+        self._topo = []           # Typen in Reihenfolge Inputs vor Outputs
+        self._producers = producers
+
+        def visit(tid):
+            # Tiefensuche über die Rezepte (Output <- Inputs); Zyklen gelten als nicht herstellbar
+            if done[tid]:
+                return
+            done[tid] = True
+            if self.is_raw[tid]:
+                self.earliest_completion[tid] = 0.0
+                self.unit_work[tid] = 0.0
+                self._topo.append(tid)
+                return
+            for ti in producers[tid]:
+                inputs = np.flatnonzero(index.requirements[ti])
+                for inp in inputs:
+                    visit(inp)
+                ready = max((self.earliest_completion[i] for i in inputs), default=0.0)
+                self.earliest_completion[tid] = min(self.earliest_completion[tid], ready + index.durations[ti])
+                work = index.durations[ti] + sum(index.requirements[ti, i] * self.unit_work[i] for i in inputs)
+                if work < self.unit_work[tid]:
+                    self.unit_work[tid] = work
+                    self.recipe[tid] = ti
+            self._topo.append(tid)
+
+        for tid in range(n_types):
+            visit(tid)
+
+        self.min_demand = np.zeros((n_types, n_types), dtype=np.float64)
+        for tid in self._topo:
+            if self.is_raw[tid]:
+                continue
+            demand = None
+            for ti in producers[tid]:
+                inputs = np.flatnonzero(index.requirements[ti])
+                if not np.isfinite(self.earliest_completion[inputs]).all():
+                    continue                                      # Rezept mit nicht herstellbarem Input
+                # Typen eines Zyklus stehen noch auf 0, das hält die Schranke gültig
+                d = index.requirements[ti, inputs].astype(np.float64) @ self.min_demand[inputs]
+                demand = d if demand is None else np.minimum(demand, d)
+            if demand is not None:
+                self.min_demand[tid] = demand
+                self.min_demand[tid, tid] += 1.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._time_per_part = np.where(self.group_slots > 0, self.min_duration / self.group_slots, np.inf)
+            load = np.where(self.min_demand > 0, self.min_demand * self._time_per_part, 0.0)
+        self.unit_capacity_time = load.max(axis=1)
+        self.unit_capacity_time[~np.isfinite(self.earliest_completion)] = np.inf
+
+    def _counts(self, targets: dict):
+        counts = np.zeros(self.index.n_types)
+        for name, n in targets.items():
+            counts[self.index.name_ids[name]] += n
+        return counts
+
+    def makespan_lower_bound(self, targets: dict, elapsed: float = 0.0):
+        """
+        Untere Schranke der Ticks bis alle Zielstückzahlen targets ({PartType-Name: Anzahl}) ab einer leeren
+        Anlage gefertigt sind: Maximum aus kritischem Pfad der Zieltypen und Engpass-Kapazität der Mindeststückzahlen
+        (Arbeit je Typgruppe / deren Slots). elapsed wird addiert.
+        """
+        counts = self._counts(targets)
+        wanted = counts > 0
+        if not wanted.any():
+            return float(elapsed)
+        critical = self.earliest_completion[wanted].max()
+        demand = counts @ self.min_demand
+        with np.errstate(invalid="ignore"):
+            capacity = np.where(demand > 0, demand * self._time_per_part, 0.0).max()
+        return float(elapsed + max(critical, capacity))
+
+    def bound(self, name: str, count: int = 1):
+        """
+        O(1)-Schranke für count Teile eines einzelnen Typs: max(kritischer Pfad, count * Engpasszeit je Teil).
+        """
+        tid = self.index.name_ids[name]
+        return float(max(self.earliest_completion[tid], count * self.unit_capacity_time[tid]))
+
+    def deadline_reachable(self, targets: dict, deadline: float, elapsed: float = 0.0):
+        """
+        False, wenn die Schranke beweist, dass targets nicht bis zum Tick deadline fertig werden können.
+        Gilt für einen Neustart ab elapsed; bereits gefertigte Teile vorher aus targets abziehen.
+        """
+        return self.makespan_lower_bound(targets, elapsed) <= deadline
+
+    def earliest_from_state(self, anlage):
+        """
+        Kritischer Pfad ab dem aktuellen Anlagenzustand: früheste Verfügbarkeit (Ticks ab jetzt) je Typ-ID, wenn
+        vorhandene Teile sofort und Outputs laufender Jobs nach deren Restzeit verfügbar sind.
+        Gültige untere Schranke für das nächste Teil eines Typs auch bei vorhandenem Umlaufbestand.
+        """
+        index = self.index
+        avail = np.full(index.n_types, np.inf)
+        buffers = [anlage.global_buffer] + [m.input_buffer for m in anlage.machines] + [m.output_buffer for m in anlage.machines]
+        for buf in buffers:
+            for pt in buf.type_counts():
+                avail[index.type_ids[pt]] = 0.0
+        for m in anlage.machines:
+            for job in m.current_jobs:
+                tid = index.type_ids[job.transformation.output_type]
+                avail[tid] = min(avail[tid], m.remaining_time(job))
+        for tid in self._topo:
+            if self.is_raw[tid]:
+                avail[tid] = 0.0
+                continue
+            for ti in self._producers[tid]:
+                inputs = np.flatnonzero(index.requirements[ti])
+                ready = max((avail[i] for i in inputs), default=0.0)
+                avail[tid] = min(avail[tid], ready + index.durations[ti])
+        return avail
+
+    def optimality_gap(self, makespan: float, targets: dict):
+        """
+        Relativer Abstand eines erreichten Makespans zur unteren Schranke: (makespan - LB) / LB.
+        """
+        lb = self.makespan_lower_bound(targets)
+        return (makespan - lb) / lb if lb > 0 else 0.0
+
+
+_bounds_cache = weakref.WeakKeyDictionary()
+
+
+def plant_bounds(anlage) -> PlantBounds:
+    """
+    Liefert die PlantBounds einer Anlage; wird einmal je Anlage-Objekt berechnet und zwischengespeichert.
+    """
+    bounds = _bounds_cache.get(anlage)
+    if bounds is None:
+        bounds = PlantBounds(compile_plant(anlage))
+        _bounds_cache[anlage] = bounds
+    return bounds
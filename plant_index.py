@@ -0,0 +1,143 @@
+# File: plant_index.py
+# Kompilierter Index einer Anlage: PartType-IDs, Rezeptmatrix und Fähigkeitsmatrix
+import weakref
+
+import numpy as np
+
+from classes import CountBuffer, PartBuffer
+
+
+class PlantIndex:
+    def __init__(self, machine_types: list, all_part_types: list):
+        """
+        Übersetzt die (statische) Struktur einer Anlage in ganzzahlige Indizes und Matrizen.
+        machine_types: Maschinentyp je Maschine (in Maschinenreihenfolge).
+        all_part_types: Liste aller PartTypes; die Position ist die Typ-ID.
+
+        Attribute:
+        type_ids: Dictionary PartType -> Typ-ID, name_ids: Name -> Typ-ID.
+        transformations: Alle eindeutigen Transformationen in Reihenfolge des ersten Auftretens.
+        requirements: Matrix (Transformation x PartType) mit der benötigten Stückzahl je Input-Typ.
+        output_ids / durations: Output-Typ-ID und Dauer je Transformation.
+        capability: Bool-Matrix (Maschine x Transformation), ob die Maschine die Transformation beherrscht.
+        slots: Anzahl Slots je Maschine.
+        goal_distances: Kürzeste Pfadlänge (PartType x Ziel-PartType) im Produktionsgraphen, inf falls unerreichbar.
+        goal_potential: exp(-goal_distances), 0 für unerreichbare Ziele.
+        """
+        self.part_types = list(all_part_types)
+        self.n_types = len(self.part_types)
+        self.type_ids = {pt: i for i, pt in enumerate(self.part_types)}
+        self.name_ids = {pt.name: i for i, pt in enumerate(self.part_types)}
+
+        unique_trans = {}
+        for mt in machine_types:
+            for t in mt.transformations:
+                unique_trans[t] = True
+        self.transformations = list(unique_trans.keys())
+        self.trans_ids = {t: i for i, t in enumerate(self.transformations)}
+        self.n_transformations = len(self.transformations)
+        self.n_machines = len(machine_types)
+
+        self.requirements = np.zeros((self.n_transformations, self.n_types), dtype=np.int64)
+        self.output_ids = np.zeros(self.n_transformations, dtype=np.int64)
+        self.durations = np.zeros(self.n_transformations, dtype=np.int64)
+        for ti, t in enumerate(self.transformations):
+            for pt in t.input_types:
+                self.requirements[ti, self.type_ids[pt]] += 1
+            self.output_ids[ti] = self.type_ids[t.output_type]
+            self.durations[ti] = t.duration
+        # Sparse Rezepte (Liste von (Typ-ID, Anzahl)) für skalare Prüfungen.
+        self.recipes = [[(int(tid), int(self.requirements[ti, tid])) for tid in np.flatnonzero(self.requirements[ti])]
+                        for ti in range(self.n_transformations)]
+
+        self.capability = np.zeros((self.n_machines, self.n_transformations), dtype=bool)
+        for mi, mt in enumerate(machine_types):
+            for t in mt.transformations:
+                self.capability[mi, self.trans_ids[t]] = True
+        self.slots = np.array([mt.slots for mt in machine_types], dtype=np.int64)
+
+        # Distanztabelle (PartType x Ziel) im Produktionsgraphen und daraus das Shaping-Potential exp(-d).
+        self.goal_distances = self._compute_goal_distances()
+        with np.errstate(over="ignore"):
+            self.goal_potential = np.where(np.isfinite(self.goal_distances), np.exp(-self.goal_distances), 0.0)
+
+    def _compute_goal_distances(self):
+        # Breitensuche von jedem Ziel aus über den umgekehrten Graphen (Output -> Inputs).
+        predecessors = [set() for _ in range(self.n_types)]
+        for ti in range(self.n_transformations):
+            for tid in np.flatnonzero(self.requirements[ti]):
+                predecessors[self.output_ids[ti]].add(int(tid))
+        dist = np.full((self.n_types, self.n_types), np.inf)
+        for goal in range(self.n_types):
+            dist[goal, goal] = 0.0
+            frontier = [goal]
+            d = 0
+            while frontier:
+                d += 1
+                nxt = []
+                for node in frontier:
+                    for pred in predecessors[node]:
+                        if not np.isfinite(dist[pred, goal]):
+                            dist[pred, goal] = d
+                            nxt.append(pred)
+                frontier = nxt
+        return dist
+
+    def counts(self, parts) -> np.ndarray:
+        """
+        Zählvektor (je Typ-ID) für eine Sammlung von Part-Objekten.
+        Für einen PartBuffer werden direkt die Längen je Typ verwendet (O(Typen) statt O(Teile)),
+        ein CountBuffer (Zählmodus) liefert seinen Zählvektor.
+        """
+        if isinstance(parts, CountBuffer):
+            return parts.counts.copy()
+        if isinstance(parts, PartBuffer):
+            vec = np.zeros(self.n_types, dtype=np.int64)
+            for pt, n in parts.type_counts().items():
+                vec[self.type_ids[pt]] = n
+            return vec
+        ids = [self.type_ids[p.type] for p in parts]
+        return np.bincount(np.asarray(ids, dtype=np.int64), minlength=self.n_types)
+
+    def feasible_transformations(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Bool-Vektor (je Transformation), ob der Zählvektor counts alle Inputs abdeckt.
+        counts darf zusätzlich führende Batch-Dimensionen haben: (..., n_types) -> (..., n_transformations).
+        """
+        return np.all(self.requirements <= counts[..., None, :], axis=-1)
+
+    def feasible_pairs(self, machine_counts: np.ndarray) -> np.ndarray:
+        """
+        Bool-Matrix (Maschine x Transformation): welche Transformation kann auf welcher Maschine starten,
+        gegeben die Input-Zählvektoren aller Maschinen (Form n_machines x n_types).
+        """
+        return self.capability & self.feasible_transformations(machine_counts)
+
+    def action_layout(self, compact: bool = False):
+        """
+        Aktionstabellen ohne noop (Aktion a entspricht Index a-1): Maschine je Aktion, Transformation je Aktion und
+        die Rückrichtung als Matrix (Maschine x Transformation) mit der Aktions-ID, 0 für nicht kodierbare Paare.
+        compact=False: alle Paare, Aktion 1 + mi*n_transformations + ti.
+        compact=True: nur fähige Paare (capability), maschinenweise in Transformationsreihenfolge.
+        """
+        if compact:
+            machines, trans = np.nonzero(self.capability)
+        else:
+            machines, trans = np.divmod(np.arange(self.n_machines * self.n_transformations), self.n_transformations)
+        action_ids = np.zeros((self.n_machines, self.n_transformations), dtype=np.int64)
+        action_ids[machines, trans] = np.arange(1, len(machines) + 1)
+        return machines, trans, action_ids
+
+
+_index_cache = weakref.WeakKeyDictionary()
+
+
+def compile_plant(anlage) -> PlantIndex:
+    """
+    Liefert den PlantIndex einer Anlage; wird einmal je Anlage-Objekt berechnet und zwischengespeichert.
+    """
+    index = _index_cache.get(anlage)
+    if index is None:
+        index = PlantIndex([m.machine_type for m in anlage.machines], anlage.all_part_types)
+        _index_cache[anlage] = index
+    return index
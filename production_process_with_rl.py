@@ -1,89 +1,84 @@
 # File: production_process_with_rl.py
 # Simulation des hierarchischen Produktionsprozesses mit High-Level & Low-Level Agent
+# Ohne torch/SB3: Policies als NumPy-Export (numpy_policy.py), Zips werden bei Bedarf einmalig exportiert
+import argparse
 import os
-import numpy as np
-from sb3_contrib import MaskablePPO
-from sb3_contrib.common.wrappers import ActionMasker
-from stable_baselines3.common.vec_env import DummyVecEnv
+from event_log import EventLog
+from flexible_jobshop_env import OBS_MODES
 from hierarchical_env import HighLevelEnv
-from manufacturing_structure import anlage
+from manufacturing_structure import REQUIRED_PRODUCTS, MAX_HL_STEPS, SUBGOALS, build_anlage
+from model_encoding import check_encoding, model_path
+from numpy_policy import NumpyPolicy, export_policy
 
 # Modell-Pfade
 MODEL_LL = "lowlevel_ppo_model.zip"
 MODEL_HL = "highlevel_ppo_model.zip"
-LOG_FILE = "production_rl_event_log.txt"
-
-# Sicherstellen, dass beide Modelle existieren
-if not os.path.exists(MODEL_LL) or not os.path.exists(MODEL_HL):
-    print("Fehlende Modelle. Bitte zuerst Low- und High-Level trainieren.")
-    exit(1)
-
-# Modelle laden
-model_ll = MaskablePPO.load(MODEL_LL)
-model_hl = MaskablePPO.load(MODEL_HL)
-
-# Subgoals definieren (außer elementare Rohteile)
-elementary = {'a1','a2','a4','a5','a6','a8','a0'}
-SUBGOALS = [pt.name for pt in anlage.all_part_types if pt.name not in elementary]
-
-# High-Level Env erstellen und maskieren
-def make_hl_env():
-    env = HighLevelEnv(anlage, SUBGOALS)
-    return ActionMasker(env, lambda e: e.reset()[1]['action_mask'])
-
-vec_env = DummyVecEnv([make_hl_env])
-
-# Hilfsfunktion zum Loggen des Puffer- und Maschinenstatus
-
-def log_status():
-    lines = []
-    # Globaler Puffer
-    buf = anlage.global_buffer
-    lines.append("Global Buffer: " + ", ".join(f"{p.id}:{p.type.name}" for p in buf))
-    # Maschinenstatus
-    for m in anlage.machines:
-        inp = ", ".join(f"{p.id}:{p.type.name}" for p in m.input_buffer)
-        out = ", ".join(f"{p.id}:{p.type.name}" for p in m.output_buffer)
-        jobs = "; ".join("[" + ", ".join(f"{p.id}:{p.type.name}" for p in job['input_parts']) + "]" for job in m.current_jobs)
-        lines.append(f"Machine {m.machine_id}: Input [{inp}] | Output [{out}] | Jobs [{jobs}]")
-    return "\n".join(lines)
-
-# Simulation starten
-obs = vec_env.reset()
-logs = ["=== Hierarchical Produktionssimulation mit RL gestartet ===",
-        f"Initial HL-Observation: {obs}",
-        "Initialer Anlagenstatus:",
-        log_status()]
-
-step = 0
-terminated = False
-truncated = False
-
-while not (terminated or truncated):
-    # High-Level Agent wählt Subziel
-    action_hl, _ = model_hl.predict(obs, deterministic=True)
-    # Ausführen
-    ret = vec_env.step(action_hl)
-    # Entpacken je nach Gym-Version
-    if len(ret) == 5:
-        obs, reward_hl, terminated, truncated, info = ret
-    else:
-        obs, reward_hl, terminated, info = ret
+LOG_FILE = "production_rl_events.jsonl"
+
+def simulate(ll_policy, hl_policy, anlage=None, log_file=LOG_FILE, snapshot_every=0, compact_actions=False,
+             obs_mode="slots"):
+    """
+    Simuliert eine hierarchische Episode und protokolliert die Ereignisse fortlaufend nach log_file (JSON Lines).
+    ll_policy: Funktion (Observations, Masken) -> Aktionen, z.B. NumpyPolicy oder LowLevelPolicy.
+    hl_policy: Objekt mit predict(obs, deterministic, action_masks), z.B. NumpyPolicy oder MaskablePPO.
+    anlage: zu verwendende Anlage (Standard: frisch aufgebaute Beispielanlage).
+    snapshot_every: 0 = nur Ereignisse, k > 0 = zusätzlich alle k Zeitschritte ein Zählstand der Anlage.
+    compact_actions, obs_mode: Aktions- und Observation-Kodierung, mit der die Policies trainiert wurden.
+    Liefert die Summe der High-Level-Rewards.
+    """
+    anlage = anlage or build_anlage()
+
+    # High-Level Env erstellen; Subgoals führt die Low-Level-Policy aus
+    env = HighLevelEnv(anlage, SUBGOALS, REQUIRED_PRODUCTS, max_steps=MAX_HL_STEPS, ll_policy=ll_policy,
+                       compact_actions=compact_actions, obs_mode=obs_mode)
+
+    with EventLog(log_file, snapshot_every=snapshot_every) as log:
+        env.ll.event_log = log
+        # Simulation starten
+        obs, _ = env.reset()
+        total_reward = 0.0
+        terminated = False
         truncated = False
 
-    # Log-Eintrag
-    logs.append(f"\n--- HL Schritt {step} ---")
-    logs.append(f"Subgoal-Action: {action_hl} ({'noop' if action_hl==0 else SUBGOALS[action_hl-1]})")
-    logs.append(f"HL-Reward: {reward_hl}")
-    logs.append("Anlagenstatus nach Schritt:")
-    logs.append(log_status())
-    step += 1
-
-logs.append("=== Hierarchical Produktionssimulation beendet ===")
-
-# Logfile schreiben
-with open(LOG_FILE, "w", encoding="utf-8") as f:
-    f.write("\n".join(logs))
-
-print(f"Simulation abgeschlossen. Log in '{LOG_FILE}' gespeichert.")
-
+        while not (terminated or truncated):
+            # High-Level Agent wählt Subziel
+            action_hl, _ = hl_policy.predict(obs, deterministic=True, action_masks=env.action_masks())
+            # Ausführen
+            obs, reward_hl, terminated, truncated, info = env.step(int(action_hl))
+            total_reward += reward_hl
+        env.ll.event_log = None
+
+    print(f"Simulation abgeschlossen (HL-Reward {total_reward}). Ereignisse in '{log_file}' gespeichert.")
+    return total_reward
+
+def load_policy(model_zip):
+    """
+    Lädt den NumPy-Export neben model_zip (.npz); fehlt er, wird er einmalig aus dem Zip erzeugt (benötigt torch).
+    """
+    npz = os.path.splitext(model_zip)[0] + ".npz"
+    if not os.path.exists(npz) or os.path.getmtime(npz) < os.path.getmtime(model_zip):
+        export_policy(model_zip, npz)
+    return NumpyPolicy.load(npz)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hierarchische Produktionssimulation mit Ereignisprotokoll")
+    parser.add_argument("--log", default=LOG_FILE, help="Ereignisprotokoll (JSON Lines)")
+    parser.add_argument("--snapshot-every", type=int, default=0,
+                        help="alle k Zeitschritte einen Zählstand der Anlage protokollieren (0: nur Ereignisse)")
+    parser.add_argument("--compact-actions", action="store_true",
+                        help="Low-Level-Modell wurde mit train_low_level.py --compact-actions trainiert")
+    parser.add_argument("--obs-mode", choices=OBS_MODES, default="slots",
+                        help="Observation-Kodierung, mit der die Modelle trainiert wurden")
+    args = parser.parse_args()
+    # Sicherstellen, dass beide Modelle in der gewählten Kodierung existieren
+    model_ll = model_path(MODEL_LL, args.compact_actions, args.obs_mode)
+    model_hl = model_path(MODEL_HL, args.compact_actions, args.obs_mode)
+    if not os.path.exists(model_ll) or not os.path.exists(model_hl):
+        print(f"Fehlende Modelle ({model_ll}, {model_hl}). Bitte zuerst Low- und High-Level trainieren.")
+        exit(1)
+    for path in (model_ll, model_hl):
+        check_encoding(path, args.compact_actions, args.obs_mode)
+
+    # Modelle laden
+    simulate(load_policy(model_ll), load_policy(model_hl), log_file=args.log, snapshot_every=args.snapshot_every,
+             compact_actions=args.compact_actions, obs_mode=args.obs_mode)
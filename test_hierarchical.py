@@ -1,26 +1,34 @@
-import numpy as np
+# File: test_hierarchical.py
+# Eine hierarchische Test-Episode mit High-Level- und Low-Level-Policy
 from sb3_contrib import MaskablePPO
-from sb3_contrib.common.wrappers import ActionMasker
-from stable_baselines3.common.vec_env import DummyVecEnv
 from hierarchical_env import HighLevelEnv
-from manufacturing_structure import anlage
+from hierarchical_rollout import LowLevelPolicy
+from manufacturing_structure import build_anlage
+from train_high_level import MAX_HL_STEPS, REQUIRED_PRODUCTS, SUBGOALS
 
-# Lade Modelle
-model_ll = MaskablePPO.load("archive/lowlevel_ppo_model.zip")
-model_hl = MaskablePPO.load("archive/highlevel_ppo_model.zip")
 
-# High-Level Env
-SUBGOALS = [pt.name for pt in anlage.all_part_types if pt.name not in ['a1','a2','a4','a5','a6','a8','a0']]
-env_hl = HighLevelEnv(anlage, SUBGOALS)
-env_hl = ActionMasker(env_hl, lambda e: e.reset()[1]['action_mask'])
+def run_episode(model_hl, model_ll=None, anlage=None, compact_actions=False, obs_mode="slots"):
+    """
+    Spielt eine Episode mit bereits geladenen Modellen und liefert den High-Level-Reward.
+    model_ll: Low-Level-Modell; ohne Modell wählt das Low-Level die erste gültige Aktion.
+    anlage: zu verwendende Anlage (Standard: frisch aufgebaute Beispielanlage).
+    compact_actions, obs_mode: Aktions- und Observation-Kodierung, mit der die Modelle trainiert wurden.
+    """
+    ll_policy = LowLevelPolicy(model_ll) if model_ll is not None else None
+    env_hl = HighLevelEnv(anlage or build_anlage(), SUBGOALS, REQUIRED_PRODUCTS, max_steps=MAX_HL_STEPS,
+                          ll_policy=ll_policy, compact_actions=compact_actions, obs_mode=obs_mode)
+    episode_reward = 0.0
+    obs_hl, info_hl = env_hl.reset()
+    done = False
+    while not done:
+        action_hl, _ = model_hl.predict(obs_hl, deterministic=True, action_masks=env_hl.action_masks())
+        obs_hl, r, done, _, _ = env_hl.step(int(action_hl))
+        episode_reward += r
+    return episode_reward
 
-# Test-Episode
-episode_reward = 0.0
-obs_hl, info_hl = env_hl.reset()
-done = False
-while not done:
-    action_hl, _ = model_hl.predict(obs_hl, deterministic=True)
-    obs_hl, r, done, _, _ = env_hl.step(action_hl)
-    episode_reward += r
 
-print(f"Hierarchical Test Reward: {episode_reward}")
\ No newline at end of file
+if __name__ == "__main__":
+    # Lade Modelle
+    model_ll = MaskablePPO.load("archive/lowlevel_ppo_model.zip")
+    model_hl = MaskablePPO.load("archive/highlevel_ppo_model.zip")
+    print(f"Hierarchical Test Reward: {run_episode(model_hl, model_ll)}")
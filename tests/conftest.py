@@ -0,0 +1,6 @@
+# File: tests/conftest.py
+# Module liegen im Repository-Wurzelverzeichnis
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,22 @@
+# File: tests/test_benchmark_compare.py
+# Baseline-Vergleich: Zeit- und Gütemetriken getrennt, nicht vergleichbare Metriken werden gemeldet
+from benchmarks.suite import compare
+
+
+def _report(**results):
+    return {"results": {"dispatch": results}}
+
+
+def test_compare_rules():
+    baseline = _report(rule_us=10.0, rule_steps_per_sec=100.0, mwkr_episode_reward=-50.0, spt_episode_reward=20.0,
+                       lpt_episode_reward=0.0, old_us=1.0)
+    current = _report(rule_us=13.0, rule_steps_per_sec=90.0, mwkr_episode_reward=-70.0, spt_episode_reward=22.0,
+                      lpt_episode_reward=-0.1, new_us=5.0)
+    rows = {r["metric"]: r for r in compare(current, baseline, tolerance=0.2)}
+    assert rows["rule_us"]["regression"] and not rows["rule_steps_per_sec"]["regression"]
+    # negativer Reward: schlechter um 40 % der Baseline -> Regression, keine Zeitmetrik
+    assert rows["mwkr_episode_reward"]["ratio"] is None
+    assert abs(rows["mwkr_episode_reward"]["change"] + 0.4) < 1e-12 and rows["mwkr_episode_reward"]["regression"]
+    assert not rows["spt_episode_reward"]["regression"] and not rows["lpt_episode_reward"]["regression"]
+    assert rows["new_us"]["skipped"] and rows["old_us"]["skipped"]
+    assert not rows["new_us"]["regression"]
@@ -0,0 +1,108 @@
+# File: tests/test_count_state.py
+# Zählmodus der Anlage (part_identity=False) gegen das Objektmodell: gleiche Trajektorien, FIFO-Reihenfolge, Bewertung
+import numpy as np
+import pytest
+
+from classes import Part
+from flexible_jobshop_env import FlexibleJobShopEnv
+from manufacturing_structure import SUBGOALS, build_anlage
+
+
+@pytest.mark.parametrize("obs_mode,smdp", [("slots", False), ("counts", False), ("slots", True)])
+def test_env_matches_object_model(obs_mode, smdp, max_steps=40):
+    envs = []
+    for identity in (True, False):
+        anlage = build_anlage(part_identity=identity)
+        anlage.check_accounting = True
+        envs.append(FlexibleJobShopEnv(anlage, goal=SUBGOALS[3], max_steps=max_steps, smdp=smdp, obs_mode=obs_mode))
+    obj, cnt = envs
+    rng = np.random.default_rng(0)
+    for _ in range(3):
+        obs_o, info_o = obj.reset()
+        obs_c, info_c = cnt.reset()
+        done = False
+        while not done:
+            np.testing.assert_array_equal(obs_c, obs_o)
+            np.testing.assert_array_equal(info_c["action_mask"], info_o["action_mask"])
+            action = int(rng.choice(np.flatnonzero(info_o["action_mask"])))
+            obs_o, r_o, done, _, info_o = obj.step(action)
+            obs_c, r_c, done_c, _, info_c = cnt.step(action)
+            assert abs(r_c - r_o) < 1e-9 and done_c == done and info_c["tau"] == info_o["tau"]
+            np.testing.assert_array_equal(cnt.completed, obj.completed)
+            assert cnt.anlage.cost == pytest.approx(obj.anlage.cost)
+            assert cnt.anlage.current_value == pytest.approx(obj.anlage.current_value)
+            assert cnt.anlage.part_id_counter == obj.anlage.part_id_counter
+    # Zählmodus hält keine Part-Objekte je Teil
+    assert all(p.id is None for p in cnt.anlage.global_buffer)
+
+
+def test_snapshot_restore():
+    env = FlexibleJobShopEnv(build_anlage(part_identity=False), goal=SUBGOALS[0], max_steps=60)
+    _, info = env.reset()
+    rng = np.random.default_rng(1)
+    for _ in range(15):
+        _, _, _, _, info = env.step(int(rng.choice(np.flatnonzero(info["action_mask"]))))
+    snap = env.snapshot()
+    actions, first = [], []
+    for _ in range(20):
+        actions.append(int(rng.choice(np.flatnonzero(info["action_mask"]))))
+        obs, reward, _, _, info = env.step(actions[-1])
+        first.append((obs, reward))
+    env.restore(snap)
+    for action, (obs, reward) in zip(actions, first):
+        obs_r, reward_r, _, _, _ = env.step(action)
+        np.testing.assert_array_equal(obs_r, obs)
+        assert reward_r == pytest.approx(reward)
+
+
+def _fill(anlage):
+    # verschränkte Outputs auf zwei Maschinen und ein vorbelegter globaler Puffer
+    types = {pt.name: pt for pt in anlage.all_part_types}
+    seqs = {0: ["b1", "b2", "b1", "b1", "b3", "b2"], 1: ["b2", "b2", "b4", "b1"]}
+    for mi, names in seqs.items():
+        anlage.machines[mi].output_buffer.extend(Part(i, types[n]) for i, n in enumerate(names))
+    anlage.global_buffer.extend(Part(100 + i, types[n]) for i, n in enumerate(["a1", "b1", "a1"]))
+
+
+def _names(buffer):
+    return [p.type.name for p in buffer]
+
+
+def test_fifo_order_and_accounting():
+    plants = [build_anlage(part_identity=identity) for identity in (True, False)]
+    for anlage in plants:
+        _fill(anlage)
+        anlage.refill_global_buffer(9)
+    obj, cnt = plants
+    assert _names(cnt.global_buffer) == _names(obj.global_buffer)
+    assert _names(cnt.machines[1].output_buffer) == _names(obj.machines[1].output_buffer)
+    snaps = [anlage.snapshot() for anlage in plants]
+    # Entnahme aus der Mitte, danach Nachschub mit Rohteilen über die Kapazität hinaus
+    for anlage in plants:
+        types = {pt.name: pt for pt in anlage.all_part_types}
+        assert len(anlage.global_buffer.take(types["b1"], 3)) == 3
+        anlage.global_buffer.append(Part(200, types["b2"]))
+        anlage.refill_global_buffer(25)
+    assert _names(cnt.global_buffer) == _names(obj.global_buffer)
+    assert [p.type.name for p in cnt.global_buffer.popleft_many(7)] == [p.type.name for p in obj.global_buffer.popleft_many(7)]
+    for anlage in plants:
+        assert anlage.wip_profit() == pytest.approx(anlage.full_scan_profit())
+    assert cnt.wip_profit() == pytest.approx(obj.wip_profit())
+    for anlage, snap in zip(plants, snaps):
+        anlage.restore(snap)
+    assert _names(cnt.global_buffer) == _names(obj.global_buffer)
+    assert cnt.wip_profit() == pytest.approx(cnt.full_scan_profit())
+
+
+def test_memory_flat_in_wip():
+    totals = []
+    for n in (10, 10000):
+        anlage = build_anlage(part_identity=False)
+        a1 = anlage.part_table.token(anlage.all_part_types[0])
+        anlage.global_buffer.extend([a1] * n)
+        for m in anlage.machines:
+            m.input_buffer.extend(anlage.part_table.tokens[i % 5] for i in range(n))
+        report = anlage.memory_report()
+        assert report["parts"] == n * (1 + len(anlage.machines))
+        totals.append(report["total"])
+    assert totals[0] == totals[1]
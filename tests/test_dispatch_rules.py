@@ -0,0 +1,34 @@
+# File: tests/test_dispatch_rules.py
+# Prioritätsregeln auf Slot- und Zähl-Observations
+import pytest
+
+from dispatch_rules import RULES, DispatchPolicy
+from flexible_jobshop_env import FlexibleJobShopEnv
+from manufacturing_structure import build_anlage
+
+
+def _actions(rule, obs_mode, use_mask, n_steps=150):
+    anlage = build_anlage()
+    env = FlexibleJobShopEnv(anlage, goal="fp1", obs_mode=obs_mode, max_steps=n_steps)
+    policy = DispatchPolicy(anlage, rule, obs_mode=obs_mode)
+    obs, info = env.reset()
+    actions, done = [], False
+    while not done:
+        mask = info["action_mask"][None] if use_mask else None
+        action = int(policy(obs[None], mask)[0])
+        actions.append(action)
+        obs, _, done, _, info = env.step(action)
+    return actions
+
+
+@pytest.mark.parametrize("rule", [r for r in RULES if r != "fifo"])
+def test_counts_mode_matches_slots(rule):
+    expected = _actions(rule, "slots", use_mask=True)
+    assert _actions(rule, "counts", use_mask=True) == expected
+    # die Zähl-Observation enthält den ganzen Puffer, daraus folgt ohne Maske dieselbe Maske wie in der Env
+    assert _actions(rule, "counts", use_mask=False) == expected
+
+
+def test_fifo_requires_slots():
+    with pytest.raises(ValueError):
+        DispatchPolicy(build_anlage(), "fifo", obs_mode="counts")
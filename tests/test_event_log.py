@@ -0,0 +1,60 @@
+# File: tests/test_event_log.py
+# Zeitbereichsabfragen des EventReader gegen einen vollständigen Scan
+import json
+
+import numpy as np
+import pytest
+
+from event_log import EventLog, EventReader
+from flexible_jobshop_env import FlexibleJobShopEnv
+from manufacturing_structure import SUBGOALS, build_anlage
+
+
+def _record(path, smdp, n_episodes=3, seed=0):
+    rng = np.random.default_rng(seed)
+    env = FlexibleJobShopEnv(build_anlage(), goal=SUBGOALS[0], smdp=smdp)
+    # kleiner Indexabstand, damit der Reader tatsächlich mitten in die Datei springt
+    with EventLog(str(path), snapshot_every=5, index_every=7) as log:
+        env.event_log = log
+        for _ in range(n_episodes):
+            _, info = env.reset()
+            done = False
+            while not done:
+                action = int(rng.choice(np.flatnonzero(info["action_mask"])))
+                _, _, done, _, info = env.step(action)
+
+
+@pytest.mark.parametrize("smdp", [False, True])
+def test_range_queries_match_full_scan(tmp_path, smdp):
+    path = tmp_path / "events.jsonl"
+    _record(path, smdp)
+    with open(path, encoding="utf-8") as f:
+        all_events = [json.loads(line) for line in f]
+    times = [e["t"] for e in all_events]
+    assert times == sorted(times)
+    reader = EventReader(str(path))
+    assert list(reader) == all_events
+    t_max = times[-1]
+    for t_start in range(0, t_max + 1, 3):
+        for length in (0, 1, 5, 17):
+            t_end = t_start + length
+            expected = [e for e in all_events if t_start <= e["t"] <= t_end]
+            assert list(reader.events(t_start, t_end)) == expected
+
+
+def test_machine_and_kind_filter(tmp_path):
+    path = tmp_path / "events.jsonl"
+    _record(path, smdp=False, n_episodes=1)
+    with open(path, encoding="utf-8") as f:
+        all_events = [json.loads(line) for line in f]
+    machine = next(e["machine"] for e in all_events if "machine" in e)
+    expected = [e for e in all_events if e.get("machine") == machine and e["kind"] == "job_complete" and 10 <= e["t"] <= 30]
+    reader = EventReader(str(path))
+    assert list(reader.events(10, 30, machine=machine, kinds={"job_complete"})) == expected
+
+
+def test_emit_rejects_time_going_backwards(tmp_path):
+    with EventLog(str(tmp_path / "events.jsonl")) as log:
+        log.emit(3, "x")
+        with pytest.raises(ValueError):
+            log.emit(2, "x")
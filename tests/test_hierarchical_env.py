@@ -0,0 +1,25 @@
+# File: tests/test_hierarchical_env.py
+# High-Level-Observation nach einem Subgoal: kein veraltetes Ziel-One-Hot des Low-Level-Env
+import numpy as np
+import pytest
+
+from hierarchical_env import HighLevelEnv
+from manufacturing_structure import REQUIRED_PRODUCTS, SUBGOALS, build_anlage
+
+
+@pytest.mark.parametrize("obs_mode", ["slots", "counts"])
+def test_goal_cleared_after_subgoal(obs_mode):
+    env = HighLevelEnv(build_anlage(), SUBGOALS, REQUIRED_PRODUCTS, max_steps=10, obs_mode=obs_mode)
+    obs, _ = env.reset()
+    n_types = len(env.ll.index.part_types)
+    assert not obs[-n_types:].any()
+    env.begin_subgoal(SUBGOALS.index("b4") + 1)
+    assert env.ll._get_observation()[-n_types:].any()
+    while env.ll_pending:
+        env.ll_tick(int(np.argmax(env.ll.get_action_mask())))
+    obs, *_ = env.end_subgoal()
+    assert env.ll.goal is None
+    assert not obs[-n_types:].any()
+    # noop danach zeigt ebenfalls kein Ziel
+    obs, *_ = env.step(0)
+    assert not obs[-n_types:].any()
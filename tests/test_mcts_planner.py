@@ -0,0 +1,45 @@
+# File: tests/test_mcts_planner.py
+# Suche ab einem laufenden Anlagenzustand: Snapshot einer fremden Env wird im Worker exakt wiederhergestellt
+import numpy as np
+
+from hierarchical_env import HighLevelEnv
+from manufacturing_structure import REQUIRED_PRODUCTS, SUBGOALS, build_anlage
+from mcts_planner import MCTSPlanner, dump_state
+
+
+def _mid_subgoal_env():
+    # High-Level-Env mitten in einem Subgoal, nach noop-Nachschub und laufenden Jobs
+    env = HighLevelEnv(build_anlage(), SUBGOALS, REQUIRED_PRODUCTS, max_steps=50)
+    env.reset()
+    env.step(SUBGOALS.index("b2") + 1)
+    env.step(0)
+    env.begin_subgoal(SUBGOALS.index("b4") + 1)
+    for _ in range(7):
+        env.ll_tick(int(np.argmax(env.ll.get_action_mask())))
+    return env
+
+
+def test_worker_restores_live_state():
+    env = _mid_subgoal_env()
+    with MCTSPlanner(max_simulations=10) as planner:
+        worker = planner._local
+        assert worker.set_root(dump_state(env.ll.snapshot()), env.ll.goal)
+        assert worker.env.anlage is not env.anlage
+        np.testing.assert_array_equal(worker._obs, env.ll._get_observation())
+        np.testing.assert_array_equal(worker._mask, env.ll.get_action_mask())
+        # beide Envs laufen mit denselben Aktionen identisch weiter
+        for _ in range(30):
+            action = int(np.flatnonzero(env.ll.get_action_mask())[-1])
+            obs, reward, done, _, _ = env.ll.step(action)
+            obs_w, reward_w, done_w, _, _ = worker.env.step(action)
+            np.testing.assert_array_equal(obs, obs_w)
+            assert (reward, done) == (reward_w, done_w)
+
+
+def test_plan_returns_valid_action():
+    env = _mid_subgoal_env()
+    mask = env.ll.get_action_mask()
+    with MCTSPlanner(max_simulations=20, time_budget=10.0) as planner:
+        action = planner.plan(env.ll.snapshot(), env.ll.goal)
+    assert mask[action]
+    assert planner.last_simulations == 20
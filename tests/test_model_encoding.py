@@ -0,0 +1,32 @@
+# File: tests/test_model_encoding.py
+# Kodierung gespeicherter Modelle: Pfad je Kodierung, Metadaten und Fehler bei Abweichung
+import pytest
+
+from evaluate import resolve_encoding
+from model_encoding import check_encoding, load_encoding, model_path, save_encoding
+
+
+def test_model_path_per_encoding():
+    base = "lowlevel_ppo_model.zip"
+    paths = {model_path(base, compact, mode) for compact in (False, True) for mode in ("slots", "counts")}
+    assert model_path(base) == base
+    assert len(paths) == 4
+
+
+def test_mismatch_raises(tmp_path):
+    path = str(tmp_path / "model.zip")
+    save_encoding(path, compact_actions=True, obs_mode="counts")
+    check_encoding(path, compact_actions=True, obs_mode="counts")
+    with pytest.raises(ValueError):
+        check_encoding(path, compact_actions=False, obs_mode="counts")
+    with pytest.raises(ValueError):
+        resolve_encoding(["numpy:" + path, "rule:fifo"], obs_mode="slots")
+
+
+def test_resolve_from_metadata(tmp_path):
+    path = str(tmp_path / "model.npz")
+    save_encoding(path, compact_actions=True, obs_mode="counts")
+    assert resolve_encoding([path, None]) == {"compact_actions": True, "obs_mode": "counts"}
+    # Modelle ohne Metadaten und reine Regeln nutzen die Standardkodierung
+    assert load_encoding(str(tmp_path / "legacy.zip")) == {"compact_actions": False, "obs_mode": "slots"}
+    assert resolve_encoding(["rule:mwkr"], compact_actions=True) == {"compact_actions": True, "obs_mode": "slots"}
@@ -0,0 +1,68 @@
+# File: tests/test_numpy_policy.py
+# NumPy-Inferenz: Speichern/Laden und Maskierung ohne SB3, Parität zu einer frisch initialisierten MaskablePPO mit SB3
+import numpy as np
+import pytest
+
+from flexible_jobshop_env import FlexibleJobShopEnv
+from manufacturing_structure import SUBGOALS, build_anlage
+from numpy_policy import NumpyPolicy, _activation_from_data, check_parity, export_policy, from_model
+
+
+def _random_policy(obs_dim=12, n_actions=5, seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = [obs_dim, 16, 16, n_actions]
+    return NumpyPolicy([rng.normal(size=(a, b)) for a, b in zip(sizes, sizes[1:])],
+                       [rng.normal(size=b) for b in sizes[1:]], activation="relu")
+
+
+def test_save_load_and_masking(tmp_path):
+    policy = _random_policy()
+    path = str(tmp_path / "policy.npz")
+    policy.save(path)
+    loaded = NumpyPolicy.load(path)
+    obs = np.random.default_rng(1).normal(size=(64, policy.obs_dim)).astype(np.float32)
+    np.testing.assert_array_equal(loaded.logits(obs), policy.logits(obs))
+    assert loaded.activation == "relu"
+    masks = np.zeros((64, policy.n_actions), dtype=bool)
+    masks[:, 3] = True
+    assert (loaded(obs, masks) == 3).all()
+    assert (loaded(obs, masks, deterministic=False) == 3).all()
+
+
+def test_activation_names():
+    def detect(fn):
+        return _activation_from_data({"policy_kwargs": {"activation_fn": fn}})
+    assert detect("<class 'torch.nn.modules.activation.ReLU'>") == "relu"
+    assert detect("<class 'torch.nn.modules.activation.Tanh'>") == "tanh"
+    assert detect("ReLU") == "relu"
+    assert _activation_from_data({}) == "tanh"
+    for fn in ("<class 'torch.nn.modules.activation.LeakyReLU'>", "<class 'torch.nn.modules.activation.ReLU6'>", "GELU"):
+        with pytest.raises(ValueError):
+            detect(fn)
+
+
+@pytest.mark.parametrize("activation", ["tanh", "relu"])
+def test_export_matches_maskable_ppo(tmp_path, activation):
+    torch = pytest.importorskip("torch")
+    sb3_contrib = pytest.importorskip("sb3_contrib")
+    env = FlexibleJobShopEnv(build_anlage(), goal=SUBGOALS[0])
+    activation_fn = {"tanh": torch.nn.Tanh, "relu": torch.nn.ReLU}[activation]
+    model = sb3_contrib.MaskablePPO("MlpPolicy", env, seed=0, device="cpu",
+                                    policy_kwargs={"activation_fn": activation_fn})
+    src = str(tmp_path / "model.zip")
+    model.save(src)
+    policy = export_policy(src, str(tmp_path / "model.npz"))
+    assert policy.activation == activation
+
+    rng = np.random.default_rng(0)
+    obs = rng.uniform(0, 20, size=(256,) + env.observation_space.shape).astype(np.float32)
+    obs_tensor, _ = model.policy.obs_to_tensor(obs)
+    with torch.no_grad():
+        expected = model.policy.get_distribution(obs_tensor).distribution.logits.cpu().numpy()
+    # SB3 normiert die Logits (log-softmax); verglichen wird bis auf die Konstante je Zeile
+    actual = policy.logits(obs)
+    np.testing.assert_allclose(actual - actual.max(axis=1, keepdims=True),
+                               expected - expected.max(axis=1, keepdims=True), atol=1e-4)
+    np.testing.assert_allclose(from_model(model).logits(obs), actual, atol=1e-6)
+    # maskierter Argmax wie MaskablePPO.predict
+    assert check_parity(src, policy, n_samples=500) >= 0.999
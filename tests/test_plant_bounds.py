@@ -0,0 +1,75 @@
+# File: tests/test_plant_bounds.py
+# Untere Schranken bei alternativen Rezepten und Abschneiden unerreichbarer Deadlines
+import numpy as np
+
+import classes
+from dispatch_rules import DispatchPolicy
+from flexible_jobshop_env import FlexibleJobShopEnv
+from hierarchical_env import HighLevelEnv
+from manufacturing_structure import SUBGOALS, build_anlage
+from plant_bounds import PlantBounds
+from plant_index import compile_plant
+
+
+def _alternative_plant():
+    # t entsteht entweder aus x (wenig Arbeit, x nur auf einem Slot) oder aus y (mehr Arbeit, y auf zehn Slots)
+    rx, ry = classes.PartType("rx", cost=1), classes.PartType("ry", cost=1)
+    x, y = classes.PartType("x", cost=0), classes.PartType("y", cost=0)
+    t = classes.PartType("t", cost=0, value=10)
+    make_x = classes.Transformation([rx], x, 3)
+    make_y = classes.Transformation([ry], y, 3)
+    t_from_x = classes.Transformation([x], t, 1)
+    t_from_y = classes.Transformation([y], t, 2)
+    machines = [classes.Machine(classes.MachineType("mx", 1, [make_x]), "mx"),
+                classes.Machine(classes.MachineType("my", 10, [make_y]), "my"),
+                classes.Machine(classes.MachineType("mt", 10, [t_from_x, t_from_y]), "mt")]
+    return classes.Anlage(machines, 0, [], [rx, ry, x, y, t])
+
+
+def test_alternative_recipes_keep_bound_sound():
+    bounds = PlantBounds(compile_plant(_alternative_plant()))
+    ids = bounds.index.name_ids
+    # je Typ das Minimum über die Rezepte: weder x noch y wird zwingend gebraucht
+    assert bounds.min_demand[ids["t"], ids["x"]] == 0
+    assert bounds.min_demand[ids["t"], ids["y"]] == 0
+    assert bounds.min_demand[ids["t"], ids["t"]] == 1
+    # zehn t über y: alle y parallel in 3 Ticks, dann alle t parallel in 2 Ticks
+    assert bounds.makespan_lower_bound({"t": 10}) <= 5
+    assert bounds.bound("t", 10) <= 5
+
+
+def test_earliest_from_state_is_a_lower_bound():
+    anlage = build_anlage()
+    env = FlexibleJobShopEnv(anlage, goal="fp1", max_steps=200)
+    policy = DispatchPolicy(anlage, "mwkr")
+    bounds = PlantBounds(compile_plant(anlage))
+    obs, info = env.reset()
+    predicted, finished, done = [], [], False
+    while not done:
+        predicted.append((anlage.timestep, bounds.earliest_from_state(anlage)))
+        before = env.completed.copy()
+        obs, _, done, _, info = env.step(int(policy(obs[None], info["action_mask"][None])[0]))
+        finished.extend((anlage.timestep, tid) for tid in np.flatnonzero(env.completed > before))
+    assert finished
+    # das nächste fertige Teil jedes Typs erscheint nicht vor der Schranke
+    for t, earliest in predicted:
+        first = {}
+        for t_done, tid in finished:
+            if t_done > t:
+                first.setdefault(tid, t_done)
+        for tid, t_done in first.items():
+            assert t_done >= t + earliest[tid]
+
+
+def test_truncate_infeasible_deadline():
+    required = [{"part_type": "fp1", "count": 1, "deadline": 3}]
+    env = HighLevelEnv(build_anlage(), SUBGOALS, required, max_steps=50, truncate_infeasible=True)
+    env.reset()
+    # nur noop: die Zeit steht, bis die Deadline verstrichen ist
+    results = [env.step(0) for _ in range(4)]
+    assert [r[3] for r in results] == [False, False, False, True]
+    assert not any(r[2] for r in results)
+
+    plain = HighLevelEnv(build_anlage(), SUBGOALS, required, max_steps=50)
+    plain.reset()
+    assert not any(plain.step(0)[3] for _ in range(10))
@@ -0,0 +1,60 @@
+# File: tests/test_trajectory_recorder.py
+# Aufzeichnung über mehrere Blöcke: Episodenindex, Folge-Observations am Episodenende und abgebrochene Indexzeile
+import numpy as np
+import pytest
+
+from flexible_jobshop_env import FlexibleJobShopEnv
+from manufacturing_structure import SUBGOALS, build_anlage
+from trajectory_recorder import INDEX_FILE, TrajectoryDataset, TrajectoryRecorder
+
+
+def _record(root, n_episodes=4, max_steps=13, chunk_size=10, cut_last=True, seed=0):
+    """
+    Zeichnet Episoden auf und liefert die erwarteten Folge-Observations je Transition.
+    Die letzte Episode wird mitten drin per close() beendet (reset/close ohne terminated).
+    """
+    rng = np.random.default_rng(seed)
+    env = TrajectoryRecorder(FlexibleJobShopEnv(build_anlage(), goal=SUBGOALS[0], max_steps=max_steps),
+                             str(root), chunk_size=chunk_size)
+    next_obs = []
+    for ep in range(n_episodes):
+        env.reset()
+        done, steps = False, 0
+        while not done:
+            mask = env.unwrapped.get_action_mask()
+            obs, _, terminated, truncated, _ = env.step(int(rng.choice(np.flatnonzero(mask))))
+            next_obs.append(obs)
+            done = terminated or truncated
+            steps += 1
+            if cut_last and ep == n_episodes - 1 and steps == 5:
+                break
+    env.close()
+    return np.stack(next_obs)
+
+
+def test_next_obs_and_episodes(tmp_path):
+    expected = _record(tmp_path)
+    data = TrajectoryDataset(str(tmp_path))
+    assert len(data) == len(expected) == 3 * 13 + 5
+    assert data.episodes == [(0, 13), (13, 13), (26, 13), (39, 5)]
+    np.testing.assert_array_equal(data.next_obs(0, len(data)), expected)
+    # Teilbereiche über Block- und Episodengrenzen
+    np.testing.assert_array_equal(data.next_obs(9, 27), expected[9:27])
+    np.testing.assert_array_equal(data.next_obs(12, 13), expected[12:13])
+    obs = data.slice("obs", 0, len(data))
+    np.testing.assert_array_equal(obs[1:13], expected[:12])
+
+
+def test_index_is_appended_and_truncated_line_ignored(tmp_path):
+    _record(tmp_path)
+    index = tmp_path / INDEX_FILE
+    lines = index.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 5   # vier volle Blöcke und der Rest beim close()
+    # Absturz während der letzten Indexzeile: die Zeile fehlt im Datensatz, alles davor bleibt lesbar
+    index.write_text("\n".join(lines[:-1]) + "\n" + lines[-1][:len(lines[-1]) // 2], encoding="utf-8")
+    data = TrajectoryDataset(str(tmp_path))
+    assert len(data) == 40
+    assert data.episodes == [(0, 13), (13, 13), (26, 13)]
+    data.next_obs(0, 39)
+    with pytest.raises(ValueError):
+        data.next_obs(0, 40)   # Transition 39 gehört zur noch laufenden Episode
@@ -0,0 +1,38 @@
+# File: tests/test_vec_jobshop_env.py
+# Gebündeltes VecEnv gegen FlexibleJobShopEnv: gleiche Observations (inkl. Pufferreihenfolge), Masken und Rewards
+import numpy as np
+import pytest
+
+pytest.importorskip("stable_baselines3")
+
+from flexible_jobshop_env import FlexibleJobShopEnv  # noqa: E402
+from manufacturing_structure import SUBGOALS, build_anlage  # noqa: E402
+from vec_jobshop_env import BatchedJobShopVecEnv  # noqa: E402
+
+
+@pytest.mark.parametrize("max_buffer", [4, 10, 25])
+@pytest.mark.parametrize("compact_actions", [False, True])
+def test_matches_single_envs(max_buffer, compact_actions, n_envs=4, max_steps=40):
+    vec = BatchedJobShopVecEnv(build_anlage(), n_envs, SUBGOALS, max_buffer=max_buffer, max_steps=max_steps,
+                               seed=1, compact_actions=compact_actions)
+    envs = [FlexibleJobShopEnv(build_anlage(), max_buffer=max_buffer, max_steps=max_steps,
+                               compact_actions=compact_actions) for _ in range(n_envs)]
+
+    def reset(i):
+        envs[i].goal = vec.index.part_types[vec.goal_ids[i]].name
+        return envs[i].reset()[0]
+
+    obs = vec.reset()
+    expected = np.stack([reset(i) for i in range(n_envs)])
+    rng = np.random.default_rng(0)
+    for _ in range(2 * max_steps + 5):   # über ein Episodenende hinaus
+        np.testing.assert_array_equal(obs, expected)
+        masks = vec.action_masks()
+        np.testing.assert_array_equal(masks, np.stack([env.get_action_mask() for env in envs]).astype(bool))
+        actions = np.array([rng.choice(np.flatnonzero(m)) for m in masks])
+        obs, rewards, dones, infos = vec.step(actions)
+        results = [env.step(int(a)) for env, a in zip(envs, actions)]
+        np.testing.assert_allclose(rewards, [r[1] for r in results], atol=1e-4)
+        expected = np.stack([reset(i) if dones[i] else r[0] for i, r in enumerate(results)])
+        for i in np.flatnonzero(dones):
+            np.testing.assert_array_equal(infos[i]["terminal_observation"], results[i][0])
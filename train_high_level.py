@@ -1,36 +1,107 @@
+import argparse
+import functools
 import os
 import numpy as np
 from sb3_contrib import MaskablePPO
 from sb3_contrib.common.wrappers import ActionMasker
-from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+from flexible_jobshop_env import OBS_MODES
 from hierarchical_env import HighLevelEnv
-from manufacturing_structure import anlage
+from hierarchical_rollout import HierarchicalVecEnv, LowLevelPolicy
+from manufacturing_structure import MAX_HL_STEPS, REQUIRED_PRODUCTS, SUBGOALS, build_anlage
+from model_encoding import check_encoding, model_path, save_encoding
 
 MODEL_HL = "highlevel_ppo_model.zip"
+MODEL_LL = "lowlevel_ppo_model.zip"
 TOTAL_TIMESTEPS = 100_000
-MAX_HL_STEPS = 10
-# Definiere Subziele (alle PartTypes außer Rohmaterialien)
-elementary = {'a1','a2','a4','a5','a6','a8','a0'}
-SUBGOALS = [pt.name for pt in anlage.all_part_types if pt.name not in elementary]
-
-# Factory
-
-def make_hl_env():
-    env = HighLevelEnv(anlage, SUBGOALS, max_steps=MAX_HL_STEPS)
-    return ActionMasker(env, lambda e: e.reset()[1]["action_mask"] )
-
-vec_hl = DummyVecEnv([make_hl_env])
-
-# Modell laden oder initialisieren
-if os.path.exists(MODEL_HL):
-    try:
-        model_hl = MaskablePPO.load(MODEL_HL, env=vec_hl)
-    except ValueError:
-        model_hl = MaskablePPO('MlpPolicy', vec_hl, verbose=1)
-else:
-    model_hl = MaskablePPO('MlpPolicy', vec_hl, verbose=1)
-
-# Training
-model_hl.learn(total_timesteps=TOTAL_TIMESTEPS)
-model_hl.save(MODEL_HL)
-print("High-Level Training abgeschlossen.")
\ No newline at end of file
+
+# Trainierte Low-Level-Policy laden (ohne Modell wählt das Low-Level die erste gültige Aktion)
+
+def load_ll_policy(compact_actions=False, obs_mode="slots"):
+    path = model_path(MODEL_LL, compact_actions, obs_mode)
+    if not os.path.exists(path):
+        print(f"Kein Low-Level-Modell '{path}' gefunden, Low-Level wählt die erste gültige Aktion.")
+        return None
+    check_encoding(path, compact_actions, obs_mode)
+    return LowLevelPolicy(MaskablePPO.load(path, device="cpu"))
+
+# Factory: jede Env erhält ihre eigene Anlage
+
+def make_hl_env(ll_policy=None, compact_actions=False, obs_mode="slots", truncate_infeasible=False):
+    env = HighLevelEnv(build_anlage(), SUBGOALS, REQUIRED_PRODUCTS, max_steps=MAX_HL_STEPS, ll_policy=ll_policy,
+                       compact_actions=compact_actions, obs_mode=obs_mode, truncate_infeasible=truncate_infeasible)
+    return ActionMasker(env, lambda e: e._get_action_mask())
+
+def make_subproc_hl_env(compact_actions=False, obs_mode="slots", truncate_infeasible=False):
+    # Low-Level-Modell je Worker-Prozess laden
+    return make_hl_env(load_ll_policy(compact_actions, obs_mode), compact_actions, obs_mode, truncate_infeasible)
+
+# hierarchical: alle Envs im Prozess, Low-Level-Policy gebündelt (ein Forward-Pass je Low-Level-Tick)
+
+def make_vec_env(n_envs=1, vec="hierarchical", ll_model=None, compact_actions=False, obs_mode="slots",
+                 truncate_infeasible=False):
+    """
+    ll_model: bereits geladenes Low-Level-Modell (sonst wird MODEL_LL geladen; subproc lädt immer je Worker).
+    compact_actions, obs_mode: Aktions- und Observation-Kodierung, mit der das Low-Level-Modell trainiert wurde.
+    truncate_infeasible: Episoden mit beweisbar verfehlter Deadline abschneiden (siehe HighLevelEnv).
+    """
+    if vec == "subproc":
+        return SubprocVecEnv([functools.partial(make_subproc_hl_env, compact_actions, obs_mode, truncate_infeasible)
+                              for _ in range(n_envs)])
+    ll_policy = LowLevelPolicy(ll_model) if ll_model is not None else load_ll_policy(compact_actions, obs_mode)
+    if vec == "hierarchical":
+        def make_env():
+            return HighLevelEnv(build_anlage(), SUBGOALS, REQUIRED_PRODUCTS, max_steps=MAX_HL_STEPS,
+                                compact_actions=compact_actions, obs_mode=obs_mode,
+                                truncate_infeasible=truncate_infeasible)
+        return HierarchicalVecEnv([make_env for _ in range(n_envs)], ll_policy=ll_policy)
+    return DummyVecEnv([lambda: make_hl_env(ll_policy, compact_actions, obs_mode, truncate_infeasible)
+                        for _ in range(n_envs)])
+
+def train(n_envs=1, vec="hierarchical", total_timesteps=TOTAL_TIMESTEPS, ll_model=None, resume=True, seed=None,
+          compact_actions=False, obs_mode="slots", truncate_infeasible=False):
+    """
+    ll_model: Low-Level-Modell aus dem Speicher (z.B. aus der Pipeline) statt MODEL_LL von der Platte.
+    resume: vorhandenes Modell MODEL_HL weitertrainieren; False startet mit frischen Gewichten.
+    compact_actions, obs_mode: Kodierungen des Low-Level-Modells (siehe train_low_level.train).
+    truncate_infeasible: Episoden abschneiden, sobald eine Deadline beweisbar nicht mehr erreichbar ist.
+    Gespeichert wird unter model_path(MODEL_HL, ...) mit der Kodierung als Metadaten (wie beim Low-Level).
+    """
+    path = model_path(MODEL_HL, compact_actions, obs_mode)
+    vec_hl = make_vec_env(n_envs, vec, ll_model, compact_actions, obs_mode, truncate_infeasible)
+    # Modell laden oder initialisieren
+    model_hl = None
+    if resume and os.path.exists(path):
+        check_encoding(path, compact_actions, obs_mode)
+        try:
+            model_hl = MaskablePPO.load(path, env=vec_hl)
+        except ValueError as e:
+            raise ValueError(f"'{path}' passt nicht zur Env ({e}); mit --no-resume neu trainieren") from e
+    if model_hl is None:
+        model_hl = MaskablePPO('MlpPolicy', vec_hl, verbose=1, seed=seed)
+
+    # Training
+    model_hl.learn(total_timesteps=total_timesteps)
+    model_hl.save(path)
+    save_encoding(path, compact_actions, obs_mode)
+    vec_hl.close()
+    print("High-Level Training abgeschlossen.")
+    return model_hl
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="High-Level MaskablePPO Training")
+    parser.add_argument("--n-envs", type=int, default=1, help="Anzahl paralleler Envs (je Env eine eigene Anlage)")
+    parser.add_argument("--vec", choices=["hierarchical", "dummy", "subproc"], default="hierarchical",
+                        help="hierarchical: Low-Level-Inferenz gebündelt über alle Envs, "
+                             "dummy: ein Prozess, subproc: ein Worker-Prozess je Env")
+    parser.add_argument("--total-timesteps", type=int, default=TOTAL_TIMESTEPS)
+    parser.add_argument("--compact-actions", action="store_true",
+                        help="Low-Level-Modell wurde mit train_low_level.py --compact-actions trainiert")
+    parser.add_argument("--obs-mode", choices=OBS_MODES, default="slots",
+                        help="Observation-Kodierung, mit der das Low-Level-Modell trainiert wurde")
+    parser.add_argument("--truncate-infeasible", action="store_true",
+                        help="Episoden abschneiden, sobald plant_bounds eine verfehlte Deadline beweist")
+    parser.add_argument("--no-resume", action="store_true", help="vorhandenes Modell ignorieren und neu trainieren")
+    args = parser.parse_args()
+    train(n_envs=args.n_envs, vec=args.vec, total_timesteps=args.total_timesteps, resume=not args.no_resume,
+          compact_actions=args.compact_actions, obs_mode=args.obs_mode, truncate_infeasible=args.truncate_infeasible)
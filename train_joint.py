@@ -1,6 +1,8 @@
-import subprocess
+# File: train_joint.py
+# Zuerst Low-Level, dann High-Level (im selben Prozess, Low-Level-Modell wird im Speicher übergeben)
+import train_high_level
+import train_low_level
 
-# Zuerst Low-Level, dann High-Level
-subprocess.run(["python", "train_low_level.py"], check=True)
-subprocess.run(["python", "train_high_level.py"], check=True)
-print("Joint-Training (Low+High) abgeschlossen.")
\ No newline at end of file
+model_ll = train_low_level.train()
+train_high_level.train(ll_model=model_ll)
+print("Joint-Training (Low+High) abgeschlossen.")
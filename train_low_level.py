@@ -1,13 +1,15 @@
 # File: train_low_level.py
 # Goal-conditioned Low-Level PPO Training für flexible_jobshop_env
+import argparse
+import functools
 import os
-import random
 import gymnasium as gym
 from sb3_contrib import MaskablePPO
 from sb3_contrib.common.wrappers import ActionMasker
-from stable_baselines3.common.vec_env import DummyVecEnv
-from flexible_jobshop_env import FlexibleJobShopEnv
-from manufacturing_structure import anlage
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+from flexible_jobshop_env import OBS_MODES, FlexibleJobShopEnv
+from manufacturing_structure import anlage, build_anlage
+from model_encoding import check_encoding, model_path, save_encoding
 
 # Definiere Subgoals: alle PartTypes außer elementaren Rohmaterialien
 elementary = {'a1','a2','a4','a5','a6','a8','a0'}
@@ -22,36 +24,81 @@ class GoalSamplerEnv(FlexibleJobShopEnv):
     """
     FlexibleJobShopEnv, das bei jedem reset() ein zufälliges Subgoal setzt.
     """
-    def __init__(self, anlage, subgoals, max_buffer, max_steps):
-        super().__init__(anlage, max_buffer=max_buffer, max_steps=max_steps, goal=None)
+    def __init__(self, anlage, subgoals, max_buffer, max_steps, compact_actions=False, obs_mode="slots"):
+        super().__init__(anlage, max_buffer=max_buffer, max_steps=max_steps, goal=None, compact_actions=compact_actions,
+                         obs_mode=obs_mode)
         self.subgoals = subgoals
 
     def reset(self, seed=None, options=None):
-        # Wähle zufälliges Subgoal
-        self.goal = random.choice(self.subgoals)
-        # Basis-Reset aufrufen
+        # Basis-Reset aufrufen (setzt ggf. den Seed von np_random)
         obs, info = super().reset(seed=seed, options=options)
-        return obs, info
+        # Wähle zufälliges Subgoal über den Env-eigenen Generator (unabhängig je Worker-Prozess)
+        self.goal = self.subgoals[self.np_random.integers(len(self.subgoals))]
+        return self._get_observation(), info
 
-# Factory-Funktion: erstellt einen maskierbaren, goal-conditioned Env
+# Factory-Funktion: erstellt einen maskierbaren, goal-conditioned Env mit eigener Anlage
 
-def make_env():
-    env = GoalSamplerEnv(anlage, SUBGOALS, MAX_BUFFER, MAX_STEPS)
+def make_env(compact_actions=False, obs_mode="slots"):
+    env = GoalSamplerEnv(build_anlage(), SUBGOALS, MAX_BUFFER, MAX_STEPS, compact_actions, obs_mode)
     return ActionMasker(env, lambda e: e.get_action_mask())
 
-# Vektor-Umgebung
-vec_env = DummyVecEnv([make_env])
-
-# Modell laden oder neu initialisieren
-if os.path.exists(MODEL_LL):
-    try:
-        model = MaskablePPO.load(MODEL_LL, env=vec_env)
-    except ValueError:
-        model = MaskablePPO("MlpPolicy", vec_env, verbose=1)
-else:
-    model = MaskablePPO("MlpPolicy", vec_env, verbose=1)
-
-# Training
-model.learn(total_timesteps=TOTAL_TIMESTEPS)
-model.save(MODEL_LL)
-print("Low-Level goal-conditioned Training abgeschlossen.")
+# Vektor-Umgebung: dummy (ein Prozess), subproc (ein Prozess je Env) oder batched (NumPy-Batch)
+
+def make_vec_env(n_envs=1, vec="dummy", compact_actions=False, obs_mode="slots"):
+    if vec == "batched":
+        if obs_mode != "slots":
+            raise ValueError("BatchedJobShopVecEnv unterstützt nur obs_mode='slots'")
+        from vec_jobshop_env import BatchedJobShopVecEnv
+        return BatchedJobShopVecEnv(build_anlage(), n_envs, SUBGOALS, max_buffer=MAX_BUFFER, max_steps=MAX_STEPS,
+                                    compact_actions=compact_actions)
+    env_fn = functools.partial(make_env, compact_actions, obs_mode)
+    if vec == "subproc":
+        return SubprocVecEnv([env_fn for _ in range(n_envs)])
+    return DummyVecEnv([env_fn for _ in range(n_envs)])
+
+def train(n_envs=1, vec="dummy", total_timesteps=TOTAL_TIMESTEPS, resume=True, seed=None, compact_actions=False,
+          obs_mode="slots"):
+    """
+    resume: vorhandenes Modell weitertrainieren; False startet immer mit frischen Gewichten
+    (Pipeline-Cache: das Ergebnis hängt dann nur von Anlage und Hyperparametern ab).
+    compact_actions: Aktionen nur für fähige (Maschine, Transformation)-Paare; das High-Level-Env muss dann
+    ebenfalls mit compact_actions=True erzeugt werden.
+    obs_mode: Observation-Kodierung (flexible_jobshop_env.OBS_MODES), gilt ebenso für das High-Level-Env.
+    Gespeichert wird unter model_path(MODEL_LL, ...) mit der Kodierung als Metadaten; ein vorhandenes Modell,
+    das nicht zur Env passt, führt zu einem Fehler statt überschrieben zu werden.
+    """
+    path = model_path(MODEL_LL, compact_actions, obs_mode)
+    vec_env = make_vec_env(n_envs, vec, compact_actions, obs_mode)
+    # Modell laden oder neu initialisieren
+    model = None
+    if resume and os.path.exists(path):
+        check_encoding(path, compact_actions, obs_mode)
+        try:
+            model = MaskablePPO.load(path, env=vec_env)
+        except ValueError as e:
+            raise ValueError(f"'{path}' passt nicht zur Env ({e}); mit --no-resume neu trainieren") from e
+    if model is None:
+        model = MaskablePPO("MlpPolicy", vec_env, verbose=1, seed=seed)
+
+    # Training
+    model.learn(total_timesteps=total_timesteps)
+    model.save(path)
+    save_encoding(path, compact_actions, obs_mode)
+    vec_env.close()
+    print("Low-Level goal-conditioned Training abgeschlossen.")
+    return model
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Low-Level MaskablePPO Training")
+    parser.add_argument("--n-envs", type=int, default=1, help="Anzahl paralleler Envs (je Env eine eigene Anlage)")
+    parser.add_argument("--vec", choices=["dummy", "subproc", "batched"], default="dummy",
+                        help="dummy: ein Prozess, subproc: ein Worker-Prozess je Env, batched: NumPy-Batch-Env")
+    parser.add_argument("--total-timesteps", type=int, default=TOTAL_TIMESTEPS)
+    parser.add_argument("--compact-actions", action="store_true",
+                        help="Aktionsraum nur aus fähigen (Maschine, Transformation)-Paaren")
+    parser.add_argument("--obs-mode", choices=OBS_MODES, default="slots",
+                        help="slots: Typ-ID je Puffer-Slot, counts: Zählhistogramme (unabhängig von max_buffer)")
+    parser.add_argument("--no-resume", action="store_true", help="vorhandenes Modell ignorieren und neu trainieren")
+    args = parser.parse_args()
+    train(n_envs=args.n_envs, vec=args.vec, total_timesteps=args.total_timesteps, resume=not args.no_resume,
+          compact_actions=args.compact_actions, obs_mode=args.obs_mode)
@@ -0,0 +1,240 @@
+# File: trajectory_recorder.py
+# Spaltenweise Aufzeichnung von Transitionen (Observation, Aktion, Maske, Reward, Done-Flags) in vorallokierte
+# Arrays, blockweises Schreiben nach .npy und speicherabgebildetes Lesen mit fortlaufend angehängtem Episodenindex
+import json
+import os
+
+import gymnasium as gym
+import numpy as np
+
+COLUMNS = ("obs", "actions", "masks", "rewards", "terminated", "truncated")
+INDEX_FILE = "index.jsonl"
+
+
+def _action_mask(env):
+    # HighLevelEnv: action_masks(), FlexibleJobShopEnv: get_action_mask()
+    env = env.unwrapped
+    return env.action_masks() if hasattr(env, "action_masks") else env.get_action_mask()
+
+
+class TrajectoryRecorder(gym.Wrapper):
+    """
+    Wrapper für FlexibleJobShopEnv/HighLevelEnv, der jede Transition in vorallokierte Spalten schreibt.
+    Ist ein Block mit chunk_size Transitionen voll, wird er als <Spalte>_<Block>.npy nach root geschrieben und
+    je flush() eine Zeile an index.jsonl angehängt (Block und Größe, seitdem abgeschlossene Episoden als
+    (Start-Offset, Länge), Block der Endbeobachtungen); ein Absturz verliert höchstens den laufenden Block.
+    Lesen mit TrajectoryDataset.
+
+    Je Transition: obs (Observation, auf der die Aktion gewählt wurde), actions, masks (gültige Aktionen),
+    rewards, terminated, truncated. Die Folge-Observation ist obs der nächsten Transition; am Episodenende
+    (terminated/truncated, reset() oder close() mitten in der Episode) wird sie zusätzlich mit dem globalen
+    Transitionsindex als final_obs_<Block>.npy/final_index_<Block>.npy gespeichert (TrajectoryDataset.next_obs).
+    Eine bestehende Aufzeichnung in root wird überschrieben.
+    """
+    def __init__(self, env, root: str, chunk_size: int = 1 << 16):
+        super().__init__(env)
+        self.root = root
+        self.chunk_size = chunk_size
+        os.makedirs(root, exist_ok=True)
+        obs_shape = env.observation_space.shape
+        n_actions = env.action_space.n
+        self._buf = {
+            "obs": np.zeros((chunk_size,) + obs_shape, dtype=np.float32),
+            "actions": np.zeros(chunk_size, dtype=np.int64),
+            "masks": np.zeros((chunk_size, n_actions), dtype=bool),
+            "rewards": np.zeros(chunk_size, dtype=np.float32),
+            "terminated": np.zeros(chunk_size, dtype=bool),
+            "truncated": np.zeros(chunk_size, dtype=bool),
+        }
+        self._fill = 0
+        self._n_chunks = 0         # geschriebene Blöcke
+        self._n_final_chunks = 0   # geschriebene Blöcke mit Endbeobachtungen
+        self._episodes = []        # seit dem letzten flush() abgeschlossene Episoden (Start-Offset, Länge)
+        self._finals = []          # seit dem letzten flush(): (globaler Index der letzten Transition, Observation)
+        self._n_written = 0        # Transitionen in geschriebenen Blöcken
+        self._episode_start = None
+        open(os.path.join(root, INDEX_FILE), "w", encoding="utf-8").close()
+        self._obs = None
+        self._mask = None
+
+    @property
+    def n_transitions(self):
+        return self._n_written + self._fill
+
+    def _end_episode(self):
+        # self._obs ist die Observation nach der letzten Transition der Episode
+        if self._episode_start is not None and self.n_transitions > self._episode_start:
+            self._episodes.append((self._episode_start, self.n_transitions - self._episode_start))
+            self._finals.append((self.n_transitions - 1, np.array(self._obs, dtype=np.float32)))
+        self._episode_start = None
+
+    def reset(self, **kwargs):
+        self._end_episode()
+        obs, info = self.env.reset(**kwargs)
+        self._obs, self._mask = obs, _action_mask(self.env)
+        self._episode_start = self.n_transitions
+        return obs, info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        i = self._fill
+        buf = self._buf
+        buf["obs"][i] = self._obs
+        buf["actions"][i] = action
+        buf["masks"][i] = self._mask
+        buf["rewards"][i] = reward
+        buf["terminated"][i] = terminated
+        buf["truncated"][i] = truncated
+        self._fill += 1
+        self._obs, self._mask = obs, _action_mask(self.env)
+        if terminated or truncated:
+            self._end_episode()
+        if self._fill == self.chunk_size:
+            self.flush()
+        return obs, reward, terminated, truncated, info
+
+    def flush(self):
+        """
+        Schreibt den laufenden Block (auch teilweise gefüllt) sowie die Endbeobachtungen und hängt eine Indexzeile an.
+        Aufwand unabhängig von der Länge der bisherigen Aufzeichnung.
+        """
+        if not (self._fill or self._episodes or self._finals):
+            return
+        entry = {"chunk": None, "n": self._fill, "episodes": self._episodes, "finals": None}
+        if self._fill:
+            k = entry["chunk"] = self._n_chunks
+            for name in COLUMNS:
+                np.save(os.path.join(self.root, f"{name}_{k:05d}.npy"), self._buf[name][:self._fill])
+            self._n_chunks += 1
+            self._n_written += self._fill
+            self._fill = 0
+        if self._finals:
+            j = entry["finals"] = self._n_final_chunks
+            np.save(os.path.join(self.root, f"final_index_{j:05d}.npy"),
+                    np.array([i for i, _ in self._finals], dtype=np.int64))
+            np.save(os.path.join(self.root, f"final_obs_{j:05d}.npy"), np.stack([o for _, o in self._finals]))
+            self._n_final_chunks += 1
+        # Indexzeile erst nach den Daten und in einem Stück schreiben; eine abgebrochene letzte Zeile
+        # ignoriert der Leser
+        with open(os.path.join(self.root, INDEX_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self._episodes, self._finals = [], []
+
+    def close(self):
+        self._end_episode()
+        self.flush()
+        super().close()
+
+
+class TrajectoryDataset:
+    """
+    Liest eine mit TrajectoryRecorder geschriebene Aufzeichnung; alle Blöcke werden speicherabgebildet geöffnet
+    (mmap), geladen werden nur die tatsächlich angefassten Bereiche.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self.chunk_sizes, self.episodes = [], []
+        final_index, self._final_chunks = [], []
+        with open(os.path.join(root, INDEX_FILE), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break          # beim Schreiben abgebrochene letzte Zeile
+                if entry["chunk"] is not None:
+                    self.chunk_sizes.append(entry["n"])
+                self.episodes.extend(tuple(e) for e in entry["episodes"])
+                if entry["finals"] is not None:
+                    j = entry["finals"]
+                    idx = np.load(os.path.join(root, f"final_index_{j:05d}.npy"))
+                    final_index.append(idx)
+                    self._final_chunks.extend((j, r) for r in range(len(idx)))
+        self.offsets = np.concatenate([[0], np.cumsum(self.chunk_sizes)]).astype(np.int64)
+        # globale Indizes der letzten Transition je Episode (aufsteigend) -> (Block, Zeile) der Endbeobachtung
+        self.final_index = np.concatenate(final_index) if final_index else np.zeros(0, dtype=np.int64)
+        self._mmaps = {}
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def chunk(self, name: str, k: int):
+        """
+        Block k der Spalte name (oder der Endbeobachtungen, name="final_obs") als schreibgeschütztes memmap.
+        """
+        key = (name, k)
+        if key not in self._mmaps:
+            self._mmaps[key] = np.load(os.path.join(self.root, f"{name}_{k:05d}.npy"), mmap_mode="r")
+        return self._mmaps[key]
+
+    def slice(self, name: str, start: int, stop: int):
+        """
+        Transitionen [start, stop) der Spalte name; kopiert nur, wenn der Bereich über Blockgrenzen reicht.
+        """
+        k0 = int(np.searchsorted(self.offsets, start, side="right")) - 1
+        k1 = int(np.searchsorted(self.offsets, stop, side="left")) - 1
+        if k0 == k1:
+            base = self.offsets[k0]
+            return self.chunk(name, k0)[start - base:stop - base]
+        parts = []
+        for k in range(k0, k1 + 1):
+            base = self.offsets[k]
+            lo = max(start, base) - base
+            hi = min(stop, self.offsets[k + 1]) - base
+            parts.append(self.chunk(name, k)[lo:hi])
+        return np.concatenate(parts)
+
+    def next_obs(self, start: int, stop: int):
+        """
+        Folge-Observations der Transitionen [start, stop): obs der jeweils nächsten Transition, am Episodenende
+        die gespeicherte Endbeobachtung. ValueError für Transitionen einer noch laufenden Episode ohne Nachfolger.
+        """
+        n = len(self)
+        if not 0 <= start <= stop <= n:
+            raise IndexError(f"Bereich [{start}, {stop}) außerhalb von [0, {n})")
+        if start == stop:
+            return np.zeros((0,) + (self.chunk("obs", 0).shape[1:] if n else ()), dtype=np.float32)
+        result = np.empty((stop - start,) + self.chunk("obs", 0).shape[1:], dtype=np.float32)
+        inner = min(stop + 1, n) - (start + 1)
+        if inner > 0:
+            result[:inner] = self.slice("obs", start + 1, start + 1 + inner)
+        lo, hi = np.searchsorted(self.final_index, [start, stop])
+        for r in range(lo, hi):
+            j, row = self._final_chunks[r]
+            result[self.final_index[r] - start] = self.chunk("final_obs", j)[row]
+        if stop == n and (hi == lo or self.final_index[hi - 1] != n - 1):
+            raise ValueError("Letzte Transition ohne Folge-Observation (Episode lief beim Schreiben noch)")
+        return result
+
+    def episode(self, i: int, columns=COLUMNS):
+        """
+        Alle Spalten der i-ten abgeschlossenen Episode als Dictionary.
+        """
+        start, length = self.episodes[i]
+        return {name: self.slice(name, start, start + length) for name in columns}
+
+    def iter_chunks(self, columns=COLUMNS):
+        """
+        Iteriert blockweise über die Aufzeichnung (Dictionary Spalte -> memmap je Block).
+        """
+        for k in range(len(self.chunk_sizes)):
+            yield {name: self.chunk(name, k) for name in columns}
+
+
+def collect(env, policy, n_steps: int, seed=None):
+    """
+    Sammelt n_steps Transitionen mit env (typischerweise ein TrajectoryRecorder).
+    policy: Objekt mit predict(obs, deterministic, action_masks) (MaskablePPO, NumpyPolicy, ...)
+            oder None für zufällige gültige Aktionen.
+    """
+    rng = np.random.default_rng(seed)
+    obs, _ = env.reset(seed=seed)
+    for _ in range(n_steps):
+        mask = _action_mask(env)
+        if policy is None:
+            action = int(rng.choice(np.flatnonzero(mask)))
+        else:
+            action, _ = policy.predict(obs, deterministic=True, action_masks=mask)
+            action = int(action)
+        obs, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            obs, _ = env.reset()
@@ -0,0 +1,303 @@
+# File: vec_jobshop_env.py
+# Batched NumPy-VecEnv: N Kopien einer Anlage in gestapelten Zählarrays, Schritt für alle Anlagen gleichzeitig
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from plant_index import compile_plant
+
+
+class BatchedJobShopVecEnv(VecEnv):
+    """
+    VecEnv mit der Dynamik von FlexibleJobShopEnv (goal-conditioned, Ziel wird bei jedem Reset zufällig
+    aus subgoals gezogen) für n_envs Anlagen gleicher Struktur.
+
+    Zustand je Anlage als Zählarrays: globaler Puffer (N x Typen), Maschinen-Inputpuffer (N x Maschinen x Typen)
+    und Job-Slots (N x Maschinen x Slots: Transformation, Restdauer, Startschritt). Dispatch, Maschinenfortschritt,
+    Nachschub, Reward, Observation und Aktionsmaske werden für alle Anlagen mit Array-Operationen berechnet.
+
+    Reihenfolge im globalen Puffer: je Typ werden die Ankunftsnummern der Teile in einem Ringpuffer geführt
+    (Entnahme wie PartBuffer.take stets der älteste Teile eines Typs, es bleiben also die jüngsten g[Typ] übrig).
+    Ankünfte folgen FlexibleJobShopEnv: Nachschub reihum über die elementaren Typen, Fertigstellungen nach
+    Maschine und Startreihenfolge. Die Puffer-Slots der Observation sind damit die ältesten max_buffer Teile wie dort.
+    Teile-Identität wird nicht geführt; Maschinen arbeiten stets in der Standard-Priorität ihres Maschinentyps.
+    compact_actions: Aktionskodierung nur über fähige Paare wie FlexibleJobShopEnv(compact_actions=True).
+    """
+    def __init__(self, anlage, n_envs: int, subgoals: list, max_buffer=10, max_steps=50, gamma=0.99, seed=None,
+                 compact_actions=False):
+        self.index = ix = compile_plant(anlage)
+        self.max_buffer = max_buffer
+        self.max_steps = max_steps
+        self.gamma = gamma
+        self.subgoals = list(subgoals)
+        self.subgoal_ids = np.array([ix.name_ids[g] for g in self.subgoals], dtype=np.int64)
+        self.n_types = P = ix.n_types
+        self.n_machines = M = ix.n_machines
+        self.n_transformations = T = ix.n_transformations
+        self.action_m, self.action_t, self.action_ids = ix.action_layout(compact_actions)
+        self.n_actions = 1 + len(self.action_m)
+        self.empty_marker = P
+
+        obs_dim = max_buffer + M * (3 + P) + P
+        observation_space = spaces.Box(0, 100, shape=(obs_dim,), dtype=np.float32)
+        action_space = spaces.Discrete(self.n_actions)
+        self.render_mode = None
+        super().__init__(n_envs, observation_space, action_space)
+        N = n_envs
+
+        # statische Tabellen
+        self.R = ix.requirements                                     # (T, P)
+        self.durations = ix.durations                                # (T,)
+        self.output_ids = ix.output_ids                              # (T,)
+        self.slots = ix.slots                                        # (M,)
+        self.n_slots = S = int(ix.slots.max())
+        self.slot_valid = np.arange(S)[None, :] < ix.slots[:, None]  # (M, S)
+        # Priorität: Position der Transformation in der Liste des Maschinentyps, sonst "unendlich"
+        self._no_rank = T + 1
+        self.priority_rank = np.full((M, T), self._no_rank, dtype=np.int64)
+        for mi, m in enumerate(anlage.machines):
+            for rank, t in enumerate(m.machine_type.transformations):
+                self.priority_rank[mi, ix.trans_ids[t]] = min(self.priority_rank[mi, ix.trans_ids[t]], rank)
+        self.is_final = np.array([pt.name in ['fp1', 'fp2'] for pt in ix.part_types])
+        self.part_profit = np.array([pt.value - pt.cost for pt in ix.part_types], dtype=np.float64)
+        self.job_profit = self.R @ self.part_profit                  # (T,)
+        self.elementary_ids = np.array([ix.type_ids[pt] for pt in anlage.elementary_part_types]
+                                       or [0], dtype=np.int64)
+        self.support = ((ix.capability.astype(np.int64) @ (self.R > 0)) > 0).astype(np.float32)
+        # Sparse Rezepte (auf gleiche Länge aufgefüllt, Füllwert: Typ 0 mit Bedarf 0)
+        L = max(len(r) for r in ix.recipes)
+        self.recipe_types = np.zeros((T, L), dtype=np.int64)
+        self.recipe_counts = np.zeros((T, L), dtype=np.int64)
+        for ti, recipe in enumerate(ix.recipes):
+            for j, (tid, n) in enumerate(recipe):
+                self.recipe_types[ti, j] = tid
+                self.recipe_counts[ti, j] = n
+        # nur fähige (Maschine, Transformation)-Paare werden beim Jobstart geprüft
+        self.pair_m, self.pair_t = np.nonzero(ix.capability)
+        self.pair_rank = self.priority_rank[self.pair_m, self.pair_t]
+
+        # dynamischer Zustand
+        self.g = np.zeros((N, P), dtype=np.int64)
+        self.inp = np.zeros((N, M, P), dtype=np.int64)
+        self.job_t = np.full((N, M, S), -1, dtype=np.int64)
+        self.job_rem = np.zeros((N, M, S), dtype=np.int64)
+        self.job_start = np.zeros((N, M, S), dtype=np.int64)          # Schritt des Jobstarts (Fertigstellungsreihenfolge)
+        # Ankunftsnummern je Typ im Ring (Kapazität wächst bei Bedarf), absolute Schreibposition je Typ
+        self.arrivals = np.zeros((N, P, max_buffer), dtype=np.int64)
+        self.arrivals_written = np.zeros((N, P), dtype=np.int64)
+        self.next_seq = np.zeros(N, dtype=np.int64)
+        self.steps = np.zeros(N, dtype=np.int64)
+        self.goal_ids = np.zeros(N, dtype=np.int64)
+        self.completed = np.zeros((N, P), dtype=np.int64)  # Fertigstellungen des letzten Schritts je Typ
+
+        # vorallokierte Observation
+        self._obs = np.zeros((N, obs_dim), dtype=np.float32)
+        self._obs_buffer = self._obs[:, :max_buffer]
+        self._obs_machines = self._obs[:, max_buffer:obs_dim - P].reshape(N, M, 3 + P)
+        self._obs_goal = self._obs[:, obs_dim - P:]
+        self._obs_machines[:, :, 3:] = self.support
+        self._window = np.arange(max_buffer)
+
+        self._actions = np.zeros(N, dtype=np.int64)
+        self._rng = np.random.default_rng(seed)
+
+    # --- Hilfsfunktionen ---------------------------------------------------------------
+    def _arrive(self, rows, types):
+        """
+        Teile der Typen types kommen im globalen Puffer der Anlagen rows an; die Arrays sind nach Anlage gruppiert
+        und innerhalb einer Anlage in Ankunftsreihenfolge.
+        """
+        if not len(rows):
+            return
+        n_rows = np.bincount(rows, minlength=self.num_envs)
+        first = np.cumsum(n_rows) - n_rows
+        seqs = self.next_seq[rows] + np.arange(len(rows)) - first[rows]
+        self.next_seq += n_rows
+        np.add.at(self.g, (rows, types), 1)
+        if self.g.max() > self.arrivals.shape[2]:
+            self._grow_arrivals(int(self.g.max()))
+        # Rang innerhalb von (Anlage, Typ) in Ankunftsreihenfolge
+        order = np.lexsort((np.arange(len(rows)), types, rows))
+        r, t = rows[order], types[order]
+        new_group = np.r_[True, (r[1:] != r[:-1]) | (t[1:] != t[:-1])]
+        group_start = np.maximum.accumulate(np.where(new_group, np.arange(len(r)), 0))
+        pos = self.arrivals_written[r, t] + np.arange(len(r)) - group_start
+        self.arrivals[r, t, pos % self.arrivals.shape[2]] = seqs[order]
+        np.add.at(self.arrivals_written, (rows, types), 1)
+
+    def _grow_arrivals(self, needed):
+        # Ring vergrößern; die übrigen (jüngsten) Einträge je Typ an ihre Positionen im neuen Ring kopieren
+        old = self.arrivals
+        C, C2 = old.shape[2], max(needed, 2 * old.shape[2])
+        # Stand vor der laufenden Ankunft: höchstens C Einträge je Typ sind belegt
+        k = np.arange(C)
+        absolute = self.arrivals_written[:, :, None] - C + k
+        valid = absolute >= 0
+        grown = np.zeros(old.shape[:2] + (C2,), dtype=np.int64)
+        n, p, _ = np.nonzero(valid)
+        a = absolute[valid]
+        grown[n, p, a % C2] = old[n, p, a % C]
+        self.arrivals = grown
+
+    def _refill(self, rows=None):
+        # freie Plätze reihum über die elementaren Typen (beginnend beim ersten) mit Rohteilen auffüllen
+        rows = np.arange(self.num_envs) if rows is None else rows
+        free = np.maximum(0, self.max_buffer - self.g[rows].sum(axis=1))
+        ids = np.repeat(rows, free)
+        i = np.arange(len(ids)) - np.repeat(np.cumsum(free) - free, free)
+        self._arrive(ids, self.elementary_ids[i % len(self.elementary_ids)])
+
+    def _feasible(self, counts):
+        # (N, Typen) -> (N, Transformationen): alle Inputs eines Rezepts vorhanden
+        return np.all(counts[:, self.recipe_types] >= self.recipe_counts, axis=-1)
+
+    def _profit(self):
+        running = self.job_t >= 0
+        job_val = np.where(running, self.job_profit[np.maximum(self.job_t, 0)], 0.0).sum(axis=(1, 2))
+        return self.g @ self.part_profit + self.inp.sum(axis=1) @ self.part_profit + job_val
+
+    def _phi(self):
+        return (self.g * self.index.goal_potential[:, self.goal_ids].T).sum(axis=1)
+
+    def _reset_rows(self, rows):
+        self.g[rows] = 0
+        self.arrivals_written[rows] = 0
+        self.next_seq[rows] = 0
+        self.inp[rows] = 0
+        self.job_t[rows] = -1
+        self.job_rem[rows] = 0
+        self.steps[rows] = 0
+        self.goal_ids[rows] = self.subgoal_ids[self._rng.integers(len(self.subgoal_ids), size=len(rows))]
+        self._refill(rows)
+
+    def _observation(self):
+        # Puffer-Slots: die ältesten max_buffer Teile über alle Typen in Ankunftsreihenfolge, leere Slots = empty_marker
+        B, C = self.max_buffer, self.arrivals.shape[2]
+        absolute = (self.arrivals_written - self.g)[:, :, None] + self._window   # älteste B Einträge je Typ
+        valid = self._window < self.g[:, :, None]
+        seqs = np.take_along_axis(self.arrivals, absolute % C, axis=2)
+        seqs = np.where(valid, seqs, np.iinfo(np.int64).max).reshape(self.num_envs, -1)
+        oldest = np.argsort(seqs, axis=1, kind="stable")[:, :B]
+        filled = np.take_along_axis(seqs, oldest, axis=1) < np.iinfo(np.int64).max
+        self._obs_buffer[:] = np.where(filled, oldest // B, self.empty_marker)
+        self._obs_machines[:, :, 0] = self.inp.sum(axis=2)
+        self._obs_machines[:, :, 2] = (self.job_t >= 0).sum(axis=2)
+        self._obs_goal.fill(0.0)
+        self._obs_goal[np.arange(self.num_envs), self.goal_ids] = 1.0
+        return self._obs.copy()
+
+    def action_masks(self):
+        """
+        Aktionsmasken aller Anlagen (N x n_actions): noop plus Transformationen, deren Inputs im globalen Puffer liegen.
+        """
+        masks = np.empty((self.num_envs, self.n_actions), dtype=bool)
+        masks[:, 0] = True
+        masks[:, 1:] = self._feasible(self.g)[:, self.action_t]
+        return masks
+
+    # --- Simulation -------------------------------------------------------------------
+    def _dispatch(self, actions):
+        mi = self.action_m[np.maximum(actions - 1, 0)]
+        ti = self.action_t[np.maximum(actions - 1, 0)]
+        req = self.R[ti]                                              # (N, P)
+        pending = actions > 0
+        for _ in range(self.max_buffer):
+            active = pending & np.all(req <= self.g, axis=1)
+            if not active.any():
+                break
+            rows = np.flatnonzero(active)
+            self.g[rows] -= req[rows]                                # Entnahme je Typ: die ältesten Teile
+            self.inp[rows, mi[rows]] += req[rows]
+            self._refill(rows)
+            pending = active
+
+    def _progress_machines(self):
+        # je Maschine höchstens einen Job nach Priorität starten
+        running = self.job_t >= 0
+        has_free = running.sum(axis=2) < self.slots[None, :]
+        pair_inputs = self.inp[:, self.pair_m[:, None], self.recipe_types[self.pair_t]]  # (N, Paare, L)
+        feasible = np.all(pair_inputs >= self.recipe_counts[self.pair_t], axis=-1)
+        rank = np.full((self.num_envs, self.n_machines, self.n_transformations), self._no_rank, dtype=np.int64)
+        rank[:, self.pair_m, self.pair_t] = np.where(feasible, self.pair_rank, self._no_rank)
+        t_sel = rank.argmin(axis=2)
+        start = has_free & (rank.min(axis=2) < self._no_rank)
+        ns, ms = np.nonzero(start)
+        if len(ns):
+            ts = t_sel[ns, ms]
+            self.inp[ns, ms] -= self.R[ts]
+            slot = (~running[ns, ms] & self.slot_valid[ms]).argmax(axis=1)
+            self.job_t[ns, ms, slot] = ts
+            self.job_rem[ns, ms, slot] = self.durations[ts]
+            self.job_start[ns, ms, slot] = self.steps[ns]
+        # Fortschritt und Fertigstellung
+        running = self.job_t >= 0
+        self.job_rem[running] -= 1
+        done = running & (self.job_rem <= 0)
+        self.completed[:] = 0
+        dn, dm, ds = np.nonzero(done)
+        if len(dn):
+            # Reihenfolge wie im Einzel-Env: Maschinen nacheinander, je Maschine nach Startreihenfolge
+            order = np.lexsort((self.job_start[dn, dm, ds], dm, dn))
+            dn, dm, ds = dn[order], dm[order], ds[order]
+            out = self.output_ids[self.job_t[dn, dm, ds]]
+            np.add.at(self.completed, (dn, out), 1)
+            self.job_t[dn, dm, ds] = -1
+            # finale Produkte verlassen die Anlage, alle anderen gehen in den globalen Puffer
+            keep = ~self.is_final[out]
+            self._arrive(dn[keep], out[keep])
+
+    # --- VecEnv-Schnittstelle ---------------------------------------------------------
+    def reset(self):
+        self._reset_rows(np.arange(self.num_envs))
+        return self._observation()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        prev_profit = self._profit()
+        prev_phi = self._phi()
+        self._dispatch(self._actions)
+        self._progress_machines()
+        self._refill()
+        rewards = (self._profit() - prev_profit) + (self.gamma * self._phi() - prev_phi)
+        self.steps += 1
+        dones = self.steps >= self.max_steps
+        obs = self._observation()
+        masks = self.action_masks()
+        infos = [{"action_mask": masks[i]} for i in range(self.num_envs)]
+        if dones.any():
+            rows = np.flatnonzero(dones)
+            for i in rows:
+                infos[i]["terminal_observation"] = obs[i]
+                infos[i]["TimeLimit.truncated"] = False
+            self._reset_rows(rows)
+            obs = self._observation()
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def seed(self, seed=None):
+        self._rng = np.random.default_rng(seed)
+        return [seed] * self.num_envs
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def has_attr(self, attr_name):
+        return hasattr(self, attr_name)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        # Methoden arbeiten auf allen Anlagen zugleich; Array-Ergebnisse werden je Anlage aufgeteilt
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        idx = list(self._get_indices(indices))
+        if isinstance(result, np.ndarray) and len(result) == self.num_envs:
+            return [result[i] for i in idx]
+        return [result for _ in idx]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]